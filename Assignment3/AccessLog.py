@@ -0,0 +1,155 @@
+import sys
+import json
+import struct
+
+class AccessLog:
+    """Class for buffered per-access output in verbose mode
+
+    Lines are collected and written in large batches, so big traces aren't slowed down by one write per access.
+    Formats:
+        text: the trace line followed by its results, the same as the original verbose output
+        csv: one row of index, op, address, size, set, result per access
+        jsonl: one JSON object per access with the same fields as csv
+        bin: a header of magic, version and event size, then one (index, set, result) event per access
+             Each event is a 64 bit record index, 32 bit set and 8 bit result code (RESULT_CODES), little endian
+    A modify record is two accesses, so the structured formats give it two events with the same index.
+
+    Attributes:
+        self.log_path (str): Path to write the log to, None for stdout
+        self.log_format (str): Output format, one of FORMATS
+        self.misses_only (bool): Whether only misses and evictions are logged, hits are dropped
+        self.file (file object): Open binary stream the log is written to, None until opened
+        self.batch (list): Lines or packed events waiting to be written
+
+    """
+
+    FORMATS = ('text', 'csv', 'jsonl', 'bin')
+    RESULT_CODES = {'hit': 0, 'miss': 1, 'miss eviction': 2}
+    MAGIC = b'CSIMLOG\0'
+    VERSION = 1
+    HEADER = struct.Struct('<8sHH')
+    EVENT = struct.Struct('<QIB')
+
+    #Batches are written once they hold this many lines or events
+    BATCH_SIZE = 1 << 14
+
+    def __init__(self, log_path=None, log_format='text', misses_only=False):
+        """Sets the output, nothing is opened until used as a context manager
+
+        Args:
+            log_path (str): Path to write the log to, None for stdout
+            log_format (str): Output format, one of FORMATS
+            misses_only (bool): Whether only misses and evictions are logged
+
+        Returns:
+            None
+        """
+
+        assert log_format in self.FORMATS, "Log format must be one of: {}".format(', '.join(self.FORMATS))
+        self.log_path = log_path
+        self.log_format = log_format
+        self.misses_only = misses_only
+        self.file = None
+        self.batch = []
+
+
+
+    def __enter__(self):
+        """Opens the output and writes the header of formats that have one
+
+        Args:
+            None
+
+        Returns:
+            self
+        """
+
+        if self.log_path is None:
+            #Anything already printed has to come out before the log
+            sys.stdout.flush()
+            self.file = sys.stdout.buffer
+        else:
+            self.file = open(self.log_path, 'wb')
+
+        if self.log_format == 'csv':
+            self.batch.append(b"index,op,addr,size,set,result\n")
+        elif self.log_format == 'bin':
+            self.batch.append(self.HEADER.pack(self.MAGIC, self.VERSION, self.EVENT.size))
+
+        return self
+
+
+
+    def __exit__(self, *exc):
+        """Writes what is left in the batch, then closes the output if it is a file
+
+        Args:
+            exc: Exception info, unused
+
+        Returns:
+            None
+        """
+
+        self.flush()
+        if self.log_path is None:
+            self.file.flush()
+        else:
+            self.file.close()
+
+
+
+    def flush(self):
+        """Writes the batch out
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        self.file.write(b''.join(self.batch))
+        self.batch = []
+
+
+
+    def log(self, index, op, addr, size, set_index, result1, result2, trace=None):
+        """Logs the results of one trace record
+
+        Args:
+            index (int): Index of the record in the trace
+            op (str): (op)eration character of the record
+            addr (int): Address accessed
+            size (int): Size of the access, or the # of accesses for R/W records
+            set_index (int): Set the address maps to
+            result1 (str): Result of the first access, 'hit', 'miss' or 'miss eviction'
+            result2 (str): Result of the second access of a modify, "" for other records
+            trace (str): Text line of the record, rebuilt from the other fields if None
+
+        Returns:
+            None
+        """
+
+        if self.misses_only and result1 == 'hit' and result2 != 'miss' and result2 != 'miss eviction':
+            return
+
+        log_format = self.log_format
+        if log_format == 'text':
+            #Binary traces have no text line, rebuild one in the valgrind format
+            if trace is None:
+                trace = "{} {:x},{}".format(op, addr, size)
+            self.batch.append("{} {} {}\n".format(trace, result1, result2).encode())
+        else:
+            for result in (result1, result2):
+                if not result or (self.misses_only and result == 'hit'):
+                    continue
+                if log_format == 'csv':
+                    self.batch.append("{},{},{:x},{},{},{}\n".format(index, op, addr, size, set_index, result).encode())
+                elif log_format == 'jsonl':
+                    event = {'index': index, 'op': op, 'addr': addr, 'size': size, 'set': set_index, 'result': result}
+                    self.batch.append((json.dumps(event) + "\n").encode())
+                else:
+                    self.batch.append(self.EVENT.pack(index, set_index, self.RESULT_CODES[result]))
+
+        if len(self.batch) >= self.BATCH_SIZE:
+            self.flush()
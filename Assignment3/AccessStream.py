@@ -0,0 +1,146 @@
+class AccessStream:
+    """Class to turn trace records into the accesses the data caches see, honoring access sizes and instruction fetches
+
+    By default a record is one access to the block of its address, and instruction fetches are dropped, like csim-ref.
+    With split_blocks, an access whose bytes straddle a block boundary is split into one record per block it touches,
+    each with the address and size of its piece, so every block it touches is looked up.
+    With an instruction cache, I records are fetched through it in the same pass, split the same way at its own
+    block size, and the data caches never see them.
+    Simulator.run and CacheSweep.run take the stream and call split_access and fetch inline, only for the records
+    that need them, so a record that needs nothing costs one compare, or nothing without split_blocks.
+    Paths that decode the trace before simulating it, -j sweeps, --workers and opt, go through records instead,
+    whose extra generator frame is small next to the decoding.
+
+    Attributes:
+        self.offset_bit_size (int): # of bits required to determine block offset of the data caches
+        self.split_blocks (bool): Whether accesses straddling a block boundary are split into one access per block
+        self.icache (Simulator): Instruction cache fed the I records, None to drop them
+        self.split (int): # of data accesses split
+        self.extra (int): # of data accesses added by splitting, on top of the records'
+
+    """
+
+    def __init__(self, offset_bit_size, split_blocks=False, icache=None):
+        """Sets how records are turned into accesses
+
+        Args:
+            offset_bit_size (int): # of bits required to determine block offset of the data caches
+            split_blocks (bool): Whether accesses straddling a block boundary are split into one access per block
+            icache (Simulator): Empty instruction cache to feed the I records to, None to drop them
+
+        Returns:
+            None
+        """
+
+        self.offset_bit_size = offset_bit_size
+        self.split_blocks = split_blocks
+        self.icache = icache
+        self.split = 0
+        self.extra = 0
+
+
+
+    def split_access(self, addr, size):
+        """Splits a data access that straddles a block boundary into one piece per block it touches
+
+        Args:
+            addr (int): Address accessed
+            size (int): # of bytes accessed, past the end of addr's block
+
+        Returns:
+            List of (addr, size) tuples of the pieces, in address order, the first one starts at addr
+        """
+
+        offset_bit_size = self.offset_bit_size
+        end = addr + size - 1
+        self.split += 1
+        self.extra += (end >> offset_bit_size) - (addr >> offset_bit_size)
+
+        pieces = []
+        while addr <= end:
+            next_addr = ((addr >> offset_bit_size) + 1) << offset_bit_size
+            pieces.append((addr, min(next_addr, end + 1) - addr))
+            addr = next_addr
+
+        return pieces
+
+
+
+    def fetch(self, addr, size):
+        """Fetches an I record through the instruction cache, or drops it if there isn't one
+
+        Args:
+            addr (int): Address fetched
+            size (int): # of bytes fetched, split across the instruction cache's blocks with split_blocks
+
+        Returns:
+            None
+        """
+
+        icache = self.icache
+        if icache is None:
+            return
+
+        #Fetches repeating the last block are guaranteed hits, like in Simulator.run
+        cache = icache.cache
+        block = addr >> cache.offset_bit_size
+        last = (addr + size - 1) >> cache.offset_bit_size if self.split_blocks and size > 1 else block
+        while block <= last:
+            if icache.skip_repeats and block == icache.last_block:
+                cache.stats['hits'] += 1
+            else:
+                cache.access_block(block)
+                icache.last_block = block
+            block += 1
+
+
+
+    def records(self, records):
+        """Goes through the records, splitting straddling data accesses and fetching instructions through the instruction cache
+        Used where the records are decoded before being simulated, Simulator.run and CacheSweep.run do the same inline
+
+        Args:
+            records (iterable): (op, addr, size, trace) tuples, such as the ones from a TraceReader
+
+        Yields:
+            (op, addr, size, trace) tuple for each data access, and each R/W record, pieces of a split access keep its trace line
+        """
+
+        block_size = 1 << self.offset_bit_size
+        offset_mask = block_size - 1
+        split_blocks = self.split_blocks
+        for record in records:
+            op = record[0]
+            if op == 'L' or op == 'S' or op == 'M':
+                if not split_blocks or (record[1] & offset_mask) + record[2] <= block_size:
+                    yield record
+                    continue
+
+                for addr, size in self.split_access(record[1], record[2]):
+                    yield op, addr, size, record[3]
+
+            elif op == 'I':
+                self.fetch(record[1], record[2])
+
+            else:
+                yield record
+
+
+
+    def report(self):
+        """Builds a summary of the split accesses and instruction cache stats
+
+        Args:
+            None
+
+        Returns:
+            Summary as a string, empty if neither is used
+        """
+
+        rows = []
+        if self.split_blocks:
+            rows.append("Split accesses: {}  Extra block accesses: {}".format(self.split, self.extra))
+        if self.icache is not None:
+            rows.append("I-cache {}: {}".format(':'.join(str(field) for field in self.icache.cache.config()), self.icache.stats))
+
+        return '\n'.join(rows)
@@ -0,0 +1,238 @@
+import os
+import mmap
+import struct
+
+class BinaryTrace:
+    """Class for a compact fixed width binary trace, which can be replayed through a memory map
+
+    The file starts with a header of magic, version, record size, run length block bits and record count.
+    Each record is the 64 bit address, 16 bit access size, 8 bit op character and a pad byte, all little endian.
+    Text traces can have bigger sizes, those are clamped to MAX_SIZE when converting.
+    Replaying a binary trace skips text parsing completely, records are unpacked straight out of the map.
+
+    Version 2 traces are run length compacted with compact_records, accesses to the block accessed just before are
+    folded into R (repeated loads) and W (repeated stores) records, with the # of accesses in the size field.
+    The block size they were compacted at is kept in the header, they are only exact for caches with blocks at least that big.
+
+    Attributes:
+        self.trace_path (str): Path to the binary trace file
+        self.file (file object): Open binary trace file, None until opened
+        self.map (mmap): Memory map of the whole file, None until opened or if there are no records
+        self.count (int): # of records in the trace, read from the header
+        self.run_offset_bits (int): Block offset bits the trace was run length compacted at, None if it wasn't
+        self.start (int): # of records at the start of the trace that replaying skips
+
+    """
+
+    MAGIC = b'CSIMBIN\0'
+    VERSION = 1
+    COMPACTED_VERSION = 2
+    HEADER = struct.Struct('<8sHHIQ')
+    RECORD = struct.Struct('<QHBx')
+
+    #Largest size the 16 bit size field holds
+    MAX_SIZE = 0xFFFF
+
+    #Records are packed in batches of this many when writing
+    BATCH_SIZE = 1 << 16
+
+    def __init__(self, trace_path):
+        """Sets the trace path, the trace is not mapped until used as a context manager
+
+        Args:
+            trace_path (str): Path to the binary trace file
+
+        Returns:
+            None
+        """
+
+        self.trace_path = trace_path
+        self.file = None
+        self.map = None
+        self.count = 0
+        self.run_offset_bits = None
+        self.start = 0
+
+
+
+    def write(self, records, run_offset_bits=None):
+        """Converts records into a binary trace, replacing the file if it exists
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+            run_offset_bits (int): Block offset bits the records were run length compacted at, None if they weren't
+
+        Returns:
+            # of records written
+        """
+
+        count = 0
+        pack = self.RECORD.pack
+        max_size = self.MAX_SIZE
+        batch = []
+        version = self.VERSION if run_offset_bits is None else self.COMPACTED_VERSION
+        with open(self.trace_path, 'wb') as f:
+            #Count isn't known until the end, the header is written again once it is
+            f.write(self.HEADER.pack(self.MAGIC, version, self.RECORD.size, run_offset_bits or 0, 0))
+
+            for record in records:
+                size = record[2]
+                batch.append(pack(record[1], size if size <= max_size else max_size, ord(record[0])))
+                if len(batch) == self.BATCH_SIZE:
+                    f.write(b''.join(batch))
+                    count += len(batch)
+                    batch = []
+
+            f.write(b''.join(batch))
+            count += len(batch)
+
+            f.seek(0)
+            f.write(self.HEADER.pack(self.MAGIC, version, self.RECORD.size, run_offset_bits or 0, count))
+
+        return count
+
+
+
+    def __enter__(self):
+        """Opens and memory-maps the trace, checking the header
+
+        Args:
+            None
+
+        Returns:
+            self
+        """
+
+        self.file = open(self.trace_path, 'rb')
+        magic, version, record_size, run_offset_bits, self.count = self.HEADER.unpack(self.file.read(self.HEADER.size))
+        assert magic == self.MAGIC, "{} is not a binary trace".format(self.trace_path)
+        assert version in (self.VERSION, self.COMPACTED_VERSION) and record_size == self.RECORD.size, "{} is binary trace version {}, only versions {} and {} are supported".format(self.trace_path, version, self.VERSION, self.COMPACTED_VERSION)
+        if version == self.COMPACTED_VERSION:
+            self.run_offset_bits = run_offset_bits
+
+        expected_size = self.HEADER.size + self.count * self.RECORD.size
+        assert os.fstat(self.file.fileno()).st_size >= expected_size, "{} is truncated, header says it has {} records".format(self.trace_path, self.count)
+
+        if self.count:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self
+
+
+
+    def __exit__(self, *exc):
+        """Drops the memory map and closes the file
+
+        Args:
+            exc: Exception info, unused
+
+        Returns:
+            None
+        """
+
+        self.map = None
+        self.file.close()
+
+
+
+    def __iter__(self):
+        """Replays the records straight out of the memory map, from record self.start on
+
+        Args:
+            None
+
+        Yields:
+            (op, addr, size) tuple for each record, op is the (op)eration character
+        """
+
+        for addr, size, op in self.read(self.start, self.count):
+            yield chr(op), addr, size
+
+
+
+    def read(self, start, end):
+        """Unpacks a range of records straight out of the memory map, without going through the ones before it
+
+        Args:
+            start (int): Index of the first record
+            end (int): Index after the last record, cut off at the end of the trace
+
+        Returns:
+            Iterator of raw (addr, size, op) tuples, op is the op character's code
+        """
+
+        end = min(end, self.count)
+        if start >= end:
+            return iter(())
+
+        return self.RECORD.iter_unpack(memoryview(self.map)[self.HEADER.size + start * self.RECORD.size:self.HEADER.size + end * self.RECORD.size])
+
+
+
+def compact_records(records, offset_bit_size):
+    """Run length compacts records, folding accesses to the block accessed just before into R/W records
+    Each folded access is a guaranteed hit for any cache with blocks of at least 2^offset_bit_size bytes.
+    A modify counts as one repeated load and one repeated store. I records are passed through and don't end a run.
+
+    Args:
+        records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+        offset_bit_size (int): Block offset bits to compact at
+
+    Yields:
+        (op, addr, size) tuple for each compacted record, R/W records have the # of accesses as their size
+    """
+
+    #Counts have to fit in the 16 bit size field
+    max_count = BinaryTrace.MAX_SIZE
+    last_block = -1
+    run_addr = 0
+    loads = 0
+    stores = 0
+    for record in records:
+        op = record[0]
+        if op == 'L' or op == 'S' or op == 'M':
+            block = record[1] >> offset_bit_size
+            if block == last_block:
+                if op != 'S':
+                    loads += 1
+                    if loads == max_count:
+                        yield 'R', run_addr, loads
+                        loads = 0
+                if op != 'L':
+                    stores += 1
+                    if stores == max_count:
+                        yield 'W', run_addr, stores
+                        stores = 0
+                continue
+
+            #A new block ends the run
+            if loads:
+                yield 'R', run_addr, loads
+                loads = 0
+            if stores:
+                yield 'W', run_addr, stores
+                stores = 0
+            last_block = block
+            run_addr = record[1]
+
+        yield op, record[1], record[2]
+
+    if loads:
+        yield 'R', run_addr, loads
+    if stores:
+        yield 'W', run_addr, stores
+
+
+
+def is_binary_trace(trace_path):
+    """Checks if a file starts with the binary trace magic
+
+    Args:
+        trace_path (str): Path to the file to check
+
+    Returns:
+        True if the file is a binary trace
+    """
+
+    with open(trace_path, 'rb') as f:
+        return f.read(len(BinaryTrace.MAGIC)) == BinaryTrace.MAGIC
@@ -0,0 +1,203 @@
+from array import array
+from ReplacementPolicy import POLICIES
+
+class Cache:
+    """Class for a single simulated cache with specified sets/associativity/block size
+
+    Lines are kept in contiguous typed arrays, the line for way w of set s is at slot s*E + w.
+    The replacement policy keeps its own metadata per slot.
+
+    Attributes:
+        self.set_bit_size (int): # of bits required to determine set
+        self.num_lines (int): # of lines per set, this is also called associativity
+        self.offset_bit_size (int): # of bits required to determine block offset
+        self.max_addr_size (int): # of bits in each address
+        self.policy_name (str): Name of the replacement policy
+        self.seed (int): Seed for the random replacement policy
+        self.tags (array): Tag of each line, indexed by set*E + way
+        self.valid (bytearray): Valid flag of each line, indexed by set*E + way
+        self.lines (dict): Slot of each block address currently in the cache
+        self.policy (ReplacementPolicy): Replacement policy picking which line to evict
+        self.tag_bit_size: # of bits in each tag
+        self.set_mask (int): Mask applied to a block address (address shifted right by the offset bits) to get its set
+        self.stats (dict): Keeps track of # of hits/misses/evictions
+        self.evicted_block (int): Block address of the line evicted by the latest eviction, -1 before any
+
+    """
+
+    def __init__(self, set_bit_size, num_lines, offset_bit_size, policy_name='fifo', seed=None, max_addr_size=64):
+        """Creates the cache arrays and replacement policy
+
+        Args:
+            set_bit_size (int): # of bits required to determine set
+            num_lines (int): # of lines per set
+            offset_bit_size (int): # of bits required to determine block offset
+            policy_name (str): Name of the replacement policy, a key of POLICIES
+            seed (int): Seed for the random replacement policy
+            max_addr_size (int): # of bits in each address
+
+        Returns:
+            None
+        """
+
+        self.set_bit_size = set_bit_size
+        self.num_lines = num_lines
+        self.offset_bit_size = offset_bit_size
+        self.policy_name = policy_name
+        self.seed = seed
+        self.max_addr_size = max_addr_size
+
+        num_sets = 2**self.set_bit_size
+        num_slots = num_sets * self.num_lines
+        self.tags = array('Q', bytes(8 * num_slots))
+        self.valid = bytearray(num_slots)
+        self.lines = {}
+        self.policy = POLICIES[self.policy_name](num_sets, self.num_lines, self.seed)
+
+        #Also need to define sizes for tag/set/offset bits, plus the mask used to get the set from a block address
+        assert self.max_addr_size - self.set_bit_size - self.offset_bit_size > 0, "Number of set bits + number of offset bits needs to be less than {}, which is the number of bits in each address (set with -a)".format(self.max_addr_size)
+        self.tag_bit_size = self.max_addr_size - self.set_bit_size - self.offset_bit_size
+        self.set_mask = num_sets - 1
+
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.evicted_block = -1
+
+
+
+    def access_block(self, block):
+        """Checks the cache for a hit/miss/eviction based on params passed in
+        Resident lines are found with the self.lines index, so a lookup costs the same at any associativity
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+                         The set is the low set bits of the block, the tag is the rest
+
+        Returns:
+            'hit' if hit found
+            'miss' if miss with available empty spot, no eviction required
+            'miss eviction' if miss and eviction required, the evicted block address is left in self.evicted_block
+
+        """
+
+        #Check if block is resident - look for hit
+        slot = self.lines.get(block)
+        if slot is not None:
+            self.stats['hits'] += 1
+            if self.policy.updates_on_hit:
+                self.policy.hit(slot)
+            return 'hit'
+
+        self.stats['misses'] += 1
+        return self.fill_block(block)
+
+
+
+    def repeat_hits(self, block, count):
+        """Counts hits to the block that was accessed last, which is guaranteed to still be in the cache
+        Only policies whose state changes on such hits are updated, so this is O(1) for the rest
+
+        Args:
+            block (int): The block address accessed last
+            count (int): # of repeated accesses
+
+        Returns:
+            None
+        """
+
+        self.stats['hits'] += count
+        if self.policy.repeat_hits_change_state:
+            slot = self.lines[block]
+            for _ in range(count):
+                self.policy.hit(slot)
+
+
+
+    def fill_block(self, block):
+        """Places a block that isn't in the cache, evicting a line if its set is full
+        Only evictions are counted, so this is also used to place blocks without an access, such as exclusive victims
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+
+        Returns:
+            'miss' if there was an empty spot, no eviction required
+            'miss eviction' if a line was evicted, its block address is left in self.evicted_block
+
+        """
+
+        #Lines of a set are the slots set_index*E through set_index*E + E - 1
+        set_index = block & self.set_mask
+        base = set_index * self.num_lines
+
+        #See if any invalid bits, take those
+        slot = self.valid.find(0, base, base + self.num_lines)
+        result = 'miss'
+        if slot != -1:
+            self.valid[slot] = 1
+        else:
+            #Only case left - there are no empty spots, must evict the line the policy picks
+            self.stats['evictions'] += 1
+            slot = self.policy.victim(set_index)
+            self.evicted_block = (self.tags[slot] << self.set_bit_size) | set_index
+            del self.lines[self.evicted_block]
+            result = 'miss eviction'
+
+        self.tags[slot] = block >> self.set_bit_size
+        self.lines[block] = slot
+        self.policy.fill(slot)
+
+        return result
+
+
+
+    def invalidate_block(self, block):
+        """Removes a block from the cache if it is there, without counting an eviction
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+
+        Returns:
+            True if the block was in the cache
+        """
+
+        slot = self.lines.pop(block, None)
+        if slot is None:
+            return False
+
+        self.valid[slot] = 0
+        self.policy.remove(slot)
+        return True
+
+
+
+    def reset(self):
+        """Empties the cache and zeroes the stats in place, keeping the arrays instead of rebuilding them
+        The replacement policy starts over too, including the random policy's seed
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        self.valid[:] = bytes(len(self.valid))
+        self.lines.clear()
+        self.policy = POLICIES[self.policy_name](self.set_mask + 1, self.num_lines, self.seed)
+        for name in self.stats:
+            self.stats[name] = 0
+        self.evicted_block = -1
+
+
+
+    def config(self):
+        """Gets the configuration of this cache
+
+        Args:
+            None
+
+        Returns:
+            (s, E, b, policy) tuple
+        """
+
+        return (self.set_bit_size, self.num_lines, self.offset_bit_size, self.policy_name)
@@ -0,0 +1,189 @@
+class CacheHierarchy:
+    """Class to simulate a multi-level cache hierarchy in one pass over a trace
+
+    Level 1 sees every access, each level below only sees the misses of the level above it.
+    Inclusion policies:
+        nine: non-inclusive non-exclusive, levels fill on their own misses and evict independently
+        inclusive: like nine, but a block evicted from a level is also invalidated in every level above it
+        exclusive: a block lives in at most one level, it is filled into level 1 only and moved down as a victim
+
+    Attributes:
+        self.levels (list): Cache for each level, level 1 first
+        self.inclusion (str): Inclusion policy, one of INCLUSION_POLICIES
+        self.accesses (int): # of accesses made to level 1
+
+    """
+
+    INCLUSION_POLICIES = ('nine', 'inclusive', 'exclusive')
+
+    def __init__(self, levels, inclusion='nine'):
+        """Checks the levels fit the inclusion policy
+
+        Args:
+            levels (list): Cache for each level, level 1 first
+            inclusion (str): Inclusion policy, one of INCLUSION_POLICIES
+
+        Returns:
+            None
+        """
+
+        assert inclusion in self.INCLUSION_POLICIES, "Inclusion policy must be one of: {}".format(', '.join(self.INCLUSION_POLICIES))
+        offset_bit_sizes = [level.offset_bit_size for level in levels]
+        if inclusion == 'inclusive':
+            assert offset_bit_sizes == sorted(offset_bit_sizes), "Inclusive hierarchies need block sizes that don't shrink going down"
+        elif inclusion == 'exclusive':
+            assert len(set(offset_bit_sizes)) == 1, "Exclusive hierarchies need the same block size at every level"
+
+        self.levels = levels
+        self.inclusion = inclusion
+        self.accesses = 0
+
+
+
+    def access(self, addr):
+        """Sends one access down the hierarchy
+
+        Args:
+            addr (int): Address accessed
+
+        Returns:
+            None
+        """
+
+        self.accesses += 1
+        if self.inclusion == 'exclusive':
+            self.access_exclusive(addr >> self.levels[0].offset_bit_size)
+            return
+
+        for i, level in enumerate(self.levels):
+            result = level.access_block(addr >> level.offset_bit_size)
+            if result == 'hit':
+                return
+
+            if result == 'miss eviction' and self.inclusion == 'inclusive' and i:
+                self.back_invalidate(i, level.evicted_block)
+
+
+
+    def back_invalidate(self, level_index, block):
+        """Invalidates a block evicted from a level in every level above it, keeping the hierarchy inclusive
+
+        Args:
+            level_index (int): Index of the level that evicted the block
+            block (int): Evicted block address at that level's block size
+
+        Returns:
+            None
+        """
+
+        offset_bit_size = self.levels[level_index].offset_bit_size
+        for upper in self.levels[:level_index]:
+            #An upper level with smaller blocks can hold several pieces of the evicted block
+            shift = offset_bit_size - upper.offset_bit_size
+            first = block << shift
+            for upper_block in range(first, first + (1 << shift)):
+                upper.invalidate_block(upper_block)
+
+
+
+    def access_exclusive(self, block):
+        """Sends one access down an exclusive hierarchy
+        A hit below level 1 moves the block up to level 1, and every victim moves down one level
+
+        Args:
+            block (int): Block address, the same at every level
+
+        Returns:
+            None
+        """
+
+        first = self.levels[0]
+        if first.access_block(block) == 'hit':
+            return
+
+        #Level 1 missed and has already filled the block, look for it below and take it out of that level
+        for level in self.levels[1:]:
+            if block in level.lines:
+                level.stats['hits'] += 1
+                level.invalidate_block(block)
+                break
+            level.stats['misses'] += 1
+
+        #Cascade victims down, the last level's victim leaves the hierarchy
+        upper = first
+        for level in self.levels[1:]:
+            if upper.evicted_block == -1:
+                break
+            victim = upper.evicted_block
+            upper.evicted_block = -1
+            level.fill_block(victim)
+            upper = level
+        upper.evicted_block = -1
+
+
+
+    def run(self, records):
+        """Feeds the accesses of every load/store/modify record to the hierarchy
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            None
+        """
+
+        access = self.access
+        first = self.levels[0]
+        offset_bit_size = first.offset_bit_size
+        stats = first.stats
+        skip_repeats = not first.policy.repeat_hits_change_state
+        last_block = -1
+        for record in records:
+            op = record[0]
+            if op == 'L' or op == 'S' or op == 'M':
+                #An access to the block accessed just before is a level 1 hit, the block was filled into level 1
+                #by that access and nothing since could have evicted or invalidated it, so it skips the lookup
+                block = record[1] >> offset_bit_size
+                if skip_repeats and block == last_block:
+                    self.accesses += 1
+                    stats['hits'] += 1
+                else:
+                    access(record[1])
+                    last_block = block
+
+                #Modify is a load then a store to the same block
+                if op == 'M':
+                    if skip_repeats:
+                        self.accesses += 1
+                        stats['hits'] += 1
+                    else:
+                        access(record[1])
+
+            elif op == 'R' or op == 'W':
+                #Repeated accesses folded together by run length compaction all hit in level 1
+                self.accesses += record[2]
+                first.repeat_hits(record[1] >> first.offset_bit_size, record[2])
+
+
+
+    def report(self):
+        """Builds a table of per-level stats, with local (per access to the level) and global (per access to level 1) miss rates
+
+        Args:
+            None
+
+        Returns:
+            Table as a string, one row per level
+        """
+
+        rows = ["Inclusion: {}  Accesses: {}".format(self.inclusion, self.accesses),
+                "{:>5} {:>3} {:>6} {:>3} {:>7} {:>12} {:>12} {:>12} {:>10} {:>11}".format('level', 's', 'E', 'b', 'policy', 'hits', 'misses', 'evictions', 'local miss', 'global miss')]
+        for i, level in enumerate(self.levels, 1):
+            s, E, b, policy = level.config()
+            stats = level.stats
+            level_accesses = stats['hits'] + stats['misses']
+            local_rate = stats['misses'] / level_accesses if level_accesses else 0.0
+            global_rate = stats['misses'] / self.accesses if self.accesses else 0.0
+            rows.append("{:>5} {:>3} {:>6} {:>3} {:>7} {:>12} {:>12} {:>12} {:>10.4f} {:>11.4f}".format(i, s, E, b, policy, stats['hits'], stats['misses'], stats['evictions'], local_rate, global_rate))
+
+        return '\n'.join(rows)
@@ -0,0 +1,173 @@
+class CacheSweep:
+    """Class to simulate many cache configurations in one pass over a trace
+
+    Each trace record is parsed and decoded once and fed to every cache in the same pass.
+    Caches are grouped by block offset bits, so the block address is computed once per distinct b.
+    An access to the same block as the access before it is a guaranteed hit, for caches whose policy
+    isn't changed by such hits these are only counted per group, and added to the caches' stats at the end.
+
+    Attributes:
+        self.caches (list): Caches being simulated, in the order they were given
+        self.groups (list): (offset bits, caches that can skip repeated hits, caches that can't) for each distinct b
+
+    """
+
+    def __init__(self, caches):
+        """Groups the caches by block offset bits
+
+        Args:
+            caches (list): Cache objects to simulate
+
+        Returns:
+            None
+        """
+
+        self.caches = caches
+
+        groups = {}
+        for cache in caches:
+            fast, slow = groups.setdefault(cache.offset_bit_size, ([], []))
+            if cache.policy.repeat_hits_change_state:
+                slow.append(cache)
+            else:
+                fast.append(cache)
+        self.groups = [(offset_bit_size, fast, slow) for offset_bit_size, (fast, slow) in groups.items()]
+
+
+
+    def run(self, records, access_stream=None):
+        """Feeds every record to every cache
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+            access_stream (AccessStream): Splits straddling accesses and fetches I records, None to drop I records
+
+        Returns:
+            None
+        """
+
+        groups = self.groups
+        group_range = range(len(groups))
+        last_blocks = [-1] * len(groups)
+        repeats = [0] * len(groups)
+
+        #Only records that straddle a block or are I records go through the access stream
+        split_blocks = access_stream is not None and access_stream.split_blocks
+        if split_blocks:
+            block_size = 1 << access_stream.offset_bit_size
+            offset_mask = block_size - 1
+        fetch = access_stream.fetch if access_stream is not None and access_stream.icache is not None else None
+
+        for record in records:
+            op = record[0]
+            if op == 'L' or op == 'S' or op == 'M':
+                addr = record[1]
+
+                #A split access's pieces before its last block go through access_pieces, the last one carries on as this record
+                if split_blocks and (addr & offset_mask) + record[2] > block_size:
+                    pieces = access_stream.split_access(addr, record[2])
+                    self.access_pieces(op, pieces[:-1], last_blocks, repeats)
+                    addr = pieces[-1][0]
+
+                for i in group_range:
+                    offset_bit_size, fast, slow = groups[i]
+                    block = addr >> offset_bit_size
+
+                    #Same block as the last access, only caches with hit-sensitive policies need a lookup
+                    if block == last_blocks[i]:
+                        repeats[i] += 1
+                        for cache in slow:
+                            cache.access_block(block)
+                    else:
+                        last_blocks[i] = block
+                        for cache in fast:
+                            cache.access_block(block)
+                        for cache in slow:
+                            cache.access_block(block)
+
+                    #Modify is a load then a store to the same block, the store always hits
+                    if op == 'M':
+                        repeats[i] += 1
+                        for cache in slow:
+                            cache.access_block(block)
+
+            elif op == 'R' or op == 'W':
+                #Repeated accesses folded together by run length compaction
+                for i in group_range:
+                    offset_bit_size, fast, slow = groups[i]
+                    repeats[i] += record[2]
+                    for cache in slow:
+                        cache.repeat_hits(record[1] >> offset_bit_size, record[2])
+
+            elif op == 'I' and fetch is not None:
+                fetch(record[1], record[2])
+
+        for i in group_range:
+            for cache in groups[i][1]:
+                cache.stats['hits'] += repeats[i]
+
+
+
+    def access_pieces(self, op, pieces, last_blocks, repeats):
+        """Feeds pieces of a split access to every cache, the same way run feeds a record
+
+        Args:
+            op (str): 'L', 'S' or 'M', the op of every piece
+            pieces (list): (addr, size) tuple of each piece
+            last_blocks (list): Block of the last access of each group, updated in place
+            repeats (list): # of repeated accesses of each group not yet added to its caches, updated in place
+
+        Returns:
+            None
+        """
+
+        for addr, size in pieces:
+            for i, (offset_bit_size, fast, slow) in enumerate(self.groups):
+                block = addr >> offset_bit_size
+                if block == last_blocks[i]:
+                    repeats[i] += 1
+                else:
+                    last_blocks[i] = block
+                    for cache in fast:
+                        cache.access_block(block)
+                for cache in slow:
+                    cache.access_block(block)
+
+                if op == 'M':
+                    repeats[i] += 1
+                    for cache in slow:
+                        cache.access_block(block)
+
+
+
+    def results(self):
+        """Gets the configuration and stats of each cache
+
+        Args:
+            None
+
+        Returns:
+            List of ((s, E, b, policy), stats) tuples
+        """
+
+        return [(cache.config(), cache.stats) for cache in self.caches]
+
+
+
+def format_report(results):
+    """Builds a table of hits/misses/evictions for each configuration
+
+    Args:
+        results (list): ((s, E, b, policy), stats) tuples, one per configuration
+
+    Returns:
+        Table as a string, one row per configuration
+    """
+
+    rows = ["{:>3} {:>6} {:>3} {:>7} {:>12} {:>12} {:>12} {:>9}".format('s', 'E', 'b', 'policy', 'hits', 'misses', 'evictions', 'miss rate')]
+    for (s, E, b, policy), stats in results:
+        accesses = stats['hits'] + stats['misses']
+        miss_rate = stats['misses'] / accesses if accesses else 0.0
+        rows.append("{:>3} {:>6} {:>3} {:>7} {:>12} {:>12} {:>12} {:>9.4f}".format(s, E, b, policy, stats['hits'], stats['misses'], stats['evictions'], miss_rate))
+
+    return '\n'.join(rows)
@@ -0,0 +1,71 @@
+import os
+import pickle
+
+class Checkpoint:
+    """Class to snapshot a single cache run to disk so it can be resumed
+
+    A snapshot is a pickled dict of the full simulator state (cache arrays, replacement policy, counters,
+    # of trace records already simulated), plus info about the run to check a resume against.
+    Snapshots are written to a temporary file and renamed over the old one, so a crash while saving leaves the previous snapshot intact.
+
+    Attributes:
+        self.path (str): Path of the checkpoint file
+        self.every (int): # of trace records between snapshots
+        self.info (dict): Added to every snapshot, such as the size of the trace
+
+    """
+
+    VERSION = 2
+
+    def __init__(self, path, every=1000000, info=None):
+        """Sets the checkpoint path and interval
+
+        Args:
+            path (str): Path of the checkpoint file
+            every (int): # of trace records between snapshots
+            info (dict): Added to every snapshot, such as the size of the trace
+
+        Returns:
+            None
+        """
+
+        assert every > 0, "Checkpoint interval must be positive"
+        self.path = path
+        self.every = every
+        self.info = info or {}
+
+
+
+    def save(self, state):
+        """Atomically replaces the checkpoint file with a new snapshot
+
+        Args:
+            state (dict): Simulator state to save, must be picklable
+
+        Returns:
+            None
+        """
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(dict(state, version=self.VERSION, **self.info), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+
+    def load(self):
+        """Loads the snapshot in the checkpoint file
+
+        Args:
+            None
+
+        Returns:
+            Saved simulator state dict
+        """
+
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        assert state.get('version') == self.VERSION, "{} is checkpoint version {}, only version {} is supported".format(self.path, state.get('version'), self.VERSION)
+        return state
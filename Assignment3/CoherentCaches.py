@@ -0,0 +1,312 @@
+from array import array
+from collections import Counter
+
+class CoherentCaches:
+    """Class to simulate private per-core caches kept coherent with the MESI protocol
+
+    Every core has its own Cache of the same geometry. A directory keeps, for every block cached anywhere, a bitmask
+    of the cores holding it, the core holding it Exclusive or Modified if any, and whether it is dirty.
+    Line states follow from the directory: a block a core holds is Modified if it is the owner and the block is dirty,
+    Exclusive if it is the owner and the block is clean, and Shared otherwise.
+        Load miss: Exclusive if no other core has the block, else Shared, and a Modified or Exclusive copy
+                   elsewhere drops to Shared (a Modified one is written back)
+        Store hit: Modified, a Shared copy first invalidates every other copy (an upgrade), Exclusive upgrades silently
+        Store miss: read for ownership, every other copy is invalidated (a Modified one is written back), then Modified
+        Eviction: the core leaves the directory entry, a Modified line is written back
+    A miss on a block this core lost to an invalidation, and hasn't held since, is a coherence miss.
+    Loads hit without touching the directory, and an access to the block a core accessed last skips the lookup
+    like the single core simulator does, until the block is invalidated, so per-access cost stays close to one cache's.
+
+    Attributes:
+        self.caches (list): Private Cache of each core
+        self.offset_bit_size (int): # of bits required to determine block offset, the same for every core
+        self.sharers (dict): Bitmask of the cores holding each cached block
+        self.owner (dict): Core holding each block Exclusive or Modified, blocks held Shared aren't in it
+        self.dirty (set): Blocks held Modified by their owner
+        self.lost (list): Set of blocks each core lost to invalidations and hasn't missed on since
+        self.last_blocks (list): Block each core accessed last, -1 if it was invalidated since
+        self.skip_repeats (bool): Whether repeated accesses to a core's last block can skip the lookup
+        self.coherence_misses (array): # of coherence misses of each core
+        self.invalidations (array): # of lines of each core invalidated by other cores' stores
+        self.upgrades (array): # of stores of each core that hit a Shared line, invalidating any other copies
+        self.writebacks (array): # of Modified lines of each core written back, on eviction or when another core took the block
+        self.block_invalidations (Counter): # of invalidations of each block, over all cores
+        self.block_coherence_misses (Counter): # of coherence misses on each block, over all cores
+        self.accesses (int): # of accesses simulated, over all cores
+
+    """
+
+    #Number of blocks listed in the report, by invalidations plus coherence misses
+    TOP_BLOCKS = 10
+
+    def __init__(self, caches):
+        """Sets up the directory and per-core counters
+
+        Args:
+            caches (list): Empty private Cache of each core, all with the same block size
+
+        Returns:
+            None
+        """
+
+        assert len(set(cache.offset_bit_size for cache in caches)) == 1, "Every core's cache needs the same block size"
+        num_cores = len(caches)
+        self.caches = caches
+        self.offset_bit_size = caches[0].offset_bit_size
+        self.sharers = {}
+        self.owner = {}
+        self.dirty = set()
+        self.lost = [set() for _ in range(num_cores)]
+        self.last_blocks = [-1] * num_cores
+        self.skip_repeats = not caches[0].policy.repeat_hits_change_state
+        self.coherence_misses = array('Q', bytes(8 * num_cores))
+        self.invalidations = array('Q', bytes(8 * num_cores))
+        self.upgrades = array('Q', bytes(8 * num_cores))
+        self.writebacks = array('Q', bytes(8 * num_cores))
+        self.block_invalidations = Counter()
+        self.block_coherence_misses = Counter()
+        self.accesses = 0
+
+
+
+    def access(self, core, block, store):
+        """Simulates one access of a core
+
+        Args:
+            core (int): Core making the access
+            block (int): The block address, address shifted right by the offset bits
+            store (bool): Whether the access is a store
+
+        Returns:
+            'hit', 'miss' or 'miss eviction', the result in the core's own cache
+        """
+
+        self.accesses += 1
+        cache = self.caches[core]
+
+        #Repeated access, the line is still there since invalidations reset last_blocks
+        if self.skip_repeats and block == self.last_blocks[core]:
+            cache.stats['hits'] += 1
+            if store:
+                self.store_hit(core, block)
+            return 'hit'
+
+        result = cache.access_block(block)
+        self.last_blocks[core] = block
+        if result == 'hit':
+            if store:
+                self.store_hit(core, block)
+            return result
+
+        if result == 'miss eviction':
+            self.evict(core, cache.evicted_block)
+
+        lost = self.lost[core]
+        if block in lost:
+            lost.remove(block)
+            self.coherence_misses[core] += 1
+            self.block_coherence_misses[block] += 1
+
+        bit = 1 << core
+        others = self.sharers.get(block, 0)
+        if store:
+            #Read for ownership
+            if others:
+                self.invalidate_others(core, block, others)
+            self.sharers[block] = bit
+            self.owner[block] = core
+            self.dirty.add(block)
+        elif others:
+            #Another core's Exclusive or Modified copy drops to Shared
+            owner = self.owner.pop(block, None)
+            if owner is not None and block in self.dirty:
+                self.dirty.remove(block)
+                self.writebacks[owner] += 1
+            self.sharers[block] = others | bit
+        else:
+            self.sharers[block] = bit
+            self.owner[block] = core
+
+        return result
+
+
+
+    def store_hit(self, core, block):
+        """Makes a line the core already holds Modified, invalidating other copies if it was Shared
+
+        Args:
+            core (int): Core making the store
+            block (int): The block address
+
+        Returns:
+            None
+        """
+
+        if self.owner.get(block) == core:
+            self.dirty.add(block)
+            return
+
+        self.upgrades[core] += 1
+        others = self.sharers[block] & ~(1 << core)
+        if others:
+            self.invalidate_others(core, block, others)
+        self.sharers[block] = 1 << core
+        self.owner[block] = core
+        self.dirty.add(block)
+
+
+
+    def invalidate_others(self, core, block, others):
+        """Invalidates the copies of a block held by other cores, writing back a Modified one
+
+        Args:
+            core (int): Core taking the block
+            block (int): The block address
+            others (int): Bitmask of the cores holding the block, may include core
+
+        Returns:
+            None
+        """
+
+        owner = self.owner.pop(block, None)
+        if owner is not None and owner != core and block in self.dirty:
+            self.dirty.remove(block)
+            self.writebacks[owner] += 1
+
+        others &= ~(1 << core)
+        other = 0
+        while others:
+            if others & 1:
+                self.caches[other].invalidate_block(block)
+                self.lost[other].add(block)
+                self.invalidations[other] += 1
+                self.block_invalidations[block] += 1
+                if self.last_blocks[other] == block:
+                    self.last_blocks[other] = -1
+            others >>= 1
+            other += 1
+
+
+
+    def evict(self, core, block):
+        """Takes a core out of the directory entry of a block its cache evicted
+
+        Args:
+            core (int): Core that evicted the block
+            block (int): The evicted block address
+
+        Returns:
+            None
+        """
+
+        sharers = self.sharers[block] & ~(1 << core)
+        if sharers:
+            self.sharers[block] = sharers
+        else:
+            del self.sharers[block]
+
+        if self.owner.get(block) == core:
+            del self.owner[block]
+            if block in self.dirty:
+                self.dirty.remove(block)
+                self.writebacks[core] += 1
+
+
+
+    def run(self, records):
+        """Feeds interleaved per-core records to the caches
+
+        Args:
+            records (iterable): (core, op, addr) tuples in the order the accesses happen
+
+        Returns:
+            None
+        """
+
+        access = self.access
+        offset_bit_size = self.offset_bit_size
+        for core, op, addr in records:
+            if op == 'L':
+                access(core, addr >> offset_bit_size, False)
+            elif op == 'S':
+                access(core, addr >> offset_bit_size, True)
+            elif op == 'M':
+                #Modify is a load then a store to the same block
+                block = addr >> offset_bit_size
+                access(core, block, False)
+                access(core, block, True)
+            else:
+                assert op != 'R' and op != 'W', "Run length compacted traces fold accesses other cores could come between, they can't be used for coherence"
+
+
+
+    def report(self):
+        """Builds a table of per-core stats, totals, and the blocks with the most coherence traffic
+
+        Args:
+            None
+
+        Returns:
+            Table as a string
+        """
+
+        rows = ["Cores: {}  Accesses: {}".format(len(self.caches), self.accesses),
+                "{:>5} {:>12} {:>12} {:>12} {:>12} {:>13} {:>10} {:>10}".format('core', 'hits', 'misses', 'evictions', 'coherence', 'invalidations', 'upgrades', 'writebacks')]
+        totals = [0] * 7
+        for core, cache in enumerate(self.caches):
+            values = [cache.stats['hits'], cache.stats['misses'], cache.stats['evictions'], self.coherence_misses[core], self.invalidations[core], self.upgrades[core], self.writebacks[core]]
+            totals = [total + value for total, value in zip(totals, values)]
+            rows.append("{:>5} {:>12} {:>12} {:>12} {:>12} {:>13} {:>10} {:>10}".format(core, *values))
+        rows.append("{:>5} {:>12} {:>12} {:>12} {:>12} {:>13} {:>10} {:>10}".format('all', *totals))
+
+        traffic = self.block_invalidations + self.block_coherence_misses
+        if traffic:
+            rows.append("Blocks with the most coherence traffic:")
+            rows.append("{:>18} {:>13} {:>12}".format('address', 'invalidations', 'coherence'))
+            for block, count in traffic.most_common(self.TOP_BLOCKS):
+                rows.append("{:>18} {:>13} {:>12}".format(hex(block << self.offset_bit_size), self.block_invalidations[block], self.block_coherence_misses[block]))
+
+        return '\n'.join(rows)
+
+
+
+def interleave(trace_readers):
+    """Interleaves per-core traces one record at a time, round robin, dropping traces as they run out
+
+    Args:
+        trace_readers (list): Open TraceReader of each core's trace, core 0 first
+
+    Yields:
+        (core, op, addr) tuple for each record
+    """
+
+    iterators = [(core, iter(trace_reader)) for core, trace_reader in enumerate(trace_readers)]
+    while iterators:
+        running = []
+        for core, iterator in iterators:
+            record = next(iterator, None)
+            if record is not None:
+                running.append((core, iterator))
+                yield core, record[0], record[1]
+        iterators = running
+
+
+
+def core_column(trace_reader, num_cores):
+    """Reads the core of each record of a single trace from a third column, such as " S 7ff000398,8,1"
+    Records without the column, such as instruction loads, go to core 0
+
+    Args:
+        trace_reader (TraceReader): Open text trace, parsed in this process so trace lines are kept
+        num_cores (int): # of cores simulated, every core id must be less
+
+    Yields:
+        (core, op, addr) tuple for each record
+    """
+
+    for op, addr, size, trace in trace_reader:
+        assert trace is not None, "A trace with a core column must be a text trace"
+        fields = trace.split(',')
+        core = int(fields[2]) if len(fields) > 2 else 0
+        assert core < num_cores, "Core {} is past the {} cores simulated: {}".format(core, num_cores, trace)
+        yield core, op, addr
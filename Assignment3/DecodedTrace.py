@@ -0,0 +1,157 @@
+import os
+import mmap
+from array import array
+
+class DecodedTrace:
+    """Class for a trace decoded once into flat op, address and size columns on disk
+
+    The columns are memory-mapped, so any number of processes can replay the same decoded trace
+    without parsing it again or copying it into their own memory.
+    Ops are stored one byte per record (the ASCII op character), addresses as unsigned 64 bit ints,
+    and sizes as unsigned 32 bit ints like ParallelParser's, since text traces can have sizes past 16 bits
+    (the size is the # of accesses for the R/W records of a run length compacted trace).
+
+    Attributes:
+        self.dir_path (str): Directory holding the ops, addrs and sizes column files
+        self.files (list): Open column files, empty until opened
+        self.ops (memoryview): Memory-mapped ops column, one int per record
+        self.addrs (memoryview): Memory-mapped addrs column, one int per record
+        self.sizes (memoryview): Memory-mapped sizes column, one int per record
+
+    """
+
+    #Records are written in batches of this many, so decoding uses a fixed amount of memory
+    BATCH_SIZE = 1 << 16
+
+    def __init__(self, dir_path):
+        """Sets the directory of the decoded trace, columns are not mapped until used as a context manager
+
+        Args:
+            dir_path (str): Directory holding the ops, addrs and sizes column files
+
+        Returns:
+            None
+        """
+
+        self.dir_path = dir_path
+        self.files = []
+        self.ops = None
+        self.addrs = None
+        self.sizes = None
+
+
+
+    def write(self, records):
+        """Decodes records into the column files, replacing any that already exist
+
+        Args:
+            records (iterable): (op, addr, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            # of records written
+        """
+
+        count = 0
+        ops = bytearray()
+        addrs = array('Q')
+        sizes = array('I')
+        with open(os.path.join(self.dir_path, 'ops'), 'wb') as ops_file, open(os.path.join(self.dir_path, 'addrs'), 'wb') as addrs_file, open(os.path.join(self.dir_path, 'sizes'), 'wb') as sizes_file:
+            for record in records:
+                ops.append(ord(record[0]))
+                addrs.append(record[1])
+                sizes.append(record[2])
+
+                if len(ops) == self.BATCH_SIZE:
+                    ops_file.write(ops)
+                    addrs.tofile(addrs_file)
+                    sizes.tofile(sizes_file)
+                    count += len(ops)
+                    ops = bytearray()
+                    addrs = array('Q')
+                    sizes = array('I')
+
+            ops_file.write(ops)
+            addrs.tofile(addrs_file)
+            sizes.tofile(sizes_file)
+            count += len(ops)
+
+        return count
+
+
+
+    def append(self, ops, addrs, sizes):
+        """Appends a batch of already decoded records to the column files, creating them if needed
+
+        Args:
+            ops (bytearray): ASCII op character of each record
+            addrs (array): Unsigned 64 bit address of each record
+            sizes (array): Unsigned 32 bit size of each record
+
+        Returns:
+            None
+        """
+
+        with open(os.path.join(self.dir_path, 'ops'), 'ab') as ops_file, open(os.path.join(self.dir_path, 'addrs'), 'ab') as addrs_file, open(os.path.join(self.dir_path, 'sizes'), 'ab') as sizes_file:
+            ops_file.write(ops)
+            addrs.tofile(addrs_file)
+            sizes.tofile(sizes_file)
+
+
+
+    def __enter__(self):
+        """Memory-maps every column read only
+
+        Args:
+            None
+
+        Returns:
+            self
+        """
+
+        columns = []
+        for name, type_code in (('ops', 'B'), ('addrs', 'Q'), ('sizes', 'I')):
+            f = open(os.path.join(self.dir_path, name), 'rb')
+            self.files.append(f)
+
+            #Empty files can't be mapped, an empty trace is just empty columns
+            if os.fstat(f.fileno()).st_size == 0:
+                columns.append(memoryview(b'').cast(type_code))
+            else:
+                columns.append(memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(type_code))
+
+        self.ops, self.addrs, self.sizes = columns
+
+        return self
+
+
+
+    def __exit__(self, *exc):
+        """Drops the memory maps and closes the column files, the maps are unmapped once nothing refers to them
+
+        Args:
+            exc: Exception info, unused
+
+        Returns:
+            None
+        """
+
+        self.ops = None
+        self.addrs = None
+        self.sizes = None
+        for f in self.files:
+            f.close()
+        self.files = []
+
+
+
+    def __iter__(self):
+        """Replays the decoded records straight from the memory maps
+
+        Args:
+            None
+
+        Yields:
+            (op, addr, size) tuple for each record, op is the (op)eration character
+        """
+
+        return zip(map(chr, self.ops), self.addrs, self.sizes)
@@ -0,0 +1,226 @@
+from array import array
+from StackDistance import ReuseStack
+
+class LocalityProfile:
+    """Class to profile a trace's locality independently of any cache geometry
+
+    Reuse distance is the # of distinct other blocks accessed since the last access to the same block (the LRU stack
+    distance, from a ReuseStack), reuse time is the # of accesses since then. Both are kept as histograms of log2
+    buckets: bucket 0 holds 0, bucket k holds 2^(k-1) through 2^k - 1. The working set of a window of accesses
+    is the # of distinct blocks accessed in it.
+    The latest access of every block is kept in one dict, which also tells whether a block was already counted in the
+    current window, so memory grows with the # of distinct blocks and the # of windows, not the # of accesses.
+
+    Attributes:
+        self.offset_bit_size (int): # of bits required to determine block offset
+        self.window (int): # of accesses per working set window
+        self.stack (ReuseStack): Stack over all blocks, giving reuse distances
+        self.last_access (dict): Index of the latest access to each block seen
+        self.distance_hist (array): # of accesses in each reuse distance bucket
+        self.time_hist (array): # of accesses in each reuse time bucket
+        self.working_sets (array): # of distinct blocks accessed in each full window
+        self.window_blocks (int): # of distinct blocks accessed in the current window so far
+        self.accesses (int): # of accesses seen
+        self.cold (int): # of first accesses to a block, which have no reuse distance or time
+
+    """
+
+    #Enough log2 buckets for any 64 bit distance
+    NUM_BUCKETS = 65
+
+    def __init__(self, offset_bit_size, window=10000):
+        """Creates empty histograms
+
+        Args:
+            offset_bit_size (int): # of bits required to determine block offset
+            window (int): # of accesses per working set window
+
+        Returns:
+            None
+        """
+
+        assert window > 0, "Window size must be positive"
+        self.offset_bit_size = offset_bit_size
+        self.window = window
+        self.stack = ReuseStack()
+        self.last_access = {}
+        self.distance_hist = array('Q', bytes(8 * self.NUM_BUCKETS))
+        self.time_hist = array('Q', bytes(8 * self.NUM_BUCKETS))
+        self.working_sets = array('Q')
+        self.window_blocks = 0
+        self.accesses = 0
+        self.cold = 0
+
+
+
+    def access_block(self, block):
+        """Records the reuse distance and time of an access, and counts its block in the current window
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+
+        Returns:
+            None
+        """
+
+        time = self.accesses
+        last = self.last_access.get(block)
+        distance = self.stack.access(block)
+        if last is None:
+            self.cold += 1
+        else:
+            self.distance_hist[distance.bit_length()] += 1
+            self.time_hist[(time - last).bit_length()] += 1
+
+        #Blocks last accessed before the window started are new to it
+        if last is None or time - last > time % self.window:
+            self.window_blocks += 1
+        self.last_access[block] = time
+
+        self.accesses = time + 1
+        if self.accesses % self.window == 0:
+            self.working_sets.append(self.window_blocks)
+            self.window_blocks = 0
+
+
+
+    def repeat(self, block, count):
+        """Records accesses repeating the one just before, at reuse distance 0 and reuse time 1
+        The stack is left alone since the block is already on top
+
+        Args:
+            block (int): The block address accessed last
+            count (int): # of repeated accesses
+
+        Returns:
+            None
+        """
+
+        self.distance_hist[0] += count
+        self.time_hist[1] += count
+
+        #Every window the repeats reach has just this block, besides the one they start in unless they start it
+        window = self.window
+        end = self.accesses + count
+        if self.accesses % window == 0:
+            self.window_blocks += 1
+        while (self.accesses // window + 1) * window <= end:
+            self.working_sets.append(self.window_blocks)
+            self.accesses = (self.accesses // window + 1) * window
+            self.window_blocks = 1 if self.accesses < end else 0
+
+        self.accesses = end
+        self.last_access[block] = end - 1
+
+
+
+    def run(self, records):
+        """Feeds the accesses of every load/store/modify record to the profile
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            None
+        """
+
+        offset_bit_size = self.offset_bit_size
+        for record in records:
+            op = record[0]
+            if op == 'L' or op == 'S':
+                self.access_block(record[1] >> offset_bit_size)
+            elif op == 'M':
+                #Modify is a load then a store to the same block
+                block = record[1] >> offset_bit_size
+                self.access_block(block)
+                self.repeat(block, 1)
+            elif op == 'R' or op == 'W':
+                #Repeated accesses folded together by run length compaction
+                self.repeat(record[1] >> offset_bit_size, record[2])
+
+
+
+    def window_sizes(self):
+        """Gets the working set of every window, including the last partial one
+
+        Args:
+            None
+
+        Returns:
+            List of (first access, # of accesses, # of distinct blocks) tuples
+        """
+
+        sizes = [(i * self.window, self.window, blocks) for i, blocks in enumerate(self.working_sets)]
+        partial = self.accesses % self.window
+        if partial:
+            sizes.append((self.accesses - partial, partial, self.window_blocks))
+
+        return sizes
+
+
+
+    def buckets(self, hist):
+        """Turns a log2 histogram into rows up to its last non-empty bucket
+
+        Args:
+            hist (array): # of accesses in each bucket
+
+        Returns:
+            List of (low, high, count) tuples, the range of each bucket is low through high inclusive
+        """
+
+        last = max((k for k in range(self.NUM_BUCKETS) if hist[k]), default=-1)
+        return [(0 if k == 0 else 1 << (k - 1), 0 if k == 0 else (1 << k) - 1, hist[k]) for k in range(last + 1)]
+
+
+
+    def report(self):
+        """Builds tables of the reuse distance and reuse time histograms and a working set summary
+
+        Args:
+            None
+
+        Returns:
+            Tables as a string
+        """
+
+        accesses = self.accesses or 1
+        rows = ["Accesses: {}  Distinct blocks: {}  Cold accesses: {}  b = {}".format(self.accesses, len(self.last_access), self.cold, self.offset_bit_size)]
+        for title, hist in (("Reuse distance (distinct blocks between reuses)", self.distance_hist), ("Reuse time (accesses between reuses)", self.time_hist)):
+            rows += ["", title, "{:>21} {:>12} {:>10}".format('range', 'accesses', 'cumulative')]
+            cumulative = 0
+            for low, high, count in self.buckets(hist):
+                cumulative += count
+                rows.append("{:>21} {:>12} {:>10.4f}".format("{}-{}".format(low, high), count, cumulative / accesses))
+
+        sizes = [blocks for first, count, blocks in self.window_sizes()]
+        if sizes:
+            rows += ["", "Working set per {} access window, in blocks (bytes)".format(self.window),
+                     "windows: {}  min: {} ({})  mean: {:.1f} ({:.0f})  max: {} ({})".format(
+                         len(sizes), min(sizes), min(sizes) << self.offset_bit_size, sum(sizes) / len(sizes),
+                         sum(sizes) / len(sizes) * (1 << self.offset_bit_size), max(sizes), max(sizes) << self.offset_bit_size)]
+
+        return '\n'.join(rows)
+
+
+
+    def write_csv(self, prefix):
+        """Writes the histograms and working sets to <prefix>_reuse_distance.csv, <prefix>_reuse_time.csv and <prefix>_working_set.csv
+
+        Args:
+            prefix (str): Path prefix of the CSV files
+
+        Returns:
+            None
+        """
+
+        for name, hist in (('reuse_distance', self.distance_hist), ('reuse_time', self.time_hist)):
+            with open("{}_{}.csv".format(prefix, name), 'w') as f:
+                f.write("low,high,count\n")
+                for low, high, count in self.buckets(hist):
+                    f.write("{},{},{}\n".format(low, high, count))
+
+        with open("{}_working_set.csv".format(prefix), 'w') as f:
+            f.write("first_access,accesses,blocks,bytes\n")
+            for first, count, blocks in self.window_sizes():
+                f.write("{},{},{},{}\n".format(first, count, blocks, blocks << self.offset_bit_size))
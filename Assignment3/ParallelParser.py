@@ -0,0 +1,137 @@
+import os
+import mmap
+import itertools
+from array import array
+from collections import deque
+from multiprocessing import Pool
+
+#Op characters a chunk can be split into fields for
+OPS = b'ILSMRW'
+
+class ParallelParser:
+    """Class to parse a large text trace across a pool of worker processes
+
+    The trace is split into chunks of about CHUNK_SIZE bytes that end on a newline. Each worker memory-maps the file,
+    parses its chunk into op, address and size columns, and sends the columns back, which is much cheaper to pickle
+    than tuples. Chunks are handed back in trace order, with only a few in flight per worker, so memory stays flat
+    however big the trace is and the simulator sees the records in the same order as a serial parse.
+
+    Attributes:
+        self.trace_path (str): Path to the text trace, must be a regular uncompressed file
+        self.jobs (int): # of worker processes
+        self.start (int): Byte offset to start parsing at, the start of a line
+
+    """
+
+    CHUNK_SIZE = 1 << 23
+
+    #Chunks queued or parsed ahead of the one being simulated, per worker
+    CHUNKS_AHEAD = 2
+
+    def __init__(self, trace_path, jobs, start=0):
+        """Sets the trace and pool size
+
+        Args:
+            trace_path (str): Path to the text trace, must be a regular uncompressed file
+            jobs (int): # of worker processes
+            start (int): Byte offset to start parsing at, the start of a line
+
+        Returns:
+            None
+        """
+
+        self.trace_path = trace_path
+        self.jobs = jobs
+        self.start = start
+
+
+
+    def chunks(self):
+        """Splits the trace into newline aligned byte ranges
+
+        Args:
+            None
+
+        Yields:
+            (start, end) byte range of each chunk, every chunk but the last ends just after a newline
+        """
+
+        size = os.path.getsize(self.trace_path)
+        if size <= self.start:
+            return
+
+        with open(self.trace_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as trace_map:
+            start = self.start
+            while start < size:
+                end = trace_map.find(b'\n', min(start + self.CHUNK_SIZE, size) - 1)
+                end = size if end == -1 else end + 1
+                yield start, end
+                start = end
+
+
+
+    def __iter__(self):
+        """Parses the chunks in parallel and goes through their records in trace order
+
+        Args:
+            None
+
+        Yields:
+            (op, addr, size, trace) tuple like TraceReader gives, trace is always None since lines aren't sent back
+        """
+
+        with Pool(self.jobs) as pool:
+            pending = deque()
+            for chunk in self.chunks():
+                pending.append(pool.apply_async(parse_chunk, (self.trace_path, chunk)))
+                if len(pending) < self.jobs * self.CHUNKS_AHEAD:
+                    continue
+
+                ops, addrs, sizes = pending.popleft().get()
+                for op, addr, size in zip(ops, addrs, sizes):
+                    yield op, addr, size, None
+
+            while pending:
+                ops, addrs, sizes = pending.popleft().get()
+                for op, addr, size in zip(ops, addrs, sizes):
+                    yield op, addr, size, None
+
+
+
+def parse_chunk(trace_path, chunk):
+    """Worker process entry point, parses the non-empty lines of one chunk of a text trace
+
+    Args:
+        trace_path (str): Path to the text trace
+        chunk (tuple): (start, end) byte range of the chunk, aligned to lines
+
+    Returns:
+        (ops, addrs, sizes) tuple, ops is a string of op characters, addrs is an array of unsigned 64 bit ints
+        and sizes is an array of unsigned 32 bit ints, one entry per record
+    """
+
+    start, end = chunk
+    with open(trace_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as trace_map:
+        data = trace_map[start:end]
+
+    #Valgrind lines are always op, address, size, so the whole chunk splits into triples of fields in a few C calls
+    fields = data.replace(b',', b' ').split()
+    ops = b''.join(fields[0::3])
+    if len(fields) % 3 == 0 and len(ops) * 3 == len(fields) and not ops.translate(None, OPS):
+        addrs = array('Q', map(int, fields[1::3], itertools.repeat(16)))
+        sizes = array('I', map(int, fields[2::3]))
+        return ops.decode('ascii'), addrs, sizes
+
+    #Otherwise, such as lines without a size, fall back to the same line-by-line parsing as TraceReader
+    ops = bytearray()
+    addrs = array('Q')
+    sizes = array('I')
+    for line in data.split(b'\n'):
+        line = line.strip()
+        if line:
+            trace_split = line[2:].split(b',')
+            ops.append(line[0])
+            addrs.append(int(trace_split[0].replace(b' ', b''), base=16))
+            sizes.append(int(trace_split[1]) if len(trace_split) > 1 else 0)
+
+    return ops.decode('ascii'), addrs, sizes
@@ -0,0 +1,85 @@
+import tempfile
+from multiprocessing import Pool
+from Cache import Cache
+from CacheSweep import CacheSweep
+from DecodedTrace import DecodedTrace
+
+class ParallelSweep:
+    """Class to sweep cache configurations across a pool of worker processes
+
+    The trace is decoded once into a DecodedTrace, which every worker memory-maps instead of parsing the trace itself.
+    Configurations are dealt out to the workers, each worker runs a one-pass CacheSweep over its share.
+
+    Attributes:
+        self.configs (list): (s, E, b, policy) tuple for each configuration
+        self.seed (int): Seed for the random replacement policy
+        self.max_addr_size (int): # of bits in each address
+        self.jobs (int): # of worker processes
+
+    """
+
+    def __init__(self, configs, seed, max_addr_size, jobs):
+        """Sets the configurations and pool size
+
+        Args:
+            configs (list): (s, E, b, policy) tuple for each configuration
+            seed (int): Seed for the random replacement policy
+            max_addr_size (int): # of bits in each address
+            jobs (int): # of worker processes
+
+        Returns:
+            None
+        """
+
+        self.configs = configs
+        self.seed = seed
+        self.max_addr_size = max_addr_size
+        self.jobs = jobs
+
+
+
+    def run(self, records):
+        """Decodes the records once, then sweeps all configurations in parallel over the decoded trace
+
+        Args:
+            records (iterable): (op, addr, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            List of ((s, E, b, policy), stats) tuples, in the same order as self.configs
+        """
+
+        with tempfile.TemporaryDirectory(prefix='cachesim-') as dir_path:
+            DecodedTrace(dir_path).write(records)
+
+            #Deal configurations out round-robin, so expensive geometries are spread over the workers
+            num_tasks = min(self.jobs, len(self.configs))
+            tasks = [(dir_path, self.configs[i::num_tasks], self.seed, self.max_addr_size) for i in range(num_tasks)]
+            with Pool(num_tasks) as pool:
+                task_results = pool.map(run_configs, tasks)
+
+        #Put results back in configuration order
+        results = [None] * len(self.configs)
+        for i, task_result in enumerate(task_results):
+            results[i::num_tasks] = task_result
+
+        return results
+
+
+
+def run_configs(task):
+    """Worker process entry point, sweeps a share of the configurations over the memory-mapped decoded trace
+
+    Args:
+        task (tuple): (decoded trace directory, configs, seed, max_addr_size)
+
+    Returns:
+        List of ((s, E, b, policy), stats) tuples for the configurations of this task
+    """
+
+    dir_path, configs, seed, max_addr_size = task
+    caches = [Cache(s, E, b, policy, seed, max_addr_size) for s, E, b, policy in configs]
+    sweep = CacheSweep(caches)
+    with DecodedTrace(dir_path) as decoded_trace:
+        sweep.run(decoded_trace)
+
+    return sweep.results()
@@ -0,0 +1,211 @@
+import time
+import cProfile
+import itertools
+
+class PhaseProfiler:
+    """Class to time where a single configuration's run spends its time, split into phases
+
+    The phases are reading records from the trace, parsing the lines, decoding block addresses, looking blocks up,
+    and replacement, which is updating the policy on a hit or placing the block on a miss.
+    Reading a clock costs about as much as a phase of one record, so phases are timed over batches of BATCH_SIZE
+    records instead. One batch in sample_every is timed: its lines are read, then parsed, then decoded and looked up
+    without changing the cache, each with a wall and CPU clock reading before and after, and then it is simulated.
+    Replacement is the simulation's time less decoding and lookup, so it also covers the simulator's bookkeeping,
+    like counting hits and checking for repeated blocks. The other batches go through the simulator untimed.
+    Each phase's total is estimated from the timed batches, and the whole run's wall and CPU times are measured
+    exactly, so whatever the phases don't cover, like the untimed batches' loop overhead, shows up as other.
+    Binary traces and traces parsed in parallel come in already parsed, so their parsing is counted as reading.
+
+    Attributes:
+        self.sample_every (int): One batch in this many is timed
+        self.wall_ns (list): Wall time of each phase over the timed batches, in nanoseconds
+        self.cpu_ns (list): CPU time of each phase over the timed batches, in nanoseconds
+        self.timed (int): # of records in the timed batches
+        self.records (int): # of records simulated
+        self.wall_total (float): Wall time of the whole run, in seconds
+        self.cpu_total (float): CPU time of the whole run, in seconds, of this process only
+        self.stats (dict): Hits/misses/evictions of the run
+
+    """
+
+    PHASES = ('read', 'parse', 'decode', 'lookup', 'replacement')
+
+    #Records per batch, enough that the clock readings around a batch's phases cost next to nothing
+    BATCH_SIZE = 1024
+
+    def __init__(self, sample_every=8):
+        """Zeroes the phase timings
+
+        Args:
+            sample_every (int): One batch in this many is timed
+
+        Returns:
+            None
+        """
+
+        assert sample_every > 0, "Profile sampling interval must be positive"
+        self.sample_every = sample_every
+        self.wall_ns = [0] * len(self.PHASES)
+        self.cpu_ns = [0] * len(self.PHASES)
+        self.timed = 0
+        self.records = 0
+        self.wall_total = 0.0
+        self.cpu_total = 0.0
+        self.stats = None
+
+
+
+    def run(self, simulator, trace_reader, cprofile_path=None):
+        """Simulates every record of a trace, timing the phases of one batch in sample_every
+
+        Args:
+            simulator (Simulator): Fresh simulator of the configuration
+            trace_reader (TraceReader): Open trace
+            cprofile_path (str): Path to dump cProfile stats of the run to, readable with pstats, None to not capture them
+
+        Returns:
+            None
+        """
+
+        capture = None
+        if cprofile_path is not None:
+            capture = cProfile.Profile()
+            capture.enable()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        #The first batch is timed, so even a short trace gets timings
+        records = iter(trace_reader)
+        untimed_size = self.BATCH_SIZE * (self.sample_every - 1)
+        while self.run_timed_batch(simulator, records, trace_reader):
+            start = simulator.records
+            simulator.run(itertools.islice(records, untimed_size))
+            if simulator.records - start < untimed_size:
+                break
+
+        self.wall_total = time.perf_counter() - wall_start
+        self.cpu_total = time.process_time() - cpu_start
+        if capture is not None:
+            capture.disable()
+            capture.dump_stats(cprofile_path)
+
+        self.records = simulator.records
+        self.stats = simulator.stats.as_dict()
+
+
+
+    def run_timed_batch(self, simulator, records, trace_reader):
+        """Reads, parses, decodes and looks up one batch a phase at a time, then simulates it
+
+        Args:
+            simulator (Simulator): Simulator being run
+            records (iterator): Records of the trace, the untimed batches are taken from it
+            trace_reader (TraceReader): Open trace records comes from
+
+        Returns:
+            Whether the batch was full, so the trace may have more records
+        """
+
+        perf_counter_ns = time.perf_counter_ns
+        process_time_ns = time.process_time_ns
+        cache = simulator.cache
+        offset_bit_size = cache.offset_bit_size
+        get = cache.lines.get
+
+        #Text lines are read straight from the file records iterates over, then parsed by the same code
+        stamps = [(perf_counter_ns(), process_time_ns())]
+        if trace_reader.file is not None and not trace_reader.parallel:
+            batch = list(itertools.islice(trace_reader.file, self.BATCH_SIZE))
+            stamps.append((perf_counter_ns(), process_time_ns()))
+            full = len(batch) == self.BATCH_SIZE
+            batch = list(trace_reader.parse_lines(batch))
+        else:
+            batch = list(itertools.islice(records, self.BATCH_SIZE))
+            stamps.append((perf_counter_ns(), process_time_ns()))
+            full = len(batch) == self.BATCH_SIZE
+        stamps.append((perf_counter_ns(), process_time_ns()))
+
+        blocks = [addr >> offset_bit_size for op, addr, size, trace in batch if op == 'L' or op == 'S' or op == 'M']
+        stamps.append((perf_counter_ns(), process_time_ns()))
+
+        #Only the lookups the simulator does, a repeated block skips it unless the policy changes state on it
+        skip_repeats = simulator.skip_repeats
+        last_block = simulator.last_block
+        for block in blocks:
+            if not skip_repeats or block != last_block:
+                get(block)
+                last_block = block
+        stamps.append((perf_counter_ns(), process_time_ns()))
+
+        simulator.run(batch)
+        stamps.append((perf_counter_ns(), process_time_ns()))
+
+        #Simulating decodes and looks up again, that part of it isn't replacement
+        deltas = [(end[0] - begin[0], end[1] - begin[1]) for begin, end in zip(stamps, stamps[1:])]
+        deltas[4] = (max(deltas[4][0] - deltas[2][0] - deltas[3][0], 0), max(deltas[4][1] - deltas[2][1] - deltas[3][1], 0))
+        for phase, (wall, cpu) in enumerate(deltas):
+            self.wall_ns[phase] += wall
+            self.cpu_ns[phase] += cpu
+        self.timed += len(batch)
+
+        return full
+
+
+
+    def summary(self):
+        """Estimates every phase's share of the run from the timed batches
+
+        Args:
+            None
+
+        Returns:
+            Dict of the run's totals, and the wall and CPU seconds of each phase, other and total
+        """
+
+        scale = self.records / self.timed if self.timed else 0
+        phases = {}
+        for phase, name in enumerate(self.PHASES):
+            phases[name] = {'wall_seconds': self.wall_ns[phase] * scale / 1e9, 'cpu_seconds': self.cpu_ns[phase] * scale / 1e9}
+        phases['other'] = {
+            'wall_seconds': max(self.wall_total - sum(phase['wall_seconds'] for phase in phases.values()), 0.0),
+            'cpu_seconds': max(self.cpu_total - sum(phase['cpu_seconds'] for phase in phases.values()), 0.0),
+        }
+        phases['total'] = {'wall_seconds': self.wall_total, 'cpu_seconds': self.cpu_total}
+
+        accesses = self.stats['hits'] + self.stats['misses']
+        return {
+            'records': self.records,
+            'accesses': accesses,
+            'batch_size': self.BATCH_SIZE,
+            'sample_every': self.sample_every,
+            'timed_records': self.timed,
+            'wall_seconds': self.wall_total,
+            'cpu_seconds': self.cpu_total,
+            'accesses_per_second': accesses / self.wall_total if self.wall_total else 0.0,
+            'stats': self.stats,
+            'phases': phases,
+        }
+
+
+
+    def report(self):
+        """Builds a table of the estimated time in every phase
+
+        Args:
+            None
+
+        Returns:
+            Table as a string
+        """
+
+        summary = self.summary()
+        rows = ["Records: {}  Accesses: {}  Timed: {} (1 in {} batches of {})".format(summary['records'], summary['accesses'], summary['timed_records'], summary['sample_every'], summary['batch_size']),
+                "Wall: {:.3f} s  CPU: {:.3f} s  Accesses/s: {:.0f}".format(summary['wall_seconds'], summary['cpu_seconds'], summary['accesses_per_second']),
+                "{:>11} {:>10} {:>10} {:>7} {:>10}".format('phase', 'wall s', 'cpu s', 'wall %', 'ns/record')]
+        for name, phase in summary['phases'].items():
+            share = 100 * phase['wall_seconds'] / summary['wall_seconds'] if summary['wall_seconds'] else 0.0
+            per_record = 1e9 * phase['wall_seconds'] / summary['records'] if summary['records'] else 0.0
+            rows.append("{:>11} {:>10.3f} {:>10.3f} {:>7.1f} {:>10.0f}".format(name, phase['wall_seconds'], phase['cpu_seconds'], share, per_record))
+
+        return '\n'.join(rows)
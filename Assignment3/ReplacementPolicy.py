@@ -0,0 +1,671 @@
+import random
+import heapq
+from array import array
+
+class ReplacementPolicy:
+    """Base class for cache replacement policies
+
+    Lines are referred to by slot, where the line for way w of set s is at slot s*E + w.
+    The cache calls fill when a line is placed in a slot, hit when a valid line is accessed again,
+    and victim when a set is full and a line must be evicted. remove is called when a line is invalidated.
+    Every call does O(1) or O(log E) work, so large associativities stay fast.
+
+    Attributes:
+        self.num_sets (int): # of sets in the cache
+        self.num_lines (int): # of lines per set, also called associativity
+        self.updates_on_hit (bool): Whether hit needs to be called, policies that ignore hits skip the call
+        self.repeat_hits_change_state (bool): Whether hitting the line that was accessed last changes the policy's state
+                                             When it doesn't, repeated accesses to one block can be counted without a lookup
+
+    """
+
+    updates_on_hit = True
+    repeat_hits_change_state = False
+
+    def __init__(self, num_sets, num_lines, seed=None):
+        """Sets the cache geometry the policy keeps metadata for
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            seed (int): Seed for policies that use randomness, unused otherwise
+
+        Returns:
+            None
+        """
+
+        self.num_sets = num_sets
+        self.num_lines = num_lines
+
+
+
+    def fill(self, slot):
+        """Records that a new line was placed in slot
+
+        Args:
+            slot (int): Slot the line was placed in
+
+        Returns:
+            None
+        """
+
+        pass
+
+
+
+    def hit(self, slot):
+        """Records that the valid line in slot was accessed
+
+        Args:
+            slot (int): Slot that was hit
+
+        Returns:
+            None
+        """
+
+        pass
+
+
+
+    def remove(self, slot):
+        """Records that the line in slot was invalidated, so it must not be picked as a victim
+
+        Args:
+            slot (int): Slot that was invalidated
+
+        Returns:
+            None
+        """
+
+        pass
+
+
+
+    def victim(self, set_index):
+        """Picks the line to evict from a full set
+
+        Args:
+            set_index (int): Set to pick a victim from
+
+        Returns:
+            Slot of the line to evict
+        """
+
+        raise NotImplementedError
+
+
+
+class FIFOPolicy(ReplacementPolicy):
+    """Evicts the line that was filled first, hits don't change the order
+
+    Each set is a doubly linked list of slots, newest at the head and oldest at the tail.
+    Links are kept in flat arrays so no per-line Python objects are created.
+
+    Attributes:
+        self.next (array): Slot after each slot in its set's list, -1 at the tail
+        self.prev (array): Slot before each slot in its set's list, -1 at the head
+        self.head (array): Newest slot of each set, -1 if the set is empty
+        self.tail (array): Oldest slot of each set, -1 if the set is empty
+
+    """
+
+    updates_on_hit = False
+
+    def __init__(self, num_sets, num_lines, seed=None):
+        """Creates empty lists for every set
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            seed (int): Unused
+
+        Returns:
+            None
+        """
+
+        super().__init__(num_sets, num_lines, seed)
+        num_slots = num_sets * num_lines
+        self.next = array('i', [-1]) * num_slots
+        self.prev = array('i', [-1]) * num_slots
+        self.head = array('i', [-1]) * num_sets
+        self.tail = array('i', [-1]) * num_sets
+
+
+
+    def fill(self, slot):
+        """Puts slot at the head of its set's list
+
+        Args:
+            slot (int): Slot the line was placed in
+
+        Returns:
+            None
+        """
+
+        set_index = slot // self.num_lines
+        head = self.head[set_index]
+        self.prev[slot] = -1
+        self.next[slot] = head
+        if head == -1:
+            self.tail[set_index] = slot
+        else:
+            self.prev[head] = slot
+        self.head[set_index] = slot
+
+
+
+    def remove(self, slot):
+        """Takes slot out of its set's list
+
+        Args:
+            slot (int): Slot that was invalidated
+
+        Returns:
+            None
+        """
+
+        self.unlink(slot)
+
+
+
+    def unlink(self, slot):
+        """Takes slot out of its set's list
+
+        Args:
+            slot (int): Slot to take out
+
+        Returns:
+            None
+        """
+
+        set_index = slot // self.num_lines
+        prev_slot = self.prev[slot]
+        next_slot = self.next[slot]
+        if prev_slot == -1:
+            self.head[set_index] = next_slot
+        else:
+            self.next[prev_slot] = next_slot
+        if next_slot == -1:
+            self.tail[set_index] = prev_slot
+        else:
+            self.prev[next_slot] = prev_slot
+
+
+
+    def victim(self, set_index):
+        """Picks the oldest line, the slot is moved to the head since it is refilled right after
+
+        Args:
+            set_index (int): Set to pick a victim from
+
+        Returns:
+            Slot of the line to evict
+        """
+
+        slot = self.tail[set_index]
+        self.unlink(slot)
+        return slot
+
+
+
+class LRUPolicy(FIFOPolicy):
+    """Evicts the least recently used line
+
+    Same lists as FIFO, but a hit moves the slot to the head, so the tail is always the least recently used.
+
+    """
+
+    updates_on_hit = True
+
+    def hit(self, slot):
+        """Moves slot to the head of its set's list
+
+        Args:
+            slot (int): Slot that was hit
+
+        Returns:
+            None
+        """
+
+        if self.prev[slot] != -1:
+            self.unlink(slot)
+            self.fill(slot)
+
+
+
+class RandomPolicy(ReplacementPolicy):
+    """Evicts a random line, seeded so runs are repeatable
+
+    Every set draws from its own random stream, the n-th victim of a set is a hash of the seed, the set and n.
+    Victims don't depend on what happens in other sets, so a run split across workers by set gives the same results.
+
+    Attributes:
+        self.key (int): 64 bit key derived from the seed
+        self.draws (array): # of victims picked so far in each set
+
+    """
+
+    updates_on_hit = False
+
+    #Constants of the SplitMix64 generator
+    GAMMA = 0x9E3779B97F4A7C15
+    MIX1 = 0xBF58476D1CE4E5B9
+    MIX2 = 0x94D049BB133111EB
+    MASK = (1 << 64) - 1
+
+    def __init__(self, num_sets, num_lines, seed=None):
+        """Derives the key from the seed and starts every set's stream
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            seed (int): Seed for the random streams, defaults to 0
+
+        Returns:
+            None
+        """
+
+        super().__init__(num_sets, num_lines, seed)
+        self.key = random.Random(0 if seed is None else seed).getrandbits(64)
+        self.draws = array('Q', bytes(8 * num_sets))
+
+
+
+    def victim(self, set_index):
+        """Picks a random way of the set, the next draw from the set's stream
+
+        Args:
+            set_index (int): Set to pick a victim from
+
+        Returns:
+            Slot of the line to evict
+        """
+
+        draw = self.draws[set_index]
+        self.draws[set_index] = draw + 1
+
+        #SplitMix64 of the draw # in a stream picked by the key and set
+        z = (self.key ^ (set_index * self.MIX2 & self.MASK)) + (draw + 1) * self.GAMMA & self.MASK
+        z = (z ^ (z >> 30)) * self.MIX1 & self.MASK
+        z = (z ^ (z >> 27)) * self.MIX2 & self.MASK
+        z ^= z >> 31
+
+        return set_index * self.num_lines + z % self.num_lines
+
+
+
+class TreePLRUPolicy(ReplacementPolicy):
+    """Tree pseudo-LRU, each set has a binary tree of E - 1 bits pointing towards the line to evict
+
+    Every access flips the bits on the path to its way to point away from it, so both hit and victim are O(log E).
+
+    Attributes:
+        self.levels (int): Depth of each tree, log2(E)
+        self.tree (bytearray): Tree bits of every set, the tree for set s starts at s*(E - 1)
+
+    """
+
+    def __init__(self, num_sets, num_lines, seed=None):
+        """Creates the tree bits for every set, E must be a power of 2
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            seed (int): Unused
+
+        Returns:
+            None
+        """
+
+        super().__init__(num_sets, num_lines, seed)
+        assert num_lines & (num_lines - 1) == 0, "Tree PLRU needs the number of lines per set to be a power of 2"
+        self.levels = num_lines.bit_length() - 1
+        self.tree = bytearray(num_sets * (num_lines - 1))
+
+
+
+    def hit(self, slot):
+        """Points every node on the path to slot away from it
+
+        Args:
+            slot (int): Slot that was accessed
+
+        Returns:
+            None
+        """
+
+        set_index, way = divmod(slot, self.num_lines)
+        tree_base = set_index * (self.num_lines - 1)
+        node = 0
+        for level in range(self.levels - 1, -1, -1):
+            bit = (way >> level) & 1
+            self.tree[tree_base + node] = bit ^ 1
+            node = 2*node + 1 + bit
+
+    fill = hit
+
+
+
+    def victim(self, set_index):
+        """Follows the tree bits from the root to the line to evict
+
+        Args:
+            set_index (int): Set to pick a victim from
+
+        Returns:
+            Slot of the line to evict
+        """
+
+        tree_base = set_index * (self.num_lines - 1)
+        node = 0
+        way = 0
+        for _ in range(self.levels):
+            bit = self.tree[tree_base + node]
+            way = (way << 1) | bit
+            node = 2*node + 1 + bit
+
+        return set_index * self.num_lines + way
+
+
+
+class LFUPolicy(ReplacementPolicy):
+    """Evicts the least frequently used line, ties go to the least recently used
+
+    Each set has a min-heap of (count, stamp, slot) entries. Entries go stale when their line is used again,
+    stale entries are skipped when popped and the heap is rebuilt once it holds too many of them.
+    Every hit raises a count, so repeated hits can't skip the policy.
+
+    Attributes:
+        self.counts (array): Access count of each slot's line
+        self.stamps (array): Time of the last access to each slot's line
+        self.time (int): # of accesses seen, used to stamp lines
+        self.heaps (dict): Heap of each set that has been used, keyed by set
+
+    """
+
+    repeat_hits_change_state = True
+
+    def __init__(self, num_sets, num_lines, seed=None):
+        """Creates the count and stamp arrays, heaps are created when a set is first used
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            seed (int): Unused
+
+        Returns:
+            None
+        """
+
+        super().__init__(num_sets, num_lines, seed)
+        num_slots = num_sets * num_lines
+        self.counts = array('Q', bytes(8 * num_slots))
+        self.stamps = array('Q', bytes(8 * num_slots))
+        self.time = 0
+        self.heaps = {}
+
+
+
+    def push(self, slot, count):
+        """Sets the count of slot and pushes a fresh heap entry for it
+
+        Args:
+            slot (int): Slot that was accessed
+            count (int): New access count of the slot
+
+        Returns:
+            None
+        """
+
+        self.time += 1
+        self.counts[slot] = count
+        self.stamps[slot] = self.time
+
+        set_index = slot // self.num_lines
+        heap = self.heaps.get(set_index)
+        if heap is None:
+            heap = self.heaps[set_index] = []
+        heapq.heappush(heap, (count, self.time, slot))
+
+        #Too many stale entries, rebuild from the current entry of each line
+        if len(heap) > 4 * self.num_lines:
+            base = set_index * self.num_lines
+            heap[:] = [(self.counts[i], self.stamps[i], i) for i in range(base, base + self.num_lines) if self.stamps[i]]
+            heapq.heapify(heap)
+
+
+
+    def fill(self, slot):
+        """Starts the line in slot with a count of 1
+
+        Args:
+            slot (int): Slot the line was placed in
+
+        Returns:
+            None
+        """
+
+        self.push(slot, 1)
+
+
+
+    def hit(self, slot):
+        """Adds 1 to the count of the line in slot
+
+        Args:
+            slot (int): Slot that was hit
+
+        Returns:
+            None
+        """
+
+        self.push(slot, self.counts[slot] + 1)
+
+
+
+    def remove(self, slot):
+        """Clears the stamp of slot, so its heap entries are stale
+
+        Args:
+            slot (int): Slot that was invalidated
+
+        Returns:
+            None
+        """
+
+        self.stamps[slot] = 0
+
+
+
+    def victim(self, set_index):
+        """Pops heap entries until one matches its line's current count and stamp
+
+        Args:
+            set_index (int): Set to pick a victim from
+
+        Returns:
+            Slot of the line to evict
+        """
+
+        heap = self.heaps[set_index]
+        while True:
+            count, stamp, slot = heapq.heappop(heap)
+            if self.stamps[slot] == stamp:
+                self.stamps[slot] = 0
+                return slot
+
+
+
+class OPTPolicy(ReplacementPolicy):
+    """Belady's MIN, evicts the line whose next access is furthest in the future, for the fewest possible misses
+
+    It is offline: next_use must be set to a next_use_index of the exact accesses the cache will see before the first one.
+    Each set has a max-heap of (-next use, stamp, slot) entries, stale entries are skipped when popped like LFU's.
+    Every access moves its line's next use, so repeated hits can't skip the policy.
+
+    Attributes:
+        self.next_use (array): Index of the next access to the same block, for every access, NO_NEXT_USE if there is none
+        self.stamps (array): Access # (+1) of the last access to each slot's line, 0 if the slot is empty
+        self.time (int): # of accesses seen, the index into next_use of the next one
+        self.heaps (dict): Heap of each set that has been used, keyed by set
+
+    """
+
+    repeat_hits_change_state = True
+
+    def __init__(self, num_sets, num_lines, seed=None):
+        """Creates the stamp array, heaps are created when a set is first used
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            seed (int): Unused
+
+        Returns:
+            None
+        """
+
+        super().__init__(num_sets, num_lines, seed)
+        self.next_use = None
+        self.stamps = array('Q', bytes(8 * num_sets * num_lines))
+        self.time = 0
+        self.heaps = {}
+
+
+
+    def fill(self, slot):
+        """Pushes a heap entry for the line's next use
+
+        Args:
+            slot (int): Slot that was accessed
+
+        Returns:
+            None
+        """
+
+        time = self.time
+        self.time = time + 1
+        self.stamps[slot] = time + 1
+
+        set_index = slot // self.num_lines
+        heap = self.heaps.get(set_index)
+        if heap is None:
+            heap = self.heaps[set_index] = []
+        heapq.heappush(heap, (-self.next_use[time], time + 1, slot))
+
+        #Too many stale entries, keep only the current entry of each line
+        if len(heap) > 4 * self.num_lines:
+            heap[:] = [entry for entry in heap if self.stamps[entry[2]] == entry[1]]
+            heapq.heapify(heap)
+
+
+
+    def hit(self, slot):
+        """Pushes a heap entry for the line's next use, the same as a fill
+
+        Args:
+            slot (int): Slot that was hit
+
+        Returns:
+            None
+        """
+
+        self.fill(slot)
+
+
+
+    def remove(self, slot):
+        """Clears the stamp of slot, so its heap entries are stale
+
+        Args:
+            slot (int): Slot that was invalidated
+
+        Returns:
+            None
+        """
+
+        self.stamps[slot] = 0
+
+
+
+    def victim(self, set_index):
+        """Pops heap entries until one matches its line's current stamp, the line used furthest in the future
+
+        Args:
+            set_index (int): Set to pick a victim from
+
+        Returns:
+            Slot of the line to evict
+        """
+
+        heap = self.heaps[set_index]
+        while True:
+            next_use, stamp, slot = heapq.heappop(heap)
+            if self.stamps[slot] == stamp:
+                self.stamps[slot] = 0
+                return slot
+
+
+
+#Next use of an access whose block is never accessed again
+NO_NEXT_USE = 0xFFFFFFFF
+
+def next_use_index(decoded_trace, offset_bit_size):
+    """Builds the next use of every access in one reverse pass over a decoded trace, for OPTPolicy
+    Accesses are numbered the way a cache sees them: one per L/S, two per M and size per R/W record.
+    The index takes 4 bytes per access, plus a dict of the distinct blocks, so 10^8 accesses take about 400 MB
+
+    Args:
+        decoded_trace (DecodedTrace): Open decoded trace
+        offset_bit_size (int): # of bits required to determine block offset
+
+    Returns:
+        array of the index of the next access to the same block for every access, NO_NEXT_USE if there is none
+    """
+
+    ops, addrs, sizes = decoded_trace.ops, decoded_trace.addrs, decoded_trace.sizes
+
+    #Count the accesses first, with byte counts for everything but repeat records
+    op_bytes = bytes(ops)
+    total = op_bytes.count(b'L') + op_bytes.count(b'S') + 2 * op_bytes.count(b'M')
+    if op_bytes.count(b'R') or op_bytes.count(b'W'):
+        total += sum(size for op, size in zip(op_bytes, sizes) if op == ord('R') or op == ord('W'))
+    assert total < NO_NEXT_USE, "OPT supports fewer than {} accesses".format(NO_NEXT_USE)
+
+    next_use = array('I', bytes(4 * total))
+    next_access = {}
+    end = total
+    load, store, modify, repeat_r, repeat_w = b'LSMRW'
+    for i in range(len(op_bytes) - 1, -1, -1):
+        op = op_bytes[i]
+        if op == load or op == store:
+            count = 1
+        elif op == modify:
+            count = 2
+        elif op == repeat_r or op == repeat_w:
+            count = sizes[i]
+        else:
+            continue
+
+        #All of a record's accesses are to one block, each one's next use is the one after it
+        block = addrs[i] >> offset_bit_size
+        start = end - count
+        for access in range(start, end - 1):
+            next_use[access] = access + 1
+        next_use[end - 1] = next_access.get(block, NO_NEXT_USE)
+        next_access[block] = start
+        end = start
+
+    return next_use
+
+
+
+#Policies that can be picked with --policy
+POLICIES = {
+    'lru': LRUPolicy,
+    'fifo': FIFOPolicy,
+    'random': RandomPolicy,
+    'plru': TreePLRUPolicy,
+    'lfu': LFUPolicy,
+    'opt': OPTPolicy,
+}
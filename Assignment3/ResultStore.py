@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import hashlib
+from Simulator import Simulator
+
+class ResultStore:
+    """Class for an on-disk store of simulation results, so reruns of the same configuration on the same trace are instant
+
+    Each result is a small JSON file in the store directory, named by the hash of its key: the SHA-256 of the trace's
+    contents, the normalized configuration and Simulator.VERSION. Normalizing drops what can't change the results,
+    such as the seed of a policy that isn't random, so equivalent command lines share entries.
+    A file's modification time is its last use, entries are touched on every hit and the least recently used
+    are deleted once the store is over its size bound.
+    Hashing a multi-GB trace takes a few seconds, so trace hashes are remembered by path, size, modification time
+    and inode in an index file, and only recomputed when the trace changes.
+
+    Attributes:
+        self.dir_path (str): Directory holding the entries
+        self.max_bytes (int): Size bound of the entries, in bytes
+        self.index_path (str): Path of the trace hash index
+
+    """
+
+    #Traces are hashed in blocks of this many bytes
+    BLOCK_SIZE = 1 << 20
+
+    def __init__(self, dir_path, max_bytes=64 << 20):
+        """Opens the store, creating its directory if needed
+
+        Args:
+            dir_path (str): Directory holding the entries
+            max_bytes (int): Size bound of the entries, in bytes
+
+        Returns:
+            None
+        """
+
+        assert max_bytes > 0, "Result store size must be positive"
+        self.dir_path = dir_path
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(dir_path, 'traces.json')
+        os.makedirs(dir_path, exist_ok=True)
+
+
+
+    def trace_hash(self, trace_path):
+        """Gets the SHA-256 of a trace file's contents, from the index if the file hasn't changed since it was hashed
+
+        Args:
+            trace_path (str): Path of the trace, must be a regular file
+
+        Returns:
+            Hex digest string
+        """
+
+        assert os.path.isfile(trace_path), "Only trace files can be stored, not stdin or pipes"
+        file_stat = os.stat(trace_path)
+        file_id = [file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino]
+
+        index = self.read_json(self.index_path) or {}
+        path = os.path.abspath(trace_path)
+        if path in index and index[path][:3] == file_id:
+            return index[path][3]
+
+        digest = hashlib.sha256()
+        with open(trace_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.BLOCK_SIZE), b''):
+                digest.update(block)
+
+        index[path] = file_id + [digest.hexdigest()]
+        self.write_json(self.index_path, index)
+        return digest.hexdigest()
+
+
+
+    def key(self, trace_hash, config, seed):
+        """Builds the normalized key of a result
+
+        Args:
+            trace_hash (str): SHA-256 of the trace
+            config (tuple): (s, E, b, policy) of the cache
+            seed (int): Seed for the random replacement policy
+
+        Returns:
+            (key dict, hex digest of the key) tuple
+        """
+
+        s, E, b, policy = config
+        key = {
+            'trace': trace_hash,
+            's': s,
+            'E': E,
+            'b': b,
+            'policy': policy,
+            'seed': (0 if seed is None else seed) if policy == 'random' else None,
+            'version': Simulator.VERSION,
+        }
+
+        return key, hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+
+    def get(self, trace_hash, config, seed):
+        """Looks up a stored result, marking it as just used
+
+        Args:
+            trace_hash (str): SHA-256 of the trace
+            config (tuple): (s, E, b, policy) of the cache
+            seed (int): Seed for the random replacement policy
+
+        Returns:
+            Dict of hits/misses/evictions, None if it isn't stored
+        """
+
+        key, digest = self.key(trace_hash, config, seed)
+        entry_path = os.path.join(self.dir_path, digest + '.json')
+        entry = self.read_json(entry_path)
+
+        #A digest collision or a hand-edited entry is treated as missing
+        if entry is None or entry['key'] != key:
+            return None
+
+        os.utime(entry_path)
+        return entry['stats']
+
+
+
+    def put(self, trace_hash, trace_path, config, seed, stats):
+        """Stores a result, then evicts the least recently used entries if the store is over its size bound
+
+        Args:
+            trace_hash (str): SHA-256 of the trace
+            trace_path (str): Path of the trace, kept for listing only
+            config (tuple): (s, E, b, policy) of the cache
+            seed (int): Seed for the random replacement policy
+            stats (dict): Hits/misses/evictions to store
+
+        Returns:
+            None
+        """
+
+        key, digest = self.key(trace_hash, config, seed)
+        entry = {'key': key, 'trace_path': os.path.abspath(trace_path), 'created': time.time(), 'stats': dict(stats)}
+        self.write_json(os.path.join(self.dir_path, digest + '.json'), entry)
+        self.evict()
+
+
+
+    def entries(self):
+        """Gets every entry, least recently used first
+
+        Args:
+            None
+
+        Returns:
+            List of (path, last use time, size in bytes, entry dict) tuples
+        """
+
+        entries = []
+        for name in os.listdir(self.dir_path):
+            if name == os.path.basename(self.index_path) or not name.endswith('.json'):
+                continue
+
+            entry_path = os.path.join(self.dir_path, name)
+            entry = self.read_json(entry_path)
+            if entry is not None:
+                file_stat = os.stat(entry_path)
+                entries.append((entry_path, file_stat.st_mtime, file_stat.st_size, entry))
+
+        entries.sort(key=lambda entry: entry[1])
+        return entries
+
+
+
+    def evict(self):
+        """Deletes the least recently used entries until the store fits in its size bound
+
+        Args:
+            None
+
+        Returns:
+            # of entries deleted
+        """
+
+        entries = self.entries()
+        total = sum(entry[2] for entry in entries)
+        evicted = 0
+        for entry_path, last_use, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(entry_path)
+            total -= size
+            evicted += 1
+
+        return evicted
+
+
+
+    def purge(self, trace_hash=None):
+        """Deletes every entry, or every entry of one trace
+
+        Args:
+            trace_hash (str): SHA-256 of the trace to purge the entries of, None for all entries
+
+        Returns:
+            # of entries deleted
+        """
+
+        purged = 0
+        for entry_path, last_use, size, entry in self.entries():
+            if trace_hash is None or entry['key']['trace'] == trace_hash:
+                os.remove(entry_path)
+                purged += 1
+
+        if trace_hash is None and os.path.exists(self.index_path):
+            os.remove(self.index_path)
+
+        return purged
+
+
+
+    def report(self):
+        """Builds a table of the stored entries, least recently used first
+
+        Args:
+            None
+
+        Returns:
+            Table as a string, one row per entry, then the total size
+        """
+
+        entries = self.entries()
+        rows = ["{:>19} {:>3} {:>6} {:>3} {:>7} {:>12} {:>12} {:>12} {:>12}  {}".format('last used', 's', 'E', 'b', 'policy', 'seed', 'hits', 'misses', 'evictions', 'trace')]
+        for entry_path, last_use, size, entry in entries:
+            key, stats = entry['key'], entry['stats']
+            seed = '' if key['seed'] is None else key['seed']
+            rows.append("{:>19} {:>3} {:>6} {:>3} {:>7} {:>12} {:>12} {:>12} {:>12}  {}".format(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_use)), key['s'], key['E'], key['b'], key['policy'], seed, stats['hits'], stats['misses'], stats['evictions'], entry['trace_path']))
+
+        rows.append("{} entries, {} of {} bytes".format(len(entries), sum(entry[2] for entry in entries), self.max_bytes))
+        return '\n'.join(rows)
+
+
+
+    def read_json(self, path):
+        """Reads a JSON file of the store
+
+        Args:
+            path (str): Path of the file
+
+        Returns:
+            Parsed contents, None if the file is missing or half written
+        """
+
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+
+    def write_json(self, path, contents):
+        """Atomically replaces a JSON file of the store, so concurrent runs never see half written files
+
+        Args:
+            path (str): Path of the file
+            contents: JSON serializable contents
+
+        Returns:
+            None
+        """
+
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(contents, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,314 @@
+import math
+import random
+import itertools
+from array import array
+
+class SampledSimulator:
+    """Class for approximate simulation of one cache, from a sample of its sets and/or of the trace's time windows
+
+    Set sampling only simulates the accesses to a seeded random subset of sets, other accesses are only counted.
+    Time sampling splits the trace into periods of window/time_rate records, and in each period simulates one window
+    at a seeded random offset, after warming the cache up on the records just before it. Records between windows
+    are skipped without being parsed, binary traces jump straight over them.
+
+    Hits/misses/evictions are extrapolated with ratio estimators: the miss and eviction ratios of the measured accesses
+    are scaled by the trace's total # of accesses (counted exactly, or estimated from accesses per record when time
+    sampling). Each sampled window, or each sampled set when only sets are sampled, is a cluster, and the confidence
+    interval comes from the spread of the clusters' ratios. It covers the sampling error of the ratios, not the bias
+    of a cache that was only warmed up for a while before each window.
+
+    Attributes:
+        self.cache (Cache): Cache being simulated, only the sampled sets are used
+        self.set_rate (float): Fraction of sets simulated
+        self.time_rate (float): Fraction of records measured, 1.0 to measure them all
+        self.window (int): # of records in each time sample
+        self.warmup (int): # of records simulated before each time sample without being counted
+        self.rng (random.Random): Seeded generator picking sets and windows
+        self.sampled (bytearray): 1 for every sampled set
+        self.num_sampled (int): # of sampled sets
+        self.skip_repeats (bool): Whether repeated accesses to last_block can skip the lookup
+        self.last_block (int): Block accessed by the last lookup, -1 before any
+        self.set_accesses (array): # of measured accesses to each set, only sampled sets are counted
+        self.set_misses (array): # of measured misses in each set
+        self.set_evictions (array): # of measured evictions from each set
+        self.clusters (list): (accesses, misses, evictions) measured in the sampled sets, for each cluster
+        self.accesses (int): # of measured accesses, in all sets
+        self.records (int): # of measured records
+        self.total_records (int): # of records in the trace
+
+    """
+
+    #z value of a two sided 95% confidence interval
+    Z = 1.96
+
+    def __init__(self, cache, set_rate=1.0, time_rate=1.0, window=10000, warmup=None, seed=None):
+        """Picks the sampled sets
+
+        Args:
+            cache (Cache): Empty cache to simulate
+            set_rate (float): Fraction of sets to simulate, at least one set is
+            time_rate (float): Fraction of records to measure, 1.0 for no time sampling
+            window (int): # of records in each time sample
+            warmup (int): # of records to warm up on before each time sample, defaults to window
+            seed (int): Seed for picking sets and windows, defaults to 0
+
+        Returns:
+            None
+        """
+
+        assert 0 < set_rate <= 1 and 0 < time_rate <= 1, "Sampling rates must be more than 0 and at most 1"
+        self.cache = cache
+        self.set_rate = set_rate
+        self.time_rate = time_rate
+        self.window = window
+        self.warmup = window if warmup is None else warmup
+        if time_rate < 1:
+            assert self.period() >= self.window + self.warmup, "Time sampling rate is too high for the window and warmup, it can be at most {:.3f}".format(self.window / (self.window + self.warmup))
+        self.rng = random.Random(0 if seed is None else seed)
+
+        num_sets = cache.set_mask + 1
+        self.num_sampled = max(1, round(set_rate * num_sets))
+        self.sampled = bytearray(num_sets)
+        for set_index in self.rng.sample(range(num_sets), self.num_sampled):
+            self.sampled[set_index] = 1
+
+        self.skip_repeats = not cache.policy.repeat_hits_change_state
+        self.last_block = -1
+        self.set_accesses = array('Q', bytes(8 * num_sets))
+        self.set_misses = array('Q', bytes(8 * num_sets))
+        self.set_evictions = array('Q', bytes(8 * num_sets))
+        self.clusters = []
+        self.accesses = 0
+        self.records = 0
+        self.total_records = 0
+
+
+
+    def period(self):
+        """Gets the # of records in each time sampling period, one window is measured per period
+
+        Args:
+            None
+
+        Returns:
+            # of records per period
+        """
+
+        return round(self.window / self.time_rate)
+
+
+
+    def windows(self):
+        """Picks one window per period at a seeded random offset, leaving room for the warmup in the same period
+
+        Args:
+            None
+
+        Yields:
+            (start, end) record range of each window, including its warmup, endlessly
+        """
+
+        period = self.period()
+        for period_start in itertools.count(0, period):
+            offset = self.rng.randrange(self.warmup, period - self.window + 1)
+            yield period_start + offset - self.warmup, period_start + offset + self.window
+
+
+
+    def run(self, trace_reader):
+        """Simulates the sample of an open trace
+
+        Args:
+            trace_reader (TraceReader): Open trace, not iterated yet
+
+        Returns:
+            None
+        """
+
+        if self.time_rate == 1:
+            self.simulate(trace_reader, True)
+            self.total_records = self.records
+
+            #Without time sampling each sampled set is a cluster
+            self.clusters = [(self.set_accesses[i], self.set_misses[i], self.set_evictions[i]) for i in range(len(self.sampled)) if self.sampled[i]]
+            return
+
+        for records in trace_reader.read_windows(self.windows()):
+            #Warmup records fill the cache but aren't counted
+            warmup = min(self.warmup, len(records))
+            self.simulate(records[:warmup], False)
+            before = self.measured
+            self.simulate(records[warmup:], True)
+            cluster = tuple(after - b for after, b in zip(self.measured, before))
+            if cluster[0]:
+                self.clusters.append(cluster)
+
+        self.total_records = trace_reader.records_read
+
+
+
+    def simulate(self, records, measure):
+        """Simulates the accesses of records that fall in sampled sets, and counts every access
+
+        Args:
+            records (iterable): (op, addr, size, trace) tuples, such as the ones from a TraceReader
+            measure (bool): Whether the records are counted, warmup records aren't
+
+        Returns:
+            None
+        """
+
+        cache = self.cache
+        stats = cache.stats
+        access_block = cache.access_block
+        offset_bit_size = cache.offset_bit_size
+        set_mask = cache.set_mask
+        sampled = self.sampled
+        skip_repeats = self.skip_repeats
+        last_block = self.last_block
+        set_accesses = self.set_accesses
+        set_misses = self.set_misses
+        set_evictions = self.set_evictions
+        accesses = 0
+        records_seen = 0
+
+        for op, addr, size, trace in records:
+            #Every record is counted, windows and the total are in records including instruction loads
+            records_seen += 1
+            if op == 'L' or op == 'S':
+                count = 1
+            elif op == 'M':
+                count = 2
+            elif op == 'R' or op == 'W':
+                count = size
+            else:
+                continue
+            accesses += count
+
+            block = addr >> offset_bit_size
+            set_index = block & set_mask
+            if not sampled[set_index]:
+                continue
+
+            if skip_repeats and block == last_block:
+                stats['hits'] += count
+                result = 'hit'
+            elif op == 'R' or op == 'W':
+                #The run's first access can be cut off by the start of a window, so it isn't always the block accessed last
+                #Then the first repeat is looked up, and only the rest are guaranteed hits
+                if block != last_block:
+                    result = access_block(block)
+                    last_block = block
+                    cache.repeat_hits(block, count - 1)
+                else:
+                    cache.repeat_hits(block, count)
+                    result = 'hit'
+            else:
+                result = access_block(block)
+                last_block = block
+
+                #Modify is a load then a store to the same block, the store always hits
+                if count == 2:
+                    if skip_repeats:
+                        stats['hits'] += 1
+                    else:
+                        access_block(block)
+
+            if measure:
+                set_accesses[set_index] += count
+                if result != 'hit':
+                    set_misses[set_index] += 1
+                    if result == 'miss eviction':
+                        set_evictions[set_index] += 1
+
+        self.last_block = last_block
+        if measure:
+            self.accesses += accesses
+            self.records += records_seen
+
+
+
+    @property
+    def measured(self):
+        """Gets the totals measured so far in the sampled sets
+
+        Args:
+            None
+
+        Returns:
+            (accesses, misses, evictions) tuple
+        """
+
+        return (sum(self.set_accesses), sum(self.set_misses), sum(self.set_evictions))
+
+
+
+    def estimates(self):
+        """Extrapolates hits/misses/evictions and the miss rate to the whole trace, with confidence intervals
+
+        Args:
+            None
+
+        Returns:
+            Dict of (estimate, low, high) tuples keyed by hits/misses/evictions/miss rate,
+            low and high are None if there were fewer than 2 clusters
+        """
+
+        #Total accesses are exact without time sampling, otherwise they are estimated from the accesses per record measured
+        if self.time_rate == 1 or not self.records:
+            total = self.accesses
+        else:
+            total = self.accesses / self.records * self.total_records
+
+        n = len(self.clusters)
+        sampled_fraction = self.time_rate if self.time_rate < 1 else self.set_rate
+        measured_accesses = sum(cluster[0] for cluster in self.clusters)
+
+        ratios = {}
+        for name, column in (('misses', 1), ('evictions', 2)):
+            ratio = sum(cluster[column] for cluster in self.clusters) / measured_accesses if measured_accesses else 0.0
+            low = high = None
+            if n > 1:
+                #Variance of a ratio estimator over clusters, with the finite population correction
+                mean_accesses = measured_accesses / n
+                spread = sum((cluster[column] - ratio * cluster[0])**2 for cluster in self.clusters) / (n - 1)
+                error = self.Z * math.sqrt((1 - sampled_fraction) * spread / n) / mean_accesses
+                low, high = max(0.0, ratio - error), min(1.0, ratio + error)
+            ratios[name] = (ratio, low, high)
+
+        results = {}
+        misses = ratios['misses']
+        results['hits'] = (total * (1 - misses[0]), None if misses[2] is None else total * (1 - misses[2]), None if misses[1] is None else total * (1 - misses[1]))
+        for name in ('misses', 'evictions'):
+            ratio, low, high = ratios[name]
+            results[name] = (total * ratio, None if low is None else total * low, None if high is None else total * high)
+        results['miss rate'] = misses
+
+        return results
+
+
+
+    def report(self):
+        """Builds a table of the sampling done and the estimates with their 95% confidence intervals
+
+        Args:
+            None
+
+        Returns:
+            Table as a string, the last line is the estimated stats dict, rounded
+        """
+
+        rows = ["Sampled {} of {} sets ({:.1%})".format(self.num_sampled, len(self.sampled), self.num_sampled / len(self.sampled))]
+        if self.time_rate < 1:
+            rows.append("Time sampled one {} record window per {} records ({:.1%}), each after {} records of warmup".format(self.window, self.period(), self.time_rate, self.warmup))
+        rows.append("Measured {} of {} records, {} clusters".format(self.records, self.total_records, len(self.clusters)))
+        rows.append("{:>10} {:>14} {:>14} {:>14}".format('', 'estimate', '95% CI low', '95% CI high'))
+
+        estimates = self.estimates()
+        for name, (estimate, low, high) in estimates.items():
+            value_format = "{:>14.4f}" if name == 'miss rate' else "{:>14.0f}"
+            bounds = [value_format.format(bound) if bound is not None else "{:>14}".format('n/a') for bound in (low, high)]
+            rows.append("{:>10} ".format(name) + value_format.format(estimate) + " " + " ".join(bounds))
+
+        rows.append(str({name: round(estimates[name][0]) for name in ('hits', 'misses', 'evictions')}))
+        return '\n'.join(rows)
@@ -0,0 +1,199 @@
+import sys
+from array import array
+from collections import Counter
+
+class SetStats:
+    """Class for per-set and per-address-region counters of a single cache
+
+    Per-set hits/misses are kept in flat lists indexed by set, so every access costs one list increment.
+    Incrementing a list of ints is over twice as fast as a typed array,
+    which converts every element to and from a C integer.
+    Every miss fills a line and lines are never invalidated, so the first num_lines misses of a set fill its empty
+    lines and every later one evicts, evictions are misses - num_lines and don't need counting.
+    Misses are also counted per region, a region being an aligned 2^region_bits byte range of addresses,
+    which shows the address ranges that conflict. Only regions with a miss are kept.
+    Miss regions are buffered and counted in batches, which is cheaper than a dict update per miss.
+    Counters can be written as CSV, or as .npy files that numpy.load reads, without numpy being needed here.
+
+    Attributes:
+        self.num_sets (int): # of sets in the cache
+        self.num_lines (int): # of lines per set
+        self.region_bits (int): # of low address bits dropped to get a region
+        self.hits (list): # of hits in each set
+        self.misses (list): # of misses in each set
+        self.miss_regions (list): Region of each miss not yet counted into region_misses
+        self.region_misses (Counter): # of misses in each region, keyed by region number (address >> region_bits)
+
+    """
+
+    NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+    #Miss regions are counted once this many are buffered
+    BATCH_SIZE = 1 << 16
+
+    def __init__(self, num_sets, num_lines, region_bits=12):
+        """Creates zeroed counters
+
+        Args:
+            num_sets (int): # of sets in the cache
+            num_lines (int): # of lines per set
+            region_bits (int): # of low address bits dropped to get a region, defaults to 4 KiB regions
+
+        Returns:
+            None
+        """
+
+        self.num_sets = num_sets
+        self.num_lines = num_lines
+        self.region_bits = region_bits
+        self.hits = [0] * num_sets
+        self.misses = [0] * num_sets
+        self.miss_regions = []
+        self.region_misses = Counter()
+
+
+
+    def count(self, set_index, addr, result1, result2):
+        """Counts the results of one trace record
+
+        Args:
+            set_index (int): Set the address maps to
+            addr (int): Address accessed
+            result1 (str): Result of the first access, 'hit', 'miss' or 'miss eviction'
+            result2 (str): Result of the second access of a modify, "" for other records
+                           It is to the block the first access just brought in, so it always hits
+
+        Returns:
+            None
+        """
+
+        if result1 == 'hit':
+            self.hits[set_index] += 2 if result2 else 1
+        else:
+            if result2:
+                self.hits[set_index] += 1
+            self.count_miss(set_index, addr)
+
+
+
+    def count_miss(self, set_index, addr):
+        """Counts a miss, and buffers its region
+
+        Args:
+            set_index (int): Set the address maps to
+            addr (int): Address accessed
+
+        Returns:
+            None
+        """
+
+        self.misses[set_index] += 1
+        self.miss_regions.append(addr >> self.region_bits)
+        if len(self.miss_regions) >= self.BATCH_SIZE:
+            self.count_regions()
+
+
+
+    def count_regions(self):
+        """Counts the buffered miss regions into region_misses and empties the buffer
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        self.region_misses.update(self.miss_regions)
+        del self.miss_regions[:]
+
+
+
+    def evictions(self):
+        """Gets the # of evictions from each set
+
+        Args:
+            None
+
+        Returns:
+            List of evictions, indexed by set
+        """
+
+        return [max(misses - self.num_lines, 0) for misses in self.misses]
+
+
+
+    def write_csv(self, prefix):
+        """Writes <prefix>_sets.csv with one row per set and <prefix>_regions.csv with one row per region that missed
+
+        Args:
+            prefix (str): Path prefix of the CSV files
+
+        Returns:
+            None
+        """
+
+        self.count_regions()
+        evictions = self.evictions()
+        with open("{}_sets.csv".format(prefix), 'w') as f:
+            f.write("set,hits,misses,evictions\n")
+            for set_index in range(self.num_sets):
+                f.write("{},{},{},{}\n".format(set_index, self.hits[set_index], self.misses[set_index], evictions[set_index]))
+
+        with open("{}_regions.csv".format(prefix), 'w') as f:
+            f.write("region_start,misses\n")
+            for region in sorted(self.region_misses):
+                f.write("{:x},{}\n".format(region << self.region_bits, self.region_misses[region]))
+
+
+
+    def write_npy(self, prefix):
+        """Writes <prefix>_sets.npy, a (sets, 3) array of hits/misses/evictions,
+        and <prefix>_regions.npy, a (regions, 2) array of region start address and misses, both unsigned 64 bit
+
+        Args:
+            prefix (str): Path prefix of the .npy files
+
+        Returns:
+            None
+        """
+
+        self.count_regions()
+        sets = array('Q', bytes(8 * 3 * self.num_sets))
+        sets[0::3] = array('Q', self.hits)
+        sets[1::3] = array('Q', self.misses)
+        sets[2::3] = array('Q', self.evictions())
+        self.write_npy_array("{}_sets.npy".format(prefix), sets, (self.num_sets, 3))
+
+        regions = array('Q')
+        for region in sorted(self.region_misses):
+            regions.append(region << self.region_bits)
+            regions.append(self.region_misses[region])
+        self.write_npy_array("{}_regions.npy".format(prefix), regions, (len(self.region_misses), 2))
+
+
+
+    def write_npy_array(self, path, values, shape):
+        """Writes an unsigned 64 bit array in the .npy version 1.0 format
+
+        Args:
+            path (str): Path of the .npy file
+            values (array): Values in row-major order
+            shape (tuple): Shape of the array
+
+        Returns:
+            None
+        """
+
+        descr = '<u8' if sys.byteorder == 'little' else '>u8'
+        header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({}, {}), }}".format(descr, shape[0], shape[1])
+
+        #Magic, header length and header together are padded with spaces to a multiple of 64 bytes, ending in a newline
+        unpadded = len(self.NPY_MAGIC) + 2 + len(header) + 1
+        header += ' ' * (-unpadded % 64) + '\n'
+
+        with open(path, 'wb') as f:
+            f.write(self.NPY_MAGIC)
+            f.write(len(header).to_bytes(2, 'little'))
+            f.write(header.encode('latin1'))
+            f.write(values.tobytes())
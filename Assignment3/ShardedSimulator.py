@@ -0,0 +1,156 @@
+import os
+import tempfile
+from array import array
+from multiprocessing import Pool
+from Simulator import Simulator
+from DecodedTrace import DecodedTrace
+
+class ShardedSimulator:
+    """Class to simulate a single cache configuration exactly, split by set across a pool of worker processes
+
+    Sets never share lines, so each worker simulates only the accesses to its own range of set indexes and
+    the stats are summed at the end. The trace is decoded once, with every access going into the DecodedTrace of
+    the shard its set is in, so each worker memory-maps and replays only its own accesses.
+    Each worker keeps its own last block for the repeated access fast path, which is still a guaranteed hit since
+    no other access to the worker's sets came in between. The random policy draws victims from per-set streams,
+    so every policy gives the same results as the serial run.
+
+    Attributes:
+        self.config (tuple): (s, E, b, policy) of the cache
+        self.seed (int): Seed for the random replacement policy
+        self.max_addr_size (int): # of bits in each address
+        self.workers (int): # of worker processes, at most the # of sets
+
+    """
+
+    def __init__(self, config, seed, max_addr_size, workers):
+        """Sets the configuration and pool size
+
+        Args:
+            config (tuple): (s, E, b, policy) of the cache
+            seed (int): Seed for the random replacement policy
+            max_addr_size (int): # of bits in each address
+            workers (int): # of worker processes
+
+        Returns:
+            None
+        """
+
+        self.config = config
+        self.seed = seed
+        self.max_addr_size = max_addr_size
+        self.workers = min(workers, 2**config[0])
+
+
+
+    def shards(self):
+        """Splits the set indexes into one contiguous range per worker, as evenly as possible
+
+        Args:
+            None
+
+        Returns:
+            List of (first set, last set + 1) tuples
+        """
+
+        num_sets = 2**self.config[0]
+        return [(num_sets * i // self.workers, num_sets * (i + 1) // self.workers) for i in range(self.workers)]
+
+
+
+    def partition(self, records, dir_path):
+        """Decodes the records into one DecodedTrace per shard, each holding only the accesses to the shard's sets
+        Records that aren't accesses, like instruction loads, are dropped
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+            dir_path (str): Directory to make the shards' decoded trace directories in
+
+        Returns:
+            List of the shards' decoded trace directories, in shard order
+        """
+
+        offset_bit_size = self.config[2]
+        set_mask = 2**self.config[0] - 1
+        shard_of_set = array('H')
+        for shard, (first_set, end_set) in enumerate(self.shards()):
+            shard_of_set.extend([shard] * (end_set - first_set))
+
+        shard_paths = [os.path.join(dir_path, str(shard)) for shard in range(self.workers)]
+        decoded_traces = []
+        for shard_path in shard_paths:
+            os.mkdir(shard_path)
+            decoded_trace = DecodedTrace(shard_path)
+            decoded_trace.append(bytearray(), array('Q'), array('I'))
+            decoded_traces.append(decoded_trace)
+
+        ops = [bytearray() for _ in shard_paths]
+        addrs = [array('Q') for _ in shard_paths]
+        sizes = [array('I') for _ in shard_paths]
+        for record in records:
+            op = record[0]
+            if op not in 'LSMRW':
+                continue
+
+            shard = shard_of_set[(record[1] >> offset_bit_size) & set_mask]
+            shard_ops = ops[shard]
+            shard_ops.append(ord(op))
+            addrs[shard].append(record[1])
+            sizes[shard].append(record[2])
+
+            if len(shard_ops) == DecodedTrace.BATCH_SIZE:
+                decoded_traces[shard].append(shard_ops, addrs[shard], sizes[shard])
+                ops[shard] = bytearray()
+                addrs[shard] = array('Q')
+                sizes[shard] = array('I')
+
+        for shard, decoded_trace in enumerate(decoded_traces):
+            decoded_trace.append(ops[shard], addrs[shard], sizes[shard])
+
+        return shard_paths
+
+
+
+    def run(self, records):
+        """Decodes the records once into per-shard decoded traces, then simulates every shard of sets in parallel
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            Dict of hits/misses/evictions, the same as a serial run's
+        """
+
+        with tempfile.TemporaryDirectory(prefix='cachesim-') as dir_path:
+            shard_paths = self.partition(records, dir_path)
+
+            tasks = [(shard_path, self.config, self.seed, self.max_addr_size) for shard_path in shard_paths]
+            with Pool(self.workers) as pool:
+                shard_stats = pool.map(run_shard, tasks)
+
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        for shard_stat in shard_stats:
+            for name in stats:
+                stats[name] += shard_stat[name]
+
+        return stats
+
+
+
+def run_shard(task):
+    """Worker process entry point, simulates the accesses to one range of sets over its memory-mapped decoded trace
+
+    Args:
+        task (tuple): (shard's decoded trace directory, (s, E, b, policy), seed, max_addr_size)
+
+    Returns:
+        Dict of hits/misses/evictions in the shard's sets
+    """
+
+    dir_path, config, seed, max_addr_size = task
+    simulator = Simulator(*config, seed, max_addr_size)
+
+    with DecodedTrace(dir_path) as decoded_trace:
+        simulator.run((op, addr, size, None) for op, addr, size in decoded_trace)
+
+    return simulator.stats.as_dict()
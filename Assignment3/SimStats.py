@@ -0,0 +1,142 @@
+class SimStats:
+    """Class for a structured, read-only view of a cache's hits/misses/evictions
+
+    Wraps the stats dict the cache updates, so it always shows the current counts without being copied.
+    Printing it gives the same dict the command line simulator has always printed.
+
+    Attributes:
+        self.counts (dict): The cache's stats dict, with hits/misses/evictions
+
+    """
+
+    def __init__(self, counts):
+        """Wraps a stats dict
+
+        Args:
+            counts (dict): Stats dict with hits/misses/evictions
+
+        Returns:
+            None
+        """
+
+        self.counts = counts
+
+
+
+    @property
+    def hits(self):
+        """Gets the # of accesses that hit
+
+        Args:
+            None
+
+        Returns:
+            # of accesses that hit
+        """
+
+        return self.counts['hits']
+
+
+
+    @property
+    def misses(self):
+        """Gets the # of accesses that missed
+
+        Args:
+            None
+
+        Returns:
+            # of accesses that missed
+        """
+
+        return self.counts['misses']
+
+
+
+    @property
+    def evictions(self):
+        """Gets the # of lines evicted
+
+        Args:
+            None
+
+        Returns:
+            # of lines evicted
+        """
+
+        return self.counts['evictions']
+
+
+
+    @property
+    def accesses(self):
+        """Gets the # of accesses, hits + misses
+
+        Args:
+            None
+
+        Returns:
+            # of accesses, hits + misses
+        """
+
+        return self.counts['hits'] + self.counts['misses']
+
+
+
+    @property
+    def miss_rate(self):
+        """Gets the fraction of accesses that missed, 0.0 before any access
+
+        Args:
+            None
+
+        Returns:
+            Fraction of accesses that missed, 0.0 before any access
+        """
+
+        accesses = self.accesses
+        return self.counts['misses'] / accesses if accesses else 0.0
+
+
+
+    def as_dict(self):
+        """Gets a copy of the counts that won't change as the simulation goes on
+
+        Args:
+            None
+
+        Returns:
+            Dict of hits/misses/evictions
+        """
+
+        return dict(self.counts)
+
+
+
+    def __eq__(self, other):
+        """Compares the counts with another SimStats or a dict of hits/misses/evictions
+
+        Args:
+            other (SimStats or dict): Stats to compare to
+
+        Returns:
+            True if all counts are the same
+        """
+
+        if isinstance(other, SimStats):
+            other = other.counts
+        return self.counts == other
+
+
+
+    def __repr__(self):
+        """Formats the counts like the stats dict, such as {'hits': 169, 'misses': 68, 'evictions': 66}
+
+        Args:
+            None
+
+        Returns:
+            Counts as a string
+        """
+
+        return repr(self.counts)
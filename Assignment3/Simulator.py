@@ -0,0 +1,329 @@
+import itertools
+from Cache import Cache
+from SimStats import SimStats
+from SetStats import SetStats
+
+class Simulator:
+    """Class to simulate one cache from code, without going through the command line
+
+    Example:
+        sim = Simulator(5, 4, 6, 'lru')
+        sim.access(0x7ff000398, 'S')
+        sim.access_batch(addresses)          #Any iterable of addresses, or a NumPy array
+        print(sim.stats.miss_rate)
+        sim.reset()
+
+    The command line simulator runs a single configuration through run, which also takes the verbose log,
+    miss rate windows and checkpoints. An access to the block accessed just before is a guaranteed hit,
+    so it is counted without a lookup unless the policy's state changes on it.
+
+    Attributes:
+        self.cache (Cache): Cache being simulated
+        self.stats (SimStats): Hits/misses/evictions so far
+        self.last_block (int): Block accessed by the last lookup, -1 before any
+        self.skip_repeats (bool): Whether repeated accesses to last_block can skip the lookup
+        self.set_stats (SetStats): Per-set and per-region counters, None unless enable_set_stats was called
+        self.records (int): # of trace records run has simulated, a resumed run picks up after them
+
+    """
+
+    #Bumped whenever a change gives different results, so stored results of older versions aren't reused
+    VERSION = 1
+
+    def __init__(self, set_bit_size, num_lines, offset_bit_size, policy_name='fifo', seed=None, max_addr_size=64):
+        """Builds the cache
+
+        Args:
+            set_bit_size (int): # of bits required to determine set
+            num_lines (int): # of lines per set
+            offset_bit_size (int): # of bits required to determine block offset
+            policy_name (str): Name of the replacement policy, a key of POLICIES
+            seed (int): Seed for the random replacement policy
+            max_addr_size (int): # of bits in each address
+
+        Returns:
+            None
+        """
+
+        self.cache = Cache(set_bit_size, num_lines, offset_bit_size, policy_name, seed, max_addr_size)
+        self.stats = SimStats(self.cache.stats)
+        self.last_block = -1
+        self.skip_repeats = not self.cache.policy.repeat_hits_change_state
+        self.set_stats = None
+        self.records = 0
+
+
+
+    def config(self):
+        """Gets everything the results depend on, to check a checkpoint is resumed with the same settings
+
+        Args:
+            None
+
+        Returns:
+            (s, E, b, policy, seed, address bits) tuple
+        """
+
+        return self.cache.config() + (self.cache.seed, self.cache.max_addr_size)
+
+
+
+    def enable_set_stats(self, region_bits=12):
+        """Starts keeping per-set and per-region counters, in self.set_stats
+
+        Args:
+            region_bits (int): # of low address bits dropped to get a region
+
+        Returns:
+            None
+        """
+
+        self.set_stats = SetStats(self.cache.set_mask + 1, self.cache.num_lines, region_bits)
+
+
+
+    def access(self, addr, op='L'):
+        """Simulates one access
+
+        Args:
+            addr (int): Address accessed
+            op (str): 'L' for a load, 'S' for a store, 'M' for a modify (a load then a store to the same address)
+
+        Returns:
+            'hit', 'miss' or 'miss eviction' for the first access, the second access of a modify always hits
+        """
+
+        assert op in ('L', 'S', 'M'), "Op must be L, S or M"
+        cache = self.cache
+        block = addr >> cache.offset_bit_size
+
+        if self.skip_repeats and block == self.last_block:
+            cache.stats['hits'] += 1
+            result = 'hit'
+        else:
+            result = cache.access_block(block)
+            self.last_block = block
+
+        if op == 'M':
+            if self.skip_repeats:
+                cache.stats['hits'] += 1
+            else:
+                cache.access_block(block)
+
+        if self.set_stats is not None:
+            self.set_stats.count(block & cache.set_mask, addr, result, 'hit' if op == 'M' else "")
+
+        return result
+
+
+
+    def access_batch(self, addresses, ops=None):
+        """Simulates a batch of accesses, cheaper per access than calling access for each one
+
+        Args:
+            addresses (iterable): Addresses accessed, such as a list or a NumPy integer array
+            ops (iterable): Op of each access, L/S/M characters such as the string 'LLSM', None if all are loads
+                            Other ops, like I, are skipped
+
+        Returns:
+            None
+        """
+
+        #NumPy arrays are turned into lists of Python ints in one call, much faster than iterating over the array
+        if hasattr(addresses, 'tolist'):
+            addresses = addresses.tolist()
+        if ops is None:
+            ops = itertools.repeat('L')
+        elif hasattr(ops, 'tolist'):
+            ops = ops.tolist()
+
+        if self.set_stats is not None:
+            for addr, op in zip(addresses, ops):
+                if op == 'L' or op == 'S' or op == 'M':
+                    self.access(addr, op)
+            return
+
+        cache = self.cache
+        stats = cache.stats
+        access_block = cache.access_block
+        offset_bit_size = cache.offset_bit_size
+        skip_repeats = self.skip_repeats
+        last_block = self.last_block
+        for addr, op in zip(addresses, ops):
+            if op != 'L' and op != 'S' and op != 'M':
+                continue
+
+            block = addr >> offset_bit_size
+            if skip_repeats and block == last_block:
+                stats['hits'] += 1
+            else:
+                access_block(block)
+                last_block = block
+
+            if op == 'M':
+                if skip_repeats:
+                    stats['hits'] += 1
+                else:
+                    access_block(block)
+
+        self.last_block = last_block
+
+
+
+    def run(self, records, access_log=None, window_stats=None, checkpoint=None, access_stream=None):
+        """Simulates every record of a trace, counting records from self.records so a resumed run carries on
+
+        Args:
+            records (iterable): (op, addr, size, trace) tuples, such as the ones from a TraceReader
+                                R/W records of a run length compacted trace count size repeated accesses
+            access_log (AccessLog): Open log to write the result of every record to, None for no log
+            window_stats (WindowStats): Open miss rate time series, None for no series
+            checkpoint (Checkpoint): Where to snapshot this simulator every so many records, None for no snapshots
+            access_stream (AccessStream): Splits straddling accesses and fetches I records, None to drop I records
+
+        Returns:
+            None
+        """
+
+        cache = self.cache
+        stats = cache.stats
+        skip_repeats = self.skip_repeats
+        last_block = self.last_block
+        set_stats = self.set_stats
+        if set_stats is not None:
+            set_hits = set_stats.hits
+            set_misses = set_stats.misses
+            miss_append = set_stats.miss_regions.append
+            region_bits = set_stats.region_bits
+            set_mask = cache.set_mask
+
+        #Only records that straddle a block or are I records go through the access stream
+        split_blocks = access_stream is not None and access_stream.split_blocks
+        if split_blocks:
+            block_size = 1 << access_stream.offset_bit_size
+            offset_mask = block_size - 1
+        fetch = access_stream.fetch if access_stream is not None and access_stream.icache is not None else None
+
+        #Windows and checkpoints are only looked at on the record they can next be due, so other records pay one compare
+        start = self.records
+        index = start - 1
+        next_mark = self.run_marks(start, start, window_stats, checkpoint)
+        for index, (op, addr, size, trace) in enumerate(records, start):
+            if index == next_mark:
+                self.last_block = last_block
+                next_mark = self.run_marks(index, start, window_stats, checkpoint)
+
+            if op in ['L', 'S', 'M']:
+                #A split access's pieces before its last block go through access, the last one carries on as this record
+                if split_blocks and (addr & offset_mask) + size > block_size:
+                    pieces = access_stream.split_access(addr, size)
+                    self.last_block = last_block
+                    for piece_addr, piece_size in pieces[:-1]:
+                        self.access(piece_addr, op)
+                    last_block = self.last_block
+                    addr, size = pieces[-1]
+
+                #Get the block address with a shift, block offset bits are dropped
+                block = addr >> cache.offset_bit_size
+
+                #Set stats are counted inline, where the result is already known, since this runs for every record.
+                #Miss regions are buffered and counted by run_marks, every SetStats.BATCH_SIZE records
+                if skip_repeats and block == last_block:
+                    stats['hits'] += 1
+                    result1 = 'hit'
+                    if set_stats is not None:
+                        set_hits[block & set_mask] += 1
+                else:
+                    result1 = cache.access_block(block)
+                    last_block = block
+                    if set_stats is not None:
+                        if result1 == 'hit':
+                            set_hits[block & set_mask] += 1
+                        else:
+                            set_misses[block & set_mask] += 1
+                            miss_append(addr >> region_bits)
+
+                #Modify is a load then a store to the same block, the store always hits
+                if op == 'M':
+                    if skip_repeats:
+                        stats['hits'] += 1
+                        result2 = 'hit'
+                    else:
+                        result2 = cache.access_block(block)
+                    if set_stats is not None:
+                        set_hits[block & set_mask] += 1
+                else:
+                    result2 = ""
+
+            elif op in ['R', 'W']:
+                #Repeated accesses folded together by run length compaction
+                cache.repeat_hits(addr >> cache.offset_bit_size, size)
+                result1 = 'hit'
+                result2 = ""
+                if set_stats is not None:
+                    set_stats.hits[(addr >> cache.offset_bit_size) & cache.set_mask] += size
+
+            else:
+                if op == 'I' and fetch is not None:
+                    fetch(addr, size)
+                continue
+
+            if access_log is not None:
+                access_log.log(index, op, addr, size, (addr >> cache.offset_bit_size) & cache.set_mask, result1, result2, trace)
+
+        self.last_block = last_block
+        self.records = index + 1
+
+
+
+    def run_marks(self, index, start, window_stats, checkpoint):
+        """Samples the miss rate window, saves a checkpoint if either is due before record index, and counts buffered set stats misses into regions
+
+        Args:
+            index (int): Index of the next record to simulate, every record before it has been simulated
+            start (int): Index of the first record of this run, a resumed run doesn't save a checkpoint it was just loaded from
+            window_stats (WindowStats): Miss rate time series, None if not kept
+            checkpoint (Checkpoint): Where to save snapshots, None if not saved
+
+        Returns:
+            Index of the next record any of them can be due at, -1 if none is used
+        """
+
+        marks = []
+        if self.set_stats is not None:
+            #Every record but a split access is at most one miss, so the buffered miss regions stay around the batch size
+            self.set_stats.count_regions()
+            marks.append((index // self.set_stats.BATCH_SIZE + 1) * self.set_stats.BATCH_SIZE)
+
+        if window_stats is not None:
+            #Every record is at least one access and, except for repeat records, at most two.
+            #Looking again after half the accesses left keeps rows on the first record boundary past the window end,
+            #for about log2(window) looks per window
+            marks.append(index + (window_stats.sample(self.cache.stats) + 1) // 2)
+
+        if checkpoint is not None:
+            if index % checkpoint.every == 0 and index != start:
+                self.records = index
+                window_state = window_stats.state() if window_stats is not None else None
+                checkpoint.save({'simulator': self, 'windows': window_state})
+            marks.append((index // checkpoint.every + 1) * checkpoint.every)
+
+        return min(marks) if marks else -1
+
+
+
+    def reset(self):
+        """Empties the cache and zeroes every counter, keeping the cache's arrays
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        self.cache.reset()
+        self.last_block = -1
+        self.records = 0
+        if self.set_stats is not None:
+            self.enable_set_stats(self.set_stats.region_bits)
@@ -0,0 +1,291 @@
+from array import array
+
+class ReuseStack:
+    """Class to measure LRU stack distances over a stream of block addresses
+
+    The stack distance of an access is the # of distinct other blocks accessed since the last access to the same block.
+    Each block's latest access time is marked in a Fenwick tree, so the distance is a prefix sum, O(log n) per access.
+    When the timestamps run out, live blocks are renumbered 1..k and the tree is rebuilt, so memory stays proportional
+    to the # of distinct blocks rather than the # of accesses.
+
+    Attributes:
+        self.last (dict): Latest access time of each block seen
+        self.tree (array): Fenwick tree over access times, 1 at each block's latest access time
+        self.capacity (int): # of timestamps the tree can hold before it is compacted
+        self.time (int): Time of the most recent access
+
+    """
+
+    #Smallest tree that is allocated
+    MIN_CAPACITY = 16
+
+    def __init__(self):
+        """Creates an empty stack
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        self.last = {}
+        self.capacity = self.MIN_CAPACITY
+        self.tree = array('l', bytes(8 * (self.capacity + 1)))
+        self.time = 0
+
+
+
+    def access(self, block):
+        """Records an access and gets its stack distance
+
+        Args:
+            block (int): Block address accessed
+
+        Returns:
+            Stack distance, or -1 if this is the first access to block (a cold miss)
+        """
+
+        if self.time == self.capacity:
+            self.compact()
+
+        tree = self.tree
+        self.time += 1
+        time = self.time
+
+        last_time = self.last.get(block)
+        if last_time is None:
+            distance = -1
+        else:
+            #Marks after last_time are the distinct blocks accessed since, the mark at last_time itself is block
+            distance = 0
+            i = time - 1
+            while i > 0:
+                distance += tree[i]
+                i &= i - 1
+            i = last_time
+            while i > 0:
+                distance -= tree[i]
+                i &= i - 1
+
+            i = last_time
+            while i <= self.capacity:
+                tree[i] -= 1
+                i += i & -i
+
+        i = time
+        while i <= self.capacity:
+            tree[i] += 1
+            i += i & -i
+        self.last[block] = time
+
+        return distance
+
+
+
+    def compact(self):
+        """Renumbers live blocks 1..k in access order and rebuilds the tree with room for at least as many new accesses
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        blocks = sorted(self.last, key=self.last.__getitem__)
+        self.last = {block: time for time, block in enumerate(blocks, 1)}
+        self.time = len(blocks)
+        self.capacity = max(2 * self.time, self.MIN_CAPACITY)
+
+        #Build the tree in O(n), every live time has a mark of 1
+        tree = array('l', bytes(8 * (self.capacity + 1)))
+        for i in range(1, self.capacity + 1):
+            if i <= self.time:
+                tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= self.capacity:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+
+
+class StackDistance:
+    """Class for Mattson stack distance analysis, giving LRU miss ratios at every associativity in one pass
+
+    A per-set stack gives distances within each set, an LRU cache with 2^s sets and E lines misses exactly on
+    the accesses with a per-set distance >= E. A global stack gives the same for a fully associative cache of any size.
+
+    Attributes:
+        self.set_bit_size (int): # of bits required to determine set
+        self.offset_bit_size (int): # of bits required to determine block offset
+        self.set_mask (int): Mask applied to a block address to get its set
+        self.global_stack (ReuseStack): Stack over all blocks
+        self.set_stacks (dict): Stack of each set that has been accessed, keyed by set
+        self.global_hist (dict): # of accesses at each global stack distance
+        self.set_hist (dict): # of accesses at each per-set stack distance
+        self.accesses (int): # of accesses seen
+        self.cold (int): # of first accesses to a block
+
+    """
+
+    def __init__(self, set_bit_size, offset_bit_size):
+        """Creates empty stacks and histograms
+
+        Args:
+            set_bit_size (int): # of bits required to determine set
+            offset_bit_size (int): # of bits required to determine block offset
+
+        Returns:
+            None
+        """
+
+        self.set_bit_size = set_bit_size
+        self.offset_bit_size = offset_bit_size
+        self.set_mask = 2**set_bit_size - 1
+        self.global_stack = ReuseStack()
+        self.set_stacks = {}
+        self.global_hist = {}
+        self.set_hist = {}
+        self.accesses = 0
+        self.cold = 0
+
+
+
+    def access_block(self, block):
+        """Records the global and per-set stack distance of an access
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+
+        Returns:
+            None
+        """
+
+        self.accesses += 1
+
+        distance = self.global_stack.access(block)
+        if distance == -1:
+            #First access to a block is a miss at every size, in both the global and per-set stacks
+            self.cold += 1
+        else:
+            self.global_hist[distance] = self.global_hist.get(distance, 0) + 1
+
+        set_index = block & self.set_mask
+        set_stack = self.set_stacks.get(set_index)
+        if set_stack is None:
+            set_stack = self.set_stacks[set_index] = ReuseStack()
+        distance = set_stack.access(block)
+        if distance != -1:
+            self.set_hist[distance] = self.set_hist.get(distance, 0) + 1
+
+
+
+    def run(self, records):
+        """Feeds the accesses of every load/store/modify record to the stacks
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            None
+        """
+
+        #Accesses to the block accessed just before are at distance 0 and leave every stack unchanged,
+        #since the block is already on top, so they are only counted, and added to the histograms at the end
+        offset_bit_size = self.offset_bit_size
+        access_block = self.access_block
+        last_block = -1
+        repeats = 0
+        for record in records:
+            op = record[0]
+            if op == 'L' or op == 'S' or op == 'M':
+                block = record[1] >> offset_bit_size
+                if block == last_block:
+                    repeats += 1
+                else:
+                    access_block(block)
+                    last_block = block
+
+                #Modify is a load then a store to the same block
+                if op == 'M':
+                    repeats += 1
+
+            elif op == 'R' or op == 'W':
+                #Repeated accesses folded together by run length compaction
+                repeats += record[2]
+
+        if repeats:
+            self.accesses += repeats
+            self.global_hist[0] = self.global_hist.get(0, 0) + repeats
+            self.set_hist[0] = self.set_hist.get(0, 0) + repeats
+
+
+
+    def miss_curve(self, hist):
+        """Turns a stack distance histogram into a miss curve
+
+        Args:
+            hist (dict): # of accesses at each stack distance
+
+        Returns:
+            List of (size, misses) tuples for sizes 1 through the largest distance + 1, after which only cold misses are left
+        """
+
+        max_distance = max(hist) if hist else 0
+        misses = self.cold + sum(hist.values())
+        curve = []
+        for size in range(1, max_distance + 2):
+            #Accesses at distance size - 1 now hit
+            misses -= hist.get(size - 1, 0)
+            curve.append((size, misses))
+
+        return curve
+
+
+
+    def report(self):
+        """Builds tables of LRU miss ratio by associativity and by fully associative capacity
+
+        Per-set rows are listed for every E, global rows for power of 2 capacities and the largest one needed
+
+        Args:
+            None
+
+        Returns:
+            Tables as a string
+        """
+
+        accesses = self.accesses or 1
+        rows = ["Accesses: {}  Cold misses: {}".format(self.accesses, self.cold), "",
+                "LRU, s = {}, b = {}, by associativity".format(self.set_bit_size, self.offset_bit_size),
+                "{:>8} {:>12} {:>9}".format('E', 'misses', 'miss rate')]
+        for size, misses in self.miss_curve(self.set_hist):
+            rows.append("{:>8} {:>12} {:>9.4f}".format(size, misses, misses / accesses))
+
+        rows += ["", "LRU, fully associative, b = {}, by capacity".format(self.offset_bit_size),
+                 "{:>10} {:>12} {:>12} {:>9}".format('lines', 'bytes', 'misses', 'miss rate')]
+        curve = self.miss_curve(self.global_hist)
+        for size, misses in curve:
+            if size & (size - 1) == 0 or size == len(curve):
+                rows.append("{:>10} {:>12} {:>12} {:>9.4f}".format(size, size << self.offset_bit_size, misses, misses / accesses))
+
+        return '\n'.join(rows)
+
+
+
+    def write_csv(self, prefix):
+        """Writes the full histograms and miss curves to <prefix>_set.csv and <prefix>_global.csv
+
+        Args:
+            prefix (str): Path prefix of the CSV files
+
+        Returns:
+            None
+        """
+
+        for name, hist in (('set', self.set_hist), ('global', self.global_hist)):
+            with open("{}_{}.csv".format(prefix, name), 'w') as f:
+                f.write("distance,count,size,misses\n")
+                for size, misses in self.miss_curve(hist):
+                    f.write("{},{},{},{}\n".format(size - 1, hist.get(size - 1, 0), size, misses))
@@ -0,0 +1,212 @@
+import random
+import itertools
+
+class TraceGenerator:
+    """Class to generate seeded synthetic traces of common access patterns, at any length
+
+    Every pattern is a generator of (op, addr, size) records, so traces of 10^8 accesses are streamed, not built in memory.
+    Patterns repeat from the start once they run out, and are cut off at the requested # of records.
+    Patterns:
+        sequential: loads walking through an array one element at a time
+        strided: loads walking through an array a fixed stride at a time
+        random: loads and stores to random elements of an array
+        transpose: B[j][i] = A[i][j] over square matrices, a load of A and a store to B per element
+        matmul: blocked C += A*B over square matrices, loads of A and B with a modify of C after each inner loop
+        pointer: loads following a linked list laid out in a random cycle, so each address depends on the last
+
+    Attributes:
+        self.seed (int): Seed for the patterns that use randomness
+        self.base_addr (int): Address of the first array
+        self.elem_size (int): Size of each element in bytes, also the size of each access
+
+    """
+
+    PATTERNS = ('sequential', 'strided', 'random', 'transpose', 'matmul', 'pointer')
+
+    def __init__(self, seed=0, base_addr=0x10000000, elem_size=8):
+        """Sets the seed and memory layout
+
+        Args:
+            seed (int): Seed for the patterns that use randomness
+            base_addr (int): Address of the first array
+            elem_size (int): Size of each element in bytes
+
+        Returns:
+            None
+        """
+
+        self.seed = seed
+        self.base_addr = base_addr
+        self.elem_size = elem_size
+
+
+
+    def generate(self, pattern, count):
+        """Generates a trace of one pattern
+
+        Args:
+            pattern (str): Pattern to generate, one of PATTERNS
+            count (int): # of records to generate
+
+        Returns:
+            Iterator of (op, addr, size) tuples
+        """
+
+        assert pattern in self.PATTERNS, "Pattern must be one of: {}".format(', '.join(self.PATTERNS))
+        return itertools.islice(getattr(self, pattern)(), count)
+
+
+
+    def sequential(self, num_elems=1 << 20):
+        """Loads through an array one element at a time
+
+        Args:
+            num_elems (int): # of elements in the array
+
+        Yields:
+            (op, addr, size) tuple for each access
+        """
+
+        base = self.base_addr
+        size = self.elem_size
+        while True:
+            for i in range(num_elems):
+                yield 'L', base + i*size, size
+
+
+
+    def strided(self, num_elems=1 << 20, stride=16):
+        """Loads through an array stride elements at a time, starting over at the next element once past the end
+
+        Args:
+            num_elems (int): # of elements in the array
+            stride (int): # of elements between accesses
+
+        Yields:
+            (op, addr, size) tuple for each access
+        """
+
+        base = self.base_addr
+        size = self.elem_size
+        while True:
+            for start in range(stride):
+                for i in range(start, num_elems, stride):
+                    yield 'L', base + i*size, size
+
+
+
+    def random(self, num_elems=1 << 20, store_ratio=0.25):
+        """Loads and stores to uniformly random elements of an array
+
+        Args:
+            num_elems (int): # of elements in the array
+            store_ratio (float): Fraction of accesses that are stores
+
+        Yields:
+            (op, addr, size) tuple for each access
+        """
+
+        rng = random.Random(self.seed)
+        base = self.base_addr
+        size = self.elem_size
+        while True:
+            op = 'S' if rng.random() < store_ratio else 'L'
+            yield op, base + rng.randrange(num_elems)*size, size
+
+
+
+    def transpose(self, n=512):
+        """Transposes an n x n matrix A into B, both row-major with B right after A
+
+        Args:
+            n (int): # of rows and columns
+
+        Yields:
+            (op, addr, size) tuple for each access
+        """
+
+        size = self.elem_size
+        a = self.base_addr
+        b = a + n*n*size
+        while True:
+            for i in range(n):
+                for j in range(n):
+                    yield 'L', a + (i*n + j)*size, size
+                    yield 'S', b + (j*n + i)*size, size
+
+
+
+    def matmul(self, n=256, block=32):
+        """Blocked C += A*B over n x n row-major matrices, laid out A, B, C
+
+        Args:
+            n (int): # of rows and columns
+            block (int): Tile size, n should be a multiple of it
+
+        Yields:
+            (op, addr, size) tuple for each access
+        """
+
+        size = self.elem_size
+        a = self.base_addr
+        b = a + n*n*size
+        c = b + n*n*size
+        while True:
+            for ii in range(0, n, block):
+                for jj in range(0, n, block):
+                    for kk in range(0, n, block):
+                        for i in range(ii, min(ii + block, n)):
+                            for j in range(jj, min(jj + block, n)):
+                                for k in range(kk, min(kk + block, n)):
+                                    yield 'L', a + (i*n + k)*size, size
+                                    yield 'L', b + (k*n + j)*size, size
+                                #Running sum is kept in a register, so C[i][j] is read and written once per k tile
+                                yield 'M', c + (i*n + j)*size, size
+
+
+
+    def pointer(self, num_nodes=1 << 16, node_size=64):
+        """Follows a linked list whose nodes are visited in one random cycle, loading each node's next pointer
+
+        Args:
+            num_nodes (int): # of nodes in the list
+            node_size (int): Size of each node in bytes
+
+        Yields:
+            (op, addr, size) tuple for each access
+        """
+
+        rng = random.Random(self.seed)
+        order = list(range(num_nodes))
+        rng.shuffle(order)
+        base = self.base_addr
+        size = self.elem_size
+        while True:
+            for node in order:
+                yield 'L', base + node*node_size, size
+
+
+
+def write_text_trace(path, records):
+    """Writes records as a valgrind text trace, data accesses start with a space like valgrind's do
+
+    Args:
+        path (str): Path of the trace file
+        records (iterable): (op, addr, size) tuples
+
+    Returns:
+        # of records written
+    """
+
+    records = iter(records)
+    count = 0
+    with open(path, 'w') as f:
+        #Lines are joined in batches, one write per line would dominate for big traces
+        while True:
+            batch = [" {} {:x},{}\n".format(op, addr, size) for op, addr, size in itertools.islice(records, 1 << 16)]
+            if not batch:
+                break
+            f.write(''.join(batch))
+            count += len(batch)
+
+    return count
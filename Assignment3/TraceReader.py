@@ -0,0 +1,241 @@
+import sys
+import io
+import gzip
+import lzma
+import os
+import itertools
+from BinaryTrace import BinaryTrace, is_binary_trace
+from ParallelParser import ParallelParser
+
+class TraceReader:
+    """Class to read a valgrind trace in a single streaming pass
+
+    Works on regular files, named pipes, stdin (path of '-'), and .gz/.xz compressed traces.
+    Only one line is held in memory at a time, so memory does not grow with the trace.
+    Regular files in the binary trace format are detected by their header and replayed through a memory map instead.
+    With more than one job, regular uncompressed text files are parsed in chunks by a ParallelParser instead.
+
+    Attributes:
+        self.trace_path (str): Path to the trace file to read from, '-' for stdin
+        self.file (file object): Open text stream for the trace, None until opened or if the trace is binary
+        self.binary_trace (BinaryTrace): Open binary trace, None unless the trace is binary
+        self.run_offset_bits (int): Block offset bits a binary trace was run length compacted at, None if it wasn't
+        self.records_read (int): # of records in the trace, set once read_windows reaches the end of it
+        self.jobs (int): # of worker processes to parse a text trace with, 1 to parse it in this process
+        self.parallel (bool): Whether iterating goes through a ParallelParser, only for regular uncompressed text files
+
+    """
+
+    def __init__(self, trace_path, jobs=1):
+        """Sets the trace path, the trace is not opened until used as a context manager
+
+        Args:
+            trace_path (str): Path to the trace file to read from, '-' for stdin
+            jobs (int): # of worker processes to parse a text trace with, 1 to parse it in this process
+                        Records parsed in parallel have no trace line, so don't use more than 1 for verbose output
+
+        Returns:
+            None
+        """
+
+        self.trace_path = trace_path
+        self.file = None
+        self.binary_trace = None
+        self.run_offset_bits = None
+        self.records_read = None
+        self.jobs = jobs
+        self.parallel = False
+
+
+
+    def __enter__(self):
+        """Opens the trace, picking the right stream for stdin, compressed files and binary traces
+
+        Args:
+            None
+
+        Returns:
+            self
+        """
+
+        if self.trace_path == '-':
+            self.file = io.TextIOWrapper(sys.stdin.buffer, encoding='ascii')
+        elif self.trace_path.endswith('.gz'):
+            self.file = gzip.open(self.trace_path, 'rt')
+        elif self.trace_path.endswith('.xz'):
+            self.file = lzma.open(self.trace_path, 'rt')
+        elif os.path.isfile(self.trace_path) and is_binary_trace(self.trace_path):
+            self.binary_trace = BinaryTrace(self.trace_path).__enter__()
+            self.run_offset_bits = self.binary_trace.run_offset_bits
+        else:
+            self.file = open(self.trace_path, 'r')
+            self.parallel = self.jobs > 1 and os.path.isfile(self.trace_path)
+
+        return self
+
+
+
+    def __exit__(self, *exc):
+        """Closes the trace stream or binary trace
+
+        Args:
+            exc: Exception info, unused
+
+        Returns:
+            None
+        """
+
+        if self.binary_trace is not None:
+            self.binary_trace.__exit__(*exc)
+        else:
+            self.file.close()
+
+
+
+    def skip(self, count):
+        """Skips the first count records, without parsing them, must be called before iterating
+        Binary traces jump straight to the record, text traces read past count non-empty lines
+
+        Args:
+            count (int): # of records to skip
+
+        Returns:
+            None
+        """
+
+        if self.binary_trace is not None:
+            self.binary_trace.start = count
+            return
+
+        skipped = 0
+        while skipped < count:
+            line = self.file.readline()
+            assert line, "{} has fewer than {} records".format(self.trace_path, count)
+            if line.strip():
+                skipped += 1
+
+
+
+    def __iter__(self):
+        """Goes line-by-line through the trace, parsing each non-empty line
+
+        Args:
+            None
+
+        Yields:
+            (op, addr, size, trace) tuple, where op is the (op)eration character, addr is the int address,
+            size is the int access size, and trace is the stripped line for verbose output (None for binary traces
+            and traces parsed in parallel)
+        """
+
+        if self.binary_trace is not None:
+            for op, addr, size in self.binary_trace:
+                yield op, addr, size, None
+            return
+
+        #Parsing picks up after any lines skip read past
+        if self.parallel:
+            yield from ParallelParser(self.trace_path, self.jobs, self.file.tell())
+            return
+
+        yield from self.parse_lines(self.file)
+
+
+
+    def parse_lines(self, lines):
+        """Parses each non-empty line of a text trace
+
+        Args:
+            lines (iterable): Lines of the trace, such as the open file
+
+        Yields:
+            (op, addr, size, trace) tuple, the same as iterating gives
+        """
+
+        for trace in lines:
+            trace = trace.strip()
+
+            #If the line is not an empty string, process it
+            if trace:
+                #Get (op)eration, (addr)ess, and size from each line
+                trace_split = trace[2:].split(',')
+                addr = int(trace_split[0].replace(' ', ''), base=16)
+                size = int(trace_split[1]) if len(trace_split) > 1 else 0
+
+                yield trace[0], addr, size, trace
+
+
+
+    def read_windows(self, windows):
+        """Reads only the records in the given windows, skipping the records between them without parsing them
+        Binary traces jump straight to each window. Text traces count lines rather than non-empty lines here,
+        so the lines between windows are only read, which is several times cheaper than parsing them
+
+        Args:
+            windows (iterable): (start, end) ranges of record indexes, in order and not overlapping, may be endless
+
+        Yields:
+            List of (op, addr, size, trace) tuples for each window, the last one may be cut short by the end of the trace
+            Once the trace runs out, self.records_read holds the # of records (or lines) in it
+        """
+
+        if self.binary_trace is not None:
+            count = self.binary_trace.count
+            for start, end in windows:
+                if start >= count:
+                    break
+                yield [(chr(op), addr, size, None) for addr, size, op in self.binary_trace.read(start, end)]
+            self.records_read = count
+            return
+
+        position = 0
+        for start, end in windows:
+            position += self.discard(start - position)
+            if position < start:
+                break
+
+            lines = list(itertools.islice(self.file, end - start))
+            position += len(lines)
+            yield [self.parse(line) for line in lines if not line.isspace()]
+            if position < end:
+                break
+
+        position += self.discard(-1)
+        self.records_read = position
+
+
+
+    def discard(self, count):
+        """Reads past lines of a text trace without parsing them
+
+        Args:
+            count (int): # of lines to read past, -1 for the rest of the trace
+
+        Returns:
+            # of lines read past, less than count if the trace ended
+        """
+
+        lines = self.file if count == -1 else itertools.islice(self.file, count)
+        discarded = 0
+        for discarded, _ in enumerate(lines, 1):
+            pass
+        return discarded
+
+
+
+    def parse(self, line):
+        """Parses one non-empty line of a text trace
+
+        Args:
+            line (str): Line of the trace
+
+        Returns:
+            (op, addr, size, trace) tuple, the same as iterating gives
+        """
+
+        trace = line.strip()
+        trace_split = trace[2:].split(',')
+        addr = int(trace_split[0].replace(' ', ''), base=16)
+        size = int(trace_split[1]) if len(trace_split) > 1 else 0
+
+        return trace[0], addr, size, trace
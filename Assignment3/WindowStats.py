@@ -0,0 +1,137 @@
+import sys
+
+class WindowStats:
+    """Class to sample a cache's hits/misses/evictions every N accesses, as a time series of windows
+
+    Each row has the # of accesses so far and the hits/misses/evictions and miss rate of the window that just ended,
+    so phases of the trace show up as changes in the miss rate. Rows are written at the first record boundary
+    at or after every multiple of N accesses, a record of many repeated accesses can carry a window past it.
+
+    Attributes:
+        self.window (int): # of accesses per window
+        self.path (str): Path of the CSV file, None for stdout
+        self.file (file object): Open output, None until opened
+        self.next_end (int): # of accesses at which the current window ends
+        self.last (tuple): (accesses, hits, misses, evictions) when the last row was written
+
+    """
+
+    def __init__(self, window, path=None):
+        """Sets the window size and output, nothing is opened until open is called
+
+        Args:
+            window (int): # of accesses per window
+            path (str): Path of the CSV file, None for stdout
+
+        Returns:
+            None
+        """
+
+        assert window > 0, "Window size must be positive"
+        self.window = window
+        self.path = path
+        self.file = None
+        self.next_end = window
+        self.last = (0, 0, 0, 0)
+
+
+
+    def open(self, state=None):
+        """Opens the output, picking up from a saved state if one is given
+
+        Args:
+            state (dict): State from a checkpoint, from self.state, None to start a new series
+
+        Returns:
+            None
+        """
+
+        if self.path is None:
+            self.file = sys.stdout
+        elif state is None:
+            self.file = open(self.path, 'w')
+        else:
+            #Rows written after the checkpoint are written again by the resumed run, drop them
+            self.file = open(self.path, 'r+')
+            self.file.truncate(state['file_size'])
+            self.file.seek(state['file_size'])
+
+        if state is None:
+            self.file.write("accesses,hits,misses,evictions,miss_rate\n")
+        else:
+            self.next_end = state['next_end']
+            self.last = state['last']
+
+
+
+    def sample(self, stats):
+        """Writes a row if the current window has ended
+
+        Args:
+            stats (dict): Cache stats, with hits/misses/evictions
+
+        Returns:
+            # of accesses left in the current window, at least 1
+        """
+
+        accesses = stats['hits'] + stats['misses']
+        if accesses >= self.next_end:
+            self.write_row(stats)
+            self.next_end = (accesses // self.window + 1) * self.window
+
+        return self.next_end - accesses
+
+
+
+    def write_row(self, stats):
+        """Writes a row for the accesses since the last row
+
+        Args:
+            stats (dict): Cache stats, with hits/misses/evictions
+
+        Returns:
+            None
+        """
+
+        accesses = stats['hits'] + stats['misses']
+        hits = stats['hits'] - self.last[1]
+        misses = stats['misses'] - self.last[2]
+        evictions = stats['evictions'] - self.last[3]
+        self.file.write("{},{},{},{},{:.6f}\n".format(accesses, hits, misses, evictions, misses / (hits + misses)))
+        self.last = (accesses, stats['hits'], stats['misses'], stats['evictions'])
+
+
+
+    def state(self):
+        """Gets what a checkpoint needs to continue the series, flushing the output so the file size is right
+
+        Args:
+            None
+
+        Returns:
+            Dict of the window position and file size
+        """
+
+        self.file.flush()
+        file_size = self.file.tell() if self.path is not None else 0
+        return {'next_end': self.next_end, 'last': self.last, 'file_size': file_size}
+
+
+
+    def close(self, stats):
+        """Writes a row for the partial window at the end of the trace, then closes the output if it is a file
+
+        Args:
+            stats (dict): Final cache stats
+
+        Returns:
+            None
+        """
+
+        if stats['hits'] + stats['misses'] > self.last[0]:
+            self.write_row(stats)
+
+        if self.path is None:
+            self.file.flush()
+        else:
+            self.file.close()
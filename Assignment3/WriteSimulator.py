@@ -0,0 +1,217 @@
+class WriteSimulator:
+    """Class to simulate one cache's write policy, and the traffic it makes to the next level
+
+    Write-back caches keep a set of dirty blocks, a store marks its block dirty and a dirty line is written back to
+    the next level when it is evicted. Write-through caches send every store's bytes to the next level and never
+    have dirty lines. Without write-allocate a store miss writes around the cache, the block isn't filled.
+    Loads always allocate, and every fill reads a whole block from the next level.
+    With write-back and write-allocate, the default, hits/misses/evictions are the same as a plain run's.
+    The average memory access time is hit_time + miss rate * miss_penalty, with stores treated like loads.
+
+    Attributes:
+        self.cache (Cache): Cache being simulated
+        self.write_back (bool): Whether stores mark lines dirty instead of writing through to the next level
+        self.write_allocate (bool): Whether a store miss fills the block, like a load miss
+        self.hit_time (float): Cycles of a hit
+        self.miss_penalty (float): Extra cycles of a miss
+        self.block_size (int): # of bytes in a block
+        self.dirty (set): Blocks with dirty lines in the cache
+        self.skip_repeats (bool): Whether repeated accesses to last_block can skip the lookup
+        self.last_block (int): Block of the last access, which is in the cache, -1 if unknown
+        self.loads (int): # of load accesses, including the load of a modify
+        self.stores (int): # of store accesses, including the store of a modify
+        self.store_misses (int): # of stores that missed
+        self.dirty_evictions (int): # of dirty lines evicted, and written back
+        self.bytes_read (int): # of bytes read from the next level by fills
+        self.bytes_written (int): # of bytes written to the next level, by writebacks, write-through and write-around
+
+    """
+
+    WRITE_POLICIES = ('back', 'through')
+
+    def __init__(self, cache, write_policy='back', write_allocate=True, hit_time=1, miss_penalty=100):
+        """Sets the write policy and latencies
+
+        Args:
+            cache (Cache): Empty cache to simulate
+            write_policy (str): 'back' or 'through'
+            write_allocate (bool): Whether a store miss fills the block
+            hit_time (float): Cycles of a hit
+            miss_penalty (float): Extra cycles of a miss
+
+        Returns:
+            None
+        """
+
+        assert write_policy in self.WRITE_POLICIES, "Write policy must be one of: {}".format(', '.join(self.WRITE_POLICIES))
+        assert hit_time >= 0 and miss_penalty >= 0, "Hit time and miss penalty can't be negative"
+        self.cache = cache
+        self.write_back = write_policy == 'back'
+        self.write_allocate = write_allocate
+        self.hit_time = hit_time
+        self.miss_penalty = miss_penalty
+        self.block_size = 1 << cache.offset_bit_size
+        self.dirty = set()
+        self.skip_repeats = not cache.policy.repeat_hits_change_state
+        self.last_block = -1
+        self.loads = 0
+        self.stores = 0
+        self.store_misses = 0
+        self.dirty_evictions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+
+    def load(self, block):
+        """Simulates a load, which always allocates
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+
+        Returns:
+            'hit', 'miss' or 'miss eviction'
+        """
+
+        self.loads += 1
+        cache = self.cache
+        if self.skip_repeats and block == self.last_block:
+            cache.stats['hits'] += 1
+            return 'hit'
+
+        result = cache.access_block(block)
+        self.last_block = block
+        if result != 'hit':
+            self.fill(result)
+
+        return result
+
+
+
+    def store(self, block, size):
+        """Simulates a store, marking its line dirty or writing it through, and writing around the cache on a miss without write-allocate
+
+        Args:
+            block (int): The block address, address shifted right by the offset bits
+            size (int): # of bytes stored
+
+        Returns:
+            'hit', 'miss' or 'miss eviction'
+        """
+
+        self.stores += 1
+        cache = self.cache
+        if self.skip_repeats and block == self.last_block:
+            cache.stats['hits'] += 1
+            result = 'hit'
+        elif self.write_allocate or block in cache.lines:
+            result = cache.access_block(block)
+            self.last_block = block
+            if result != 'hit':
+                self.store_misses += 1
+                self.fill(result)
+        else:
+            #Write-around, the block still isn't cached so the next access to it can't skip the lookup
+            cache.stats['misses'] += 1
+            self.store_misses += 1
+            self.bytes_written += size
+            self.last_block = -1
+            return 'miss'
+
+        if self.write_back:
+            self.dirty.add(block)
+        else:
+            self.bytes_written += size
+
+        return result
+
+
+
+    def fill(self, result):
+        """Counts the traffic of a miss that filled a block, writing back the line it evicted if that was dirty
+
+        Args:
+            result (str): 'miss' or 'miss eviction', the evicted block is in the cache's evicted_block
+
+        Returns:
+            None
+        """
+
+        self.bytes_read += self.block_size
+        if result == 'miss eviction' and self.cache.evicted_block in self.dirty:
+            self.dirty.remove(self.cache.evicted_block)
+            self.dirty_evictions += 1
+            self.bytes_written += self.block_size
+
+
+
+    def run(self, records):
+        """Simulates every record of a trace
+
+        Args:
+            records (iterable): (op, addr, size, ...) tuples, such as the ones from a TraceReader
+
+        Returns:
+            None
+        """
+
+        offset_bit_size = self.cache.offset_bit_size
+        load = self.load
+        store = self.store
+        for record in records:
+            op = record[0]
+            if op == 'L':
+                load(record[1] >> offset_bit_size)
+            elif op == 'S':
+                store(record[1] >> offset_bit_size, record[2])
+            elif op == 'M':
+                #Modify is a load then a store to the same block
+                block = record[1] >> offset_bit_size
+                load(block)
+                store(block, record[2])
+            elif op == 'R' or op == 'W':
+                #Folded repeats are hits to the block just accessed, and don't keep the stores' sizes
+                assert self.write_back and self.write_allocate, "Run length compacted traces only work with write-back and write-allocate"
+                block = record[1] >> offset_bit_size
+                self.cache.repeat_hits(block, record[2])
+                if op == 'R':
+                    self.loads += record[2]
+                else:
+                    self.stores += record[2]
+                    self.dirty.add(block)
+
+
+
+    def amat(self):
+        """Estimates the average memory access time
+
+        Args:
+            None
+
+        Returns:
+            hit_time + miss rate * miss_penalty, in cycles
+        """
+
+        stats = self.cache.stats
+        accesses = stats['hits'] + stats['misses']
+        return self.hit_time + (stats['misses'] / accesses if accesses else 0.0) * self.miss_penalty
+
+
+
+    def report(self):
+        """Builds a summary of the write policy, the traffic to and from the next level and the AMAT
+
+        Args:
+            None
+
+        Returns:
+            Summary as a string
+        """
+
+        return '\n'.join([
+            "Write policy: write-{}, {}".format('back' if self.write_back else 'through', 'write-allocate' if self.write_allocate else 'no-write-allocate'),
+            "Loads: {}  Stores: {}  Store misses: {}".format(self.loads, self.stores, self.store_misses),
+            "Dirty evictions: {}  Dirty lines left: {}".format(self.dirty_evictions, len(self.dirty)),
+            "Bytes from next level: {}  Bytes to next level: {}".format(self.bytes_read, self.bytes_written),
+            "AMAT: {:.3f} cycles (hit time {:g}, miss penalty {:g})".format(self.amat(), self.hit_time, self.miss_penalty),
+        ])
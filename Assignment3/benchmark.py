@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+
+"""Purpose of this module is to benchmark the cache simulator on synthetic traces.
+Generates seeded traces of common access patterns, runs cache.py on each one for every configuration,
+and reports accesses per second and peak RSS. Small traces are cross-checked against csim-ref.
+Module is meant as a stand alone, not meant to be imported anywhere
+
+Example:
+    python3 benchmark.py -n 4-6 --patterns sequential,random --configs 5:1:5,8:4:6
+"""
+
+import sys
+import os
+import ast
+import time
+import shutil
+import tempfile
+import subprocess
+from TraceReader import TraceReader
+from BinaryTrace import BinaryTrace
+from TraceGenerator import TraceGenerator, write_text_trace
+
+class Benchmark:
+    """Class to benchmark cache.py on generated traces and cross-check it against csim-ref
+
+    Attributes:
+        self.exponents (list): Trace lengths to generate, as powers of 10
+        self.patterns (list): Patterns to generate, each one of TraceGenerator.PATTERNS
+        self.configs (list): (s, E, b, policy) tuple for each configuration to run
+        self.seed (int): Seed for the generators
+        self.binary (bool): Whether the simulator replays binary versions of the traces
+        self.check_limit (int): Largest trace, in records, that is cross-checked against csim-ref
+        self.keep_dir (str): Directory to keep the generated traces in, None to delete them
+        self.here (str): Directory of this module, where cache.py and wmucachelab2 are
+        self.ref_path (str): Path to csim-ref, None if it can't be run
+
+    """
+
+    #Runs cache.py and reports its peak RSS on stderr when it exits.
+    #The rusage of a child counts the RSS it had before exec, which is a copy of this process, so the
+    #high water mark of the exec'd process is read from /proc instead, falling back to rusage where there is no /proc
+    RUNNER = """
+import sys, runpy, atexit, resource
+
+def report_rss():
+    try:
+        with open('/proc/self/status') as f:
+            rss_kb = [line.split()[1] for line in f if line.startswith('VmHWM:')][0]
+    except OSError:
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stdout.flush()
+    sys.stderr.write(str(rss_kb) + '\\n')
+
+atexit.register(report_rss)
+sys.argv = sys.argv[1:]
+sys.path.insert(0, '.')
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+    def __init__(self, args):
+        """Checks arguments, cross-checks the shipped traces, then benchmarks every pattern and size
+
+        Args:
+            args (list): Command line arguments passed in
+
+        Returns:
+            None
+        """
+
+        self.check_args(args)
+        self.here = os.path.dirname(os.path.abspath(__file__))
+        self.ref_path = os.path.join(self.here, 'wmucachelab2', 'csim-ref')
+        if not os.access(self.ref_path, os.X_OK):
+            print("csim-ref not found or not executable, skipping cross-checks")
+            self.ref_path = None
+
+        trace_dir = self.keep_dir or tempfile.mkdtemp(prefix='csim-bench-')
+        try:
+            failures = self.check_shipped_traces()
+            failures += self.run_benchmarks(trace_dir)
+        finally:
+            if self.keep_dir is None:
+                shutil.rmtree(trace_dir)
+
+        if failures:
+            print("{} cross-check(s) against csim-ref failed".format(failures))
+            sys.exit(1)
+
+
+
+    def check_shipped_traces(self):
+        """Cross-checks hits/misses/evictions against csim-ref on the traces in wmucachelab2/traces
+
+        Args:
+            None
+
+        Returns:
+            # of mismatches
+        """
+
+        if self.ref_path is None:
+            return 0
+
+        trace_dir = os.path.join(self.here, 'wmucachelab2', 'traces')
+        failures = 0
+        checked = 0
+        for name in sorted(os.listdir(trace_dir)):
+            for config in self.configs:
+                if config[3] != 'fifo':
+                    continue
+                result = self.run_sim(os.path.join(trace_dir, name), config)[0]
+                if result != self.run_ref(os.path.join(trace_dir, name), config):
+                    print("DIFF {} {}".format(name, self.format_config(config)))
+                    failures += 1
+                checked += 1
+
+        print("Shipped traces: {} of {} runs match csim-ref".format(checked - failures, checked))
+        print()
+        return failures
+
+
+
+    def run_benchmarks(self, trace_dir):
+        """Generates each pattern at each size, runs every configuration on it and prints a row per run
+
+        Args:
+            trace_dir (str): Directory to write the generated traces to
+
+        Returns:
+            # of cross-check mismatches
+        """
+
+        generator = TraceGenerator(self.seed)
+        failures = 0
+        print("{:>10} {:>10} {:>14} {:>8} {:>14} {:>8} {:>6}".format('pattern', 'records', 'config', 'seconds', 'accesses/sec', 'RSS MB', 'check'))
+        for pattern in self.patterns:
+            for exponent in self.exponents:
+                count = 10**exponent
+                text_path = os.path.join(trace_dir, "{}_{}.trace".format(pattern, count))
+                write_text_trace(text_path, generator.generate(pattern, count))
+
+                sim_path = text_path
+                if self.binary:
+                    sim_path = text_path[:-len('.trace')] + '.bin'
+                    with TraceReader(text_path) as trace_reader:
+                        BinaryTrace(sim_path).write(trace_reader)
+
+                for config in self.configs:
+                    result, seconds, rss_kb = self.run_sim(sim_path, config)
+                    accesses = result['hits'] + result['misses']
+
+                    check = '-'
+                    if self.ref_path is not None and config[3] == 'fifo' and count <= self.check_limit:
+                        check = 'ok'
+                        if result != self.run_ref(text_path, config):
+                            check = 'DIFF'
+                            failures += 1
+
+                    print("{:>10} {:>10} {:>14} {:>8.2f} {:>14.0f} {:>8.1f} {:>6}".format(pattern, count, self.format_config(config), seconds, accesses / seconds, rss_kb / 1024, check))
+
+                if self.keep_dir is None:
+                    os.remove(text_path)
+                    if sim_path != text_path:
+                        os.remove(sim_path)
+
+        return failures
+
+
+
+    def run_sim(self, trace_path, config):
+        """Runs cache.py on a trace in its own process, timing it and getting its peak RSS
+
+        Args:
+            trace_path (str): Path to the trace
+            config (tuple): (s, E, b, policy) configuration to run
+
+        Returns:
+            (stats, seconds, peak RSS in KiB) tuple, stats is the dict printed by cache.py
+        """
+
+        s, E, b, policy = config
+        cmd = [sys.executable, '-c', self.RUNNER, os.path.join(self.here, 'cache.py'), '-s', str(s), '-E', str(E), '-b', str(b), '--policy', policy, '-t', trace_path]
+        start = time.perf_counter()
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.here)
+        seconds = time.perf_counter() - start
+        assert process.returncode == 0, "cache.py failed on {} with {}: {}".format(trace_path, self.format_config(config), process.stderr.decode())
+
+        stats = ast.literal_eval(process.stdout.decode().strip().splitlines()[-1])
+        rss_kb = int(process.stderr.decode().strip().splitlines()[-1])
+        return stats, seconds, rss_kb
+
+
+
+    def run_ref(self, trace_path, config):
+        """Runs csim-ref on a text trace
+
+        Args:
+            trace_path (str): Path to the trace
+            config (tuple): (s, E, b, policy) configuration to run, the policy is ignored
+
+        Returns:
+            Dict of hits/misses/evictions, in the same form cache.py prints
+        """
+
+        s, E, b, policy = config
+        output = subprocess.run([self.ref_path, '-s', str(s), '-E', str(E), '-b', str(b), '-t', trace_path], stdout=subprocess.PIPE, check=True).stdout.decode()
+
+        #Output looks like hits:169 misses:68 evictions:66
+        stats = {}
+        for item in output.split():
+            name, value = item.split(':')
+            stats[name] = int(value)
+        return stats
+
+
+
+    def format_config(self, config):
+        """Formats a configuration as s:E:b:policy
+
+        Args:
+            config (tuple): (s, E, b, policy) configuration
+
+        Returns:
+            Configuration as a string
+        """
+
+        return ':'.join(str(value) for value in config)
+
+
+
+    def check_args(self, args):
+        """Parses command line arguments.
+        Starts by checking for help flag. If present, print and exit.
+        Next, reads the optional -n, --patterns and --configs flags of what to run
+        Last, reads the optional --seed, --binary, --check-limit and --keep flags
+
+        Args:
+            args (list): Command line arguments passed in
+
+        Returns:
+            None
+        """
+
+        if "-h" in args:
+            self.print_help_exit(exit_flag=True)
+
+        try:
+            self.exponents = [4, 5, 6]
+            if "-n" in args:
+                self.exponents = []
+                for item in args[args.index("-n")+1].split(','):
+                    if '-' in item:
+                        start, end = item.split('-', 1)
+                        self.exponents.extend(range(int(start), int(end) + 1))
+                    else:
+                        self.exponents.append(int(item))
+
+            self.patterns = list(TraceGenerator.PATTERNS)
+            if "--patterns" in args:
+                self.patterns = args[args.index("--patterns")+1].split(',')
+                for pattern in self.patterns:
+                    assert pattern in TraceGenerator.PATTERNS, "Pattern must be one of: {}".format(', '.join(TraceGenerator.PATTERNS))
+
+            configs = "5:1:5,5:4:5,8:8:6"
+            if "--configs" in args:
+                configs = args[args.index("--configs")+1]
+            self.configs = []
+            for item in configs.split(','):
+                fields = item.split(':')
+                assert len(fields) in (3, 4), "Each configuration must be s:E:b or s:E:b:policy"
+                policy = fields[3] if len(fields) == 4 else 'fifo'
+                self.configs.append((int(fields[0]), int(fields[1]), int(fields[2]), policy))
+
+            self.seed = 0
+            if "--seed" in args:
+                self.seed = int(args[args.index("--seed")+1])
+
+            self.check_limit = 10**5
+            if "--check-limit" in args:
+                self.check_limit = int(args[args.index("--check-limit")+1])
+        except ValueError:
+            print('Sizes, configurations, seed and check limit must be integers')
+            self.print_help_exit(exit_flag=True)
+
+        self.binary = "--binary" in args
+
+        self.keep_dir = None
+        if "--keep" in args:
+            self.keep_dir = args[args.index("--keep")+1]
+            os.makedirs(self.keep_dir, exist_ok=True)
+
+
+
+    def print_help_exit(self, exit_flag):
+        """Prints help string, exits if specified
+
+        Args:
+            exit_flag: Specifies if program should exit after printing help message
+
+        Returns:
+            None
+        """
+
+        print("""
+Usage: python3 benchmark.py [-h] [-n <n>] [--patterns <pattern,...>] [--configs <s:E:b[:policy],...>] [--seed <seed>] [--binary] [--check-limit <records>] [--keep <dir>]
+-h: Optional help flag that prints usage info
+-n <n>: Optional trace lengths as powers of 10, a list like 4,6 or a range like 4-8 (defaults to 4-6)
+--patterns <pattern,...>: Optional patterns to generate, from sequential, strided, random, transpose, matmul, pointer (defaults to all)
+--configs <s:E:b[:policy],...>: Optional cache configurations to run on each trace (defaults to 5:1:5,5:4:5,8:8:6)
+--seed <seed>: Optional seed for the random and pointer patterns (defaults to 0)
+--binary: Optional, the simulator replays binary versions of the traces
+--check-limit <records>: Optional, traces up to this many records are cross-checked against csim-ref for fifo configurations (defaults to 100000)
+--keep <dir>: Optional directory to keep the generated traces in, they are deleted otherwise""")
+
+        if exit_flag:
+            sys.exit()
+
+
+
+#If (for whatever reason) this module was imported, this code wouldn't run
+if __name__ == '__main__':
+    BM = Benchmark(sys.argv)
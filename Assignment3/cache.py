@@ -12,29 +12,95 @@ Example:
 
 import sys
 import os
+import json
+import tempfile
+from contextlib import ExitStack
+from TraceReader import TraceReader
+from BinaryTrace import BinaryTrace, compact_records
+from DecodedTrace import DecodedTrace
+from ReplacementPolicy import POLICIES, next_use_index
+from Cache import Cache
+from Simulator import Simulator
+from CacheSweep import CacheSweep, format_report
+from ParallelSweep import ParallelSweep
+from StackDistance import StackDistance
+from LocalityProfile import LocalityProfile
+from CacheHierarchy import CacheHierarchy
+from CoherentCaches import CoherentCaches, interleave, core_column
+from AccessLog import AccessLog
+from WindowStats import WindowStats
+from Checkpoint import Checkpoint
+from SampledSimulator import SampledSimulator
+from ShardedSimulator import ShardedSimulator
+from ResultStore import ResultStore
+from PhaseProfiler import PhaseProfiler
+from WriteSimulator import WriteSimulator
+from AccessStream import AccessStream
 
 class CacheSim:
     """Class to simulate a cache with specified sets/associativity/block size
 
     Attributes:
         self.verbose (bool): Whether or not to print each line of a trace file
-        self.set_bit_size (int): # of bits required to determine set
-        self.num_lines (int): # of lines per set, this is also called associativity
-        self.offset_bit_size (int): # of bits required to determine block offset
-        self.trace_path (str): Path to the trace file to read from
-        self.max_addr_size (int): Max # of bits of all addresses from trace file
-        self.cache (dict): Cache representation, holds cache data
-        self.tag_bit_size: # of bits in each tag
-        self.stats (dict): Keeps track of # of hits/misses/evictions
+        self.log_path (str): Path to write verbose output to, set with --log (defaults to stdout)
+        self.log_format (str): Format of verbose output, set with --log-format (defaults to text)
+        self.misses_only (bool): Whether verbose output only has misses and evictions, set with --misses-only
+        self.set_stats_prefix (str): Path prefix to write per-set and per-region counters to, set with --set-stats
+        self.stats_format (str): Format of the counter files, csv or npy, set with --stats-format (defaults to csv)
+        self.region_bits (int): # of low address bits dropped to get a per-region miss counter, set with --region-bits (defaults to 12)
+        self.window (int): # of accesses per window of the miss rate time series, set with --window, None for no series
+        self.window_csv (str): Path to write the time series to, set with --window-csv (defaults to stdout)
+        self.checkpoint_path (str): Path to snapshot the run to, set with --checkpoint, None for no snapshots
+        self.checkpoint_every (int): # of trace records between snapshots, set with --checkpoint-every (defaults to 1000000)
+        self.resume_path (str): Path of a snapshot to resume the run from, set with --resume
+        self.sample_sets (float): Fraction of sets to simulate, set with --sample-sets, None for no sampling
+        self.sample_time (float): Fraction of records to measure, set with --sample-time, None for no sampling
+        self.sample_window (int): # of records in each time sample, set with --sample-window (defaults to 10000)
+        self.warmup (int): # of records to warm up on before each time sample, set with --warmup (defaults to the window)
+        self.set_bit_sizes (list): # of bits required to determine set, one entry per value swept
+        self.num_lines_list (list): # of lines per set (associativity), one entry per value swept
+        self.offset_bit_sizes (list): # of bits required to determine block offset, one entry per value swept
+        self.policy_names (list): Replacement policies, set with --policy (defaults to fifo)
+        self.seed (int): Seed for the random replacement policy, set with --seed
+        self.trace_path (str): Path to the trace file to read from, '-' for stdin
+        self.max_addr_size (int): # of bits in each address, set with -a (defaults to 64)
+        self.jobs (int): # of worker processes for sweeps, set with -j (defaults to 1)
+        self.workers (int): # of worker processes to split a single configuration's sets over, set with --workers (defaults to 1)
+        self.store_path (str): Directory of the result store, set with --store, None to always simulate
+        self.store_size (int): Size bound of the result store in bytes, set in MiB with --store-size (defaults to 64 MiB)
+        self.store_command (str): 'list' or 'purge' to manage the result store instead of simulating, None to simulate
+        self.profile (bool): Whether to time the phases of a single configuration's run, set with --profile
+        self.profile_format (str): Format of the phase timings, table or json, set with --profile-format (defaults to table)
+        self.profile_every (int): One batch of records in this many is timed, set with --profile-every (defaults to 8)
+        self.cprofile_path (str): Path to dump cProfile stats of the profiled run to, set with --cprofile, None to not capture them
+        self.writes (bool): Whether to simulate the write policy and the traffic to the next level, set with --writes
+        self.write_policy (str): back or through, set with --write-policy (defaults to back)
+        self.write_allocate (bool): Whether store misses fill the block, turned off with --no-write-allocate
+        self.hit_time (float): Cycles of a hit for the AMAT estimate, set with --hit-time (defaults to 1)
+        self.miss_penalty (float): Extra cycles of a miss for the AMAT estimate, set with --miss-penalty (defaults to 100)
+        self.split_blocks (bool): Whether accesses straddling a block boundary are split into one access per block, set with --split-blocks
+        self.icache_config (tuple): (s, E, b, policy) of the instruction cache fed the I records, set with --icache, None to drop them
+        self.access_stream (AccessStream): Turns records into accesses when --split-blocks or --icache is given, None otherwise
+        self.locality (bool): Whether to profile reuse distance, reuse time and working set instead of simulating, set with --locality
+        self.locality_csv_prefix (str): Path prefix to write the locality histograms to, set with --locality-csv
+        self.mesi (bool): Whether to simulate per-core caches kept coherent with MESI, set with --mesi
+        self.num_cores (int): # of cores in the core column of a single --mesi trace, set with --cores
+        self.configs (list): (s, E, b, policy) tuple for each configuration in the grid of -s/-E/-b/--policy values
 
     """
 
     def __init__(self, args):
         """Performs the necessary method calls in order
         Starts by checking passed in arguments
-        Next, gets max address size from the trace file specified
-        Next, creates the cache object
-        Lastly, reads the trace file and performs the cache simulation
+        Next, builds the list of cache configurations
+        Lastly, reads the trace file in a single pass and performs the cache simulation
+        If --convert was given, the trace is converted to a binary trace instead of simulated
+        If --stack-distance was given, LRU miss curves are computed from stack distances instead
+        If --locality was given, reuse distance, reuse time and working set are profiled instead
+        If --levels was given, a multi-level hierarchy is simulated instead
+        If --mesi was given, coherent per-core caches are simulated instead
+        If --store-list or --store-purge was given, the result store is listed or purged instead
+        If --split-blocks or --icache was given, split accesses and instruction cache stats are printed after the results
 
         Args:
             args (list): Command line arguments passed in 
@@ -45,110 +111,529 @@ class CacheSim:
         """
 
         self.check_args(args)
-        self.get_max_addr_size()
-        self.create_cache()
+
+        #Only the single cache and sweep runs of read_trace_file pass records through an AccessStream
+        if self.split_blocks or self.icache_config is not None:
+            assert self.store_command is None and self.convert_path is None and not self.stack_distance and not self.locality and self.level_configs is None and not self.mesi, "--split-blocks and --icache don't work with --store-list, --store-purge, --convert, --stack-distance, --locality, --levels or --mesi"
+
+        if self.store_command is not None:
+            self.manage_store()
+            return
+
+        if self.convert_path is not None:
+            self.convert_trace()
+            return
+
+        if self.stack_distance:
+            self.analyze_stack_distance()
+            return
+
+        if self.locality:
+            self.profile_locality()
+            return
+
+        if self.level_configs is not None:
+            self.simulate_hierarchy()
+            return
+
+        self.create_configs()
+        if self.mesi:
+            self.simulate_coherence()
+            return
+
         self.read_trace_file()
+        if self.access_stream is not None:
+            print(self.access_stream.report())
 
 
     def read_trace_file(self):
         """Reads the trace file specified after the -t flag
-        Goes line-by-line, gets the bits for tag, set, and block offset
-        Passes these to check_cache method, records hits/misses/evictions
+        Streams the trace line-by-line, gets the block address of each access
+        Passes these to the cache, records hits/misses/evictions
+        A single configuration is run through a Simulator, the same one analysis code can drive directly
+        If more than one configuration was given, the trace is swept through all of them in the same pass instead
+        With -j, the sweep is spread over worker processes that share one decoded copy of the trace
+        With -j, large text traces are also parsed in parallel chunks, unless verbose output needs the trace lines
+        Verbose output goes through a buffered AccessLog, in the format picked with --log-format
+        With --set-stats, per-set and per-region counters are kept in a SetStats and written out at the end
+        With --window, the miss rate of every window of accesses is written out as a time series
+        With --checkpoint, the full state is snapshotted every so many records, and --resume picks up from a snapshot
+        With --sample-sets or --sample-time, a sample of the sets and/or time windows is simulated instead, and estimates are printed
+        With --workers, a single configuration's sets are split over worker processes, with the same results as a serial run
+        With --store, stored results are printed without simulating, and only configurations that aren't stored are simulated
+        With --profile, a single configuration is run with phase timings instead, and optionally under cProfile
+        With --writes, a single configuration is run with its write policy, and the traffic to the next level and AMAT are printed
+        With --split-blocks or --icache, records go through an AccessStream, which splits accesses across blocks and feeds I records to an instruction cache
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+
+        sampling = self.sample_sets is not None or self.sample_time is not None
+        if len(self.configs) > 1:
+            assert self.window is None and self.checkpoint_path is None, "--window, --checkpoint and --resume only work with a single configuration"
+            assert not sampling, "--sample-sets and --sample-time only work with a single configuration"
+            assert self.workers == 1, "--workers only works with a single configuration, use -j to spread a sweep"
+
+        #Splitting depends on the block size, so every configuration needs the same one
+        self.access_stream = None
+        if self.split_blocks or self.icache_config is not None:
+            assert not sampling and self.store_path is None and not self.profile and not self.writes, "--split-blocks and --icache don't work with sampling, --store, --profile or --writes"
+            assert not self.verbose and self.checkpoint_path is None, "-v, --checkpoint and --resume don't work with --split-blocks or --icache"
+            assert not self.split_blocks or len(set(b for s, E, b, policy in self.configs)) == 1, "--split-blocks needs every configuration to have the same block size"
+            icache = None
+            if self.icache_config is not None:
+                icache = Simulator(*self.icache_config, self.seed, self.max_addr_size)
+            self.access_stream = AccessStream(self.configs[0][2], self.split_blocks, icache)
+
+        if self.profile:
+            assert len(self.configs) == 1 and not sampling and self.store_path is None and self.workers == 1 and self.configs[0][3] != 'opt', "--profile only works with a plain run of a single configuration, not opt"
+            assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with --profile"
+            self.profile_phases()
+            return
+
+        if self.writes:
+            assert len(self.configs) == 1 and not sampling and self.store_path is None and self.workers == 1 and not self.profile and self.configs[0][3] != 'opt', "--writes only works with a plain run of a single configuration, not opt"
+            assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with --writes"
+            self.simulate_writes()
+            return
+
+        if sampling:
+            self.simulate_sample()
+            return
+
+        if self.store_path is not None:
+            self.simulate_stored()
+            return
+
+        if len(self.configs) > 1:
+            print(format_report(self.simulate_configs(self.configs)))
+            return
+
+        if self.workers > 1:
+            assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with --workers"
+            print(self.simulate_configs(self.configs)[0][1])
+            return
+
+        if self.configs[0][3] == 'opt':
+            assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with the opt policy"
+            print(self.simulate_configs(self.configs)[0][1])
+            return
+
+        simulator = Simulator(*self.configs[0], self.seed, self.max_addr_size)
+        if self.set_stats_prefix is not None:
+            simulator.enable_set_stats(self.region_bits)
+
+        #A resumed run replaces the fresh simulator with the snapshot's, which knows how many records it already simulated
+        window_state = None
+        if self.resume_path is not None:
+            simulator, window_state = self.resume_run(simulator)
+
+        window_stats = None
+        if self.window is not None:
+            window_stats = WindowStats(self.window, self.window_csv)
+            window_stats.open(window_state)
+
+        checkpoint = None
+        if self.checkpoint_path is not None:
+            checkpoint = Checkpoint(self.checkpoint_path, self.checkpoint_every, {'trace_size': self.trace_size()})
+
+        #The log is flushed and closed even if the run fails part way
+        #Verbose output needs each record's trace line, which parallel parsing doesn't keep
+        with ExitStack() as stack:
+            access_log = None
+            if self.verbose:
+                access_log = stack.enter_context(AccessLog(self.log_path, self.log_format, self.misses_only))
+            trace_reader = stack.enter_context(TraceReader(self.trace_path, 1 if self.verbose else self.jobs))
+            self.check_run_length(trace_reader, [simulator.cache.offset_bit_size])
+            trace_reader.skip(simulator.records)
+            simulator.run(trace_reader, access_log, window_stats, checkpoint, self.access_stream)
+
+        if window_stats is not None:
+            window_stats.close(simulator.cache.stats)
+        if simulator.set_stats is not None:
+            if self.stats_format == 'npy':
+                simulator.set_stats.write_npy(self.set_stats_prefix)
+            else:
+                simulator.set_stats.write_csv(self.set_stats_prefix)
+
+        #A structured log on stdout has to stay parseable, so the stats go to stderr after it
+        if self.verbose and self.log_path is None and self.log_format != 'text':
+            print(simulator.stats, file=sys.stderr)
+        else:
+            print(simulator.stats)
+
+
+
+    def profile_phases(self):
+        """Runs a single configuration with timings of reading, parsing, decoding, lookup and replacement
+        Prints the stats and a table of the phases, or both as JSON with --profile-format json
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+
+        simulator = Simulator(*self.configs[0], self.seed, self.max_addr_size)
+        phase_profiler = PhaseProfiler(self.profile_every)
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [simulator.cache.offset_bit_size])
+            phase_profiler.run(simulator, trace_reader, self.cprofile_path)
+
+        if self.profile_format == 'json':
+            print(json.dumps(phase_profiler.summary(), indent=2))
+        else:
+            print(simulator.stats)
+            print(phase_profiler.report())
+
+
+
+    def simulate_writes(self):
+        """Runs a single configuration with its write policy
+        Prints the stats, then the dirty evictions, bytes to and from the next level and AMAT
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+
+        s, E, b, policy = self.configs[0]
+        write_simulator = WriteSimulator(Cache(s, E, b, policy, self.seed, self.max_addr_size), self.write_policy, self.write_allocate, self.hit_time, self.miss_penalty)
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [b])
+            write_simulator.run(trace_reader)
+
+        print(write_simulator.cache.stats)
+        print(write_simulator.report())
+
+
+
+    def simulate_configs(self, configs):
+        """Simulates configurations in one pass over the trace, with no output besides their stats
+        A sweep goes through a CacheSweep, or a ParallelSweep with -j, and a single configuration through a Simulator,
+        or a ShardedSimulator with --workers
+
+        Args:
+            configs (list): (s, E, b, policy) tuple for each configuration
+
+        Returns:
+            List of ((s, E, b, policy), stats) tuples, in the same order as configs
+        """
+
+        if any(policy == 'opt' for s, E, b, policy in configs):
+            return self.simulate_opt(configs)
+
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [b for s, E, b, policy in configs])
+
+            if len(configs) > 1 and self.jobs > 1:
+                return ParallelSweep(configs, self.seed, self.max_addr_size, self.jobs).run(self.stream_records(trace_reader))
+
+            if len(configs) > 1:
+                sweep = CacheSweep([Cache(s, E, b, policy, self.seed, self.max_addr_size) for s, E, b, policy in configs])
+                sweep.run(trace_reader, self.access_stream)
+                return sweep.results()
+
+            if self.workers > 1:
+                return [(configs[0], ShardedSimulator(configs[0], self.seed, self.max_addr_size, self.workers).run(self.stream_records(trace_reader)))]
+
+            simulator = Simulator(*configs[0], self.seed, self.max_addr_size)
+            simulator.run(trace_reader, access_stream=self.access_stream)
+            return [(configs[0], simulator.stats.as_dict())]
+
+
+
+    def stream_records(self, trace_reader):
+        """Gets the records to decode, through the AccessStream if there is one
+        Simulator.run and CacheSweep.run take the AccessStream instead, so only the records that need it go through it
+
+        Args:
+            trace_reader (TraceReader): Open trace
+
+        Returns:
+            Iterable of (op, addr, size, trace) tuples
+        """
+
+        if self.access_stream is None:
+            return trace_reader
+
+        return self.access_stream.records(trace_reader)
+
+
+
+    def simulate_opt(self, configs):
+        """Simulates configurations that include the offline opt policy
+        The trace is decoded once, each opt cache gets the next use index for its block size, built in a reverse pass
+        over the decoded trace, then every configuration is swept in one pass over the decoded trace
+
+        Args:
+            configs (list): (s, E, b, policy) tuple for each configuration
+
+        Returns:
+            List of ((s, E, b, policy), stats) tuples, in the same order as configs
+        """
+
+        assert self.workers == 1, "--workers doesn't work with the opt policy"
+        caches = [Cache(s, E, b, policy, self.seed, self.max_addr_size) for s, E, b, policy in configs]
+        with tempfile.TemporaryDirectory(prefix='cachesim-') as dir_path:
+            with TraceReader(self.trace_path, self.jobs) as trace_reader:
+                self.check_run_length(trace_reader, [cache.offset_bit_size for cache in caches])
+                DecodedTrace(dir_path).write(self.stream_records(trace_reader))
+
+            with DecodedTrace(dir_path) as decoded_trace:
+                #Caches with the same block size see the same accesses, so they share an index
+                indexes = {}
+                for cache in caches:
+                    if cache.policy_name == 'opt':
+                        if cache.offset_bit_size not in indexes:
+                            indexes[cache.offset_bit_size] = next_use_index(decoded_trace, cache.offset_bit_size)
+                        cache.policy.next_use = indexes[cache.offset_bit_size]
+
+                sweep = CacheSweep(caches)
+                sweep.run(decoded_trace)
+
+        return sweep.results()
+
+
+
+    def simulate_stored(self):
+        """Prints the results of every configuration, looking them up in the result store first
+        Only configurations that aren't stored are simulated, in one pass, and their results are stored
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+
+        assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with --store"
+        store = ResultStore(self.store_path, self.store_size)
+        trace_hash = store.trace_hash(self.trace_path)
+        stored = [store.get(trace_hash, config, self.seed) for config in self.configs]
+
+        missing = [config for config, stats in zip(self.configs, stored) if stats is None]
+        if missing:
+            simulated = dict(self.simulate_configs(missing))
+            for config in missing:
+                store.put(trace_hash, self.trace_path, config, self.seed, simulated[config])
+            stored = [simulated[config] if stats is None else stats for config, stats in zip(self.configs, stored)]
+
+        results = list(zip(self.configs, stored))
+        if len(results) > 1:
+            print(format_report(results))
+        else:
+            print(results[0][1])
+
+
+
+    def manage_store(self):
+        """Lists the entries of the result store, or purges them, only the ones of the -t trace if it was given
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+
+        store = ResultStore(self.store_path, self.store_size)
+        if self.store_command == 'list':
+            print(store.report())
+            return
+
+        trace_hash = store.trace_hash(self.trace_path) if self.trace_path is not None else None
+        print("Purged {} entries".format(store.purge(trace_hash)))
+
+
+
+    def simulate_sample(self):
+        """Simulates a sample of the single configuration's sets and/or time windows, printing estimates with confidence intervals
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+
+        assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with sampling"
+        assert self.configs[0][3] != 'opt', "The opt policy doesn't work with sampling"
+        cache = Cache(*self.configs[0], self.seed, self.max_addr_size)
+        sampled_simulator = SampledSimulator(cache, self.sample_sets or 1.0, self.sample_time or 1.0, self.sample_window, self.warmup, self.seed)
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [cache.offset_bit_size])
+            sampled_simulator.run(trace_reader)
+        print(sampled_simulator.report())
+
+
+
+    def resume_run(self, simulator):
+        """Loads the snapshot given with --resume, checking it is of the same run
+
+        Args:
+            simulator (Simulator): Fresh simulator built from the command line, to check the snapshot against
+
+        Returns:
+            (simulator, window state) tuple from the snapshot
+        """
+
+        state = Checkpoint(self.resume_path).load()
+        resumed = state['simulator']
+        assert resumed.config() == simulator.config(), "Checkpoint was taken with s, E, b, policy, seed, a = {}, the run to resume must use the same".format(resumed.config())
+        assert state['trace_size'] == self.trace_size(), "Checkpoint was taken on a trace of a different size"
+        assert (resumed.set_stats is None) == (simulator.set_stats is None), "--set-stats must be given to the resumed run only if it was given to the checkpointed run"
+        assert (state['windows'] is None) == (self.window is None), "--window must be given to the resumed run only if it was given to the checkpointed run"
+
+        return resumed, state['windows']
+
+
+
+    def trace_size(self):
+        """Gets the size of the trace file, to check a checkpoint is resumed on the same trace
 
         Args:
             None
 
+        Returns:
+            Size in bytes, None if the trace is stdin or a pipe
+        """
+
+        if self.trace_path != '-' and os.path.isfile(self.trace_path):
+            return os.path.getsize(self.trace_path)
+        return None
+
+
+
+    def check_run_length(self, trace_reader, offset_bit_sizes):
+        """Checks a run length compacted trace is exact for every block size it will be simulated at, and isn't split across blocks
+        A run of accesses to one block at the compacted block size is only one block for blocks at least as big
+
+        Args:
+            trace_reader (TraceReader): Open trace
+            offset_bit_sizes (list): Block offset bits of every cache the trace is fed to
+
         Returns:
             None
 
         """
 
-        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        run_offset_bits = trace_reader.run_offset_bits
+        #Folded repeats are only exact if no access in the run straddled into another block
+        assert run_offset_bits is None or not self.split_blocks, "Run length compacted traces can't be split across blocks"
+        assert run_offset_bits is None or min(offset_bit_sizes) >= run_offset_bits, "Trace was run length compacted at b = {}, it can only be simulated with b >= {}".format(run_offset_bits, run_offset_bits)
 
-        with open(self.trace_path, 'r') as f:
-            for trace in f:
-                trace = trace.rstrip('\n').strip()
 
-                #If the line is not an empty string, process it
-                if trace:
-                    #Get (op)eration, (addr)ess, and size from each line
-                    op = trace[0]
 
-                    if op in ['L', 'S', 'M']:
-                        trace_split = trace[2:].split(',')
-                        addr = int(trace_split[0].replace(' ', ''), base=16)
-                        addr = bin(addr)[2:].zfill(self.max_addr_size)
+    def convert_trace(self):
+        """Converts the trace specified after the -t flag to a binary trace at the path after --convert
+        Binary traces are detected when passed to -t, and are replayed through a memory map without text parsing
+        With --compact, runs of accesses to one block are folded into repeat records while converting
 
-                        #Get tag/set/offset bits
-                        set_bit_start = -self.offset_bit_size - self.set_bit_size
-                        set_bit_end = -self.offset_bit_size
-                        set_bits = addr[set_bit_start:set_bit_end]
-                        tag_bits = addr[:self.tag_bit_size]
+        Args:
+            None
 
-                        if op == 'M':
-                            result1 = self.check_cache(tag_bits, set_bits)
-                            result2 = self.check_cache(tag_bits, set_bits)
-                        else:
-                            result1 = self.check_cache(tag_bits, set_bits)
-                            result2 = ""
+        Returns:
+            None
+
+        """
 
-                        if self.verbose:
-                            print("{} {} {}".format(trace, result1, result2))
+        with TraceReader(self.trace_path) as trace_reader:
+            if self.compact_offset_bits is None:
+                count = BinaryTrace(self.convert_path).write(trace_reader, trace_reader.run_offset_bits)
+            else:
+                self.check_run_length(trace_reader, [self.compact_offset_bits])
+                records = compact_records(trace_reader, self.compact_offset_bits)
+                count = BinaryTrace(self.convert_path).write(records, self.compact_offset_bits)
 
-        print(self.stats)
+        print("Wrote {} records to {}".format(count, self.convert_path))
 
 
 
-    def check_cache(self, tag_bits, set_bits):
-        """Checks the cache for a hit/miss/eviction based on params passed in
+    def analyze_stack_distance(self):
+        """Computes per-set and global LRU stack distance histograms in one pass over the trace
+        Prints the miss rate at every associativity for the -s/-b geometry, and at every fully associative capacity
 
         Args:
-            tag_bits (str): The bits that make up the tag
-            set_bits (str): the bits that makes up the set
+            None
+
+        Returns:
+            None
+
+        """
+
+        stack_distance = StackDistance(self.set_bit_sizes[0], self.offset_bit_sizes[0])
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [stack_distance.offset_bit_size])
+            stack_distance.run(trace_reader)
+
+        print(stack_distance.report())
+        if self.stack_csv_prefix is not None:
+            stack_distance.write_csv(self.stack_csv_prefix)
+
+
+
+    def profile_locality(self):
+        """Profiles the trace's reuse distances, reuse times and working set per --window accesses at the -b block size
+        Prints the log2 histograms and a working set summary, and writes them to CSV files with --locality-csv
+
+        Args:
+            None
 
         Returns:
-            'hit' if hit found
-            'miss' if miss with available empty spot, no eviction required
-            'eviction' if miss and eviction required
+            None
 
         """
 
-        #Perform cache operation(s)
-        set_base_10 = int(set_bits, base=2)
+        locality_profile = LocalityProfile(self.offset_bit_sizes[0], self.window or 10000)
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [locality_profile.offset_bit_size])
+            locality_profile.run(trace_reader)
+
+        print(locality_profile.report())
+        if self.locality_csv_prefix is not None:
+            locality_profile.write_csv(self.locality_csv_prefix)
+
+
 
-        #Check if tag exists - look for hit
-        for line in self.cache[set_base_10]:
-            if line['tag'] == tag_bits and line['v'] == 1:
-                self.stats['hits'] += 1
-                return 'hit'
+    def simulate_hierarchy(self):
+        """Simulates the cache hierarchy given with --levels in one pass over the trace
+        Each level only sees the misses of the level above it, then per-level stats are printed
+
+        Args:
+            None
 
-        #See if any invalid bits, take those
-        self.stats['misses'] += 1
-        for line in self.cache[set_base_10]:
-            if line['v'] == 0:
-                line['tag'] = tag_bits
-                line['v'] = 1
-                line['order'] = 0
-                return 'miss'
+        Returns:
+            None
 
-        #Only case left - there are no empty spots, must evict something
-        self.stats['evictions'] += 1
-        orders = [i['order'] for i in self.cache[set_base_10]]
-        max_orders_idx = orders.index(max(orders))
-        self.cache[set_base_10][max_orders_idx]['tag'] = tag_bits
-        self.cache[set_base_10][max_orders_idx]['order'] = -1
+        """
 
-        for line in self.cache[set_base_10]:
-            line['order'] += 1
+        levels = [Cache(s, E, b, policy, self.seed, self.max_addr_size) for s, E, b, policy in self.level_configs]
+        hierarchy = CacheHierarchy(levels, self.inclusion)
+        with TraceReader(self.trace_path, self.jobs) as trace_reader:
+            self.check_run_length(trace_reader, [level.offset_bit_size for level in levels])
+            hierarchy.run(trace_reader)
 
-        return 'miss eviction'
+        print(hierarchy.report())
 
 
 
-    def create_cache(self):
-        """Creates the cache using a dictionary containing a list of dictionaries
-        Highest level dictionary is the sets, the list in each set contains the levels
-        Each level in the list contains a valid flag, a tag, and the order placed in for FIFO
+    def simulate_coherence(self):
+        """Simulates a private cache per core kept coherent with MESI, then prints per-core and per-block coherence stats
+        Several -t traces are one per core, interleaved a record at a time, a single one has a core column
 
         Args:
             None
@@ -158,22 +643,75 @@ class CacheSim:
 
         """
 
-        self.cache = {}
-        num_sets = 2**self.set_bit_size
-        for cache_set in range(num_sets):
-            self.cache[cache_set] = []
+        assert len(self.configs) == 1, "--mesi only works with a single configuration, every core gets the same cache"
+        assert self.configs[0][3] != 'opt', "The opt policy doesn't work with --mesi"
+        assert not self.verbose and self.window is None and self.checkpoint_path is None and self.set_stats_prefix is None, "-v, --window, --checkpoint, --resume and --set-stats don't work with --mesi"
+
+        trace_paths = self.trace_path.split(',')
+        num_cores = len(trace_paths) if len(trace_paths) > 1 else self.num_cores
+        assert num_cores is not None, "A single --mesi trace needs --cores with the # of cores in its core column"
+        assert len(trace_paths) == 1 or self.num_cores in (None, num_cores), "--cores must match the # of traces"
+
+        coherent_caches = CoherentCaches([Cache(*self.configs[0], self.seed, self.max_addr_size) for _ in range(num_cores)])
+        with ExitStack() as stack:
+            trace_readers = [stack.enter_context(TraceReader(trace_path)) for trace_path in trace_paths]
+            for trace_reader in trace_readers:
+                assert trace_reader.run_offset_bits is None, "Run length compacted traces fold accesses other cores could come between, they can't be used with --mesi"
+
+            if len(trace_readers) > 1:
+                coherent_caches.run(interleave(trace_readers))
+            else:
+                coherent_caches.run(core_column(trace_readers[0], num_cores))
+
+        print(coherent_caches.report())
+
+
+
+    def parse_levels(self, arg):
+        """Parses a cache hierarchy spec, a comma separated list of levels written as s:E:b or s:E:b:policy
+
+        Args:
+            arg (str): Argument to parse, such as 4:2:4:lru,8:4:6
+
+        Returns:
+            List of (s, E, b, policy) tuples, level 1 first
+        """
+
+        level_configs = []
+        for level in arg.split(','):
+            fields = level.split(':')
+            assert len(fields) in (3, 4), "Each level must be written as s:E:b or s:E:b:policy"
+            policy_name = fields[3].lower() if len(fields) == 4 else 'fifo'
+            assert policy_name in POLICIES, "Replacement policy must be one of: {}".format(', '.join(POLICIES))
+            assert policy_name != 'opt', "The opt policy only works for a single cache or a sweep, not a hierarchy level"
+            level_configs.append((int(fields[0]), int(fields[1]), int(fields[2]), policy_name))
+
+        return level_configs
 
-            for _ in range(self.num_lines):
-                self.cache[cache_set].append({'tag': None, 'v': 0, 'order': -1})
 
-        #Also need to define sizes for tag/set/offset bits
-        self.tag_bit_size = self.max_addr_size - self.set_bit_size - self.offset_bit_size
 
+    def parse_icache(self, arg):
+        """Parses an instruction cache spec, written as s:E:b or s:E:b:policy
+
+        Args:
+            arg (str): Argument to parse, such as 6:2:6:lru
+
+        Returns:
+            (s, E, b, policy) tuple
+        """
 
+        fields = arg.split(':')
+        assert len(fields) in (3, 4), "The instruction cache must be written as s:E:b or s:E:b:policy"
+        policy_name = fields[3].lower() if len(fields) == 4 else 'fifo'
+        assert policy_name in POLICIES, "Replacement policy must be one of: {}".format(', '.join(POLICIES))
+        assert policy_name != 'opt', "The opt policy doesn't work for the instruction cache"
 
-    def get_max_addr_size(self):
-        """Gets the max number of bits from all addresses provided.
-        Used to pad shorter addresses later if necessary.
+        return int(fields[0]), int(fields[1]), int(fields[2]), policy_name
+
+
+
+    def create_configs(self):
+        """Builds one configuration for every combination of the -s, -E, -b and --policy values
 
         Args:
             None
@@ -183,22 +721,34 @@ class CacheSim:
 
         """
 
-        addresses = []
-        with open(self.trace_path, 'r') as f:
-            #Loop through each line (trace) in the file
-            for trace in f:
-                trace = trace.rstrip('\n').strip()
+        self.configs = []
+        for set_bit_size in self.set_bit_sizes:
+            for num_lines in self.num_lines_list:
+                for offset_bit_size in self.offset_bit_sizes:
+                    for policy_name in self.policy_names:
+                        self.configs.append((set_bit_size, num_lines, offset_bit_size, policy_name))
+
+
+
+    def parse_int_list(self, arg):
+        """Parses a comma separated list of ints, where each item may also be an inclusive range like 0-4
+
+        Args:
+            arg (str): Argument to parse, such as 4, 1,2,4 or 0-4
+
+        Returns:
+            List of ints
+        """
 
-                #If the line is not an empty string, process it
-                if trace:
-                    #Get address, convert to binary, append the length to the addresses list
-                    trace_split = trace[2:].split(',')
-                    addr = int(trace_split[0].replace(' ', ''), base=16)
-                    addr = bin(addr)[2:]
-                    addresses.append(len(str(addr)))
+        values = []
+        for item in arg.split(','):
+            if '-' in item[1:]:
+                start, end = item.split('-', 1)
+                values.extend(range(int(start), int(end) + 1))
+            else:
+                values.append(int(item))
 
-        self.max_addr_size = max(addresses)
-        assert self.max_addr_size - self.set_bit_size - self.offset_bit_size > 0, "Number of set bits + number of offset bits needs to be less than {}, which is the number of bits in each address provided in this trace)".format(self.max_addr_size)
+        return values
 
 
 
@@ -206,8 +756,26 @@ class CacheSim:
         """Parses command line arguments.
         Starts by checking for help flag. If present, print and exit.
         Next, checks for verbose flag, sets verbose mode
-        Next, verifies -s, -E, and -b flags are present, and the arg following each flag is an int
-        Last, verifies the -t flag is present, and the arg after it is a valid file path
+        Next, checks for the --mesi and --cores flags of coherent multi-core caches
+        Next, checks for the --log, --log-format and --misses-only flags of verbose output, which also turn verbose mode on
+        Next, checks for the --set-stats, --stats-format and --region-bits flags of per-set and per-region counters
+        Next, checks for the --window and --window-csv flags of the miss rate time series
+        Next, checks for the --checkpoint, --checkpoint-every and --resume flags
+        Next, checks for the --sample-sets, --sample-time, --sample-window and --warmup flags of sampled simulation
+        Next, checks for the --profile, --profile-format, --profile-every and --cprofile flags of phase timings
+        Next, checks for the --writes, --write-policy, --no-write-allocate, --hit-time and --miss-penalty flags of write policies
+        Next, checks for the --split-blocks and --icache flags of access sizes and instruction fetches
+        Next, checks for the --store and --store-size flags of the result store, and its --store-list and --store-purge commands
+        Next, checks for the --convert and --compact flags, which only need -t as well
+        Next, checks for the --stack-distance and --stack-csv flags
+        Next, checks for the --locality and --locality-csv flags
+        Next, checks for the --levels and --inclusion flags of a hierarchy
+        Next, verifies -s, -E, and -b flags are present, and the arg following each flag is an int or list of ints
+        Next, reads the optional --policy and --seed flags for the replacement policy
+        Next, reads the optional -j flag for the number of sweep and parsing worker processes
+        Next, reads the optional --workers flag for the number of processes to split a single configuration's sets over
+        Next, reads the optional -a flag for the address width, defaulting to 64 bits
+        Last, checks the -t flag
 
         Args:
             args (list): Command line arguments passed in
@@ -225,30 +793,322 @@ class CacheSim:
         if "-hv" in args or "-v" in args or "-vh" in args:
             self.verbose = True
 
-        #Need to have -s, -E, and -b flags
-        assert "-s" in args, self.print_help_exit(exit_flag=True)
-        assert "-E" in args, self.print_help_exit(exit_flag=True)
-        assert "-b" in args, self.print_help_exit(exit_flag=True)
+        #Coherent multi-core caches, -t then takes a comma separated trace per core
+        self.mesi = "--mesi" in args
+        self.num_cores = None
+        if "--cores" in args:
+            try:
+                self.num_cores = int(args[args.index("--cores")+1])
+            except ValueError:
+                print('Number of cores must be an integer')
+                self.print_help_exit(exit_flag=True)
+            assert self.num_cores > 0, "Number of cores must be positive"
+
+        self.log_path = None
+        if "--log" in args:
+            self.log_path = args[args.index("--log")+1]
+            self.verbose = True
 
-        #Find the number of each flag
-        num_set_bits = args[args.index("-s")+1]
-        num_lines = args[args.index("-E")+1]
-        num_block_bits = args[args.index("-b")+1]
+        self.log_format = 'text'
+        if "--log-format" in args:
+            self.log_format = args[args.index("--log-format")+1]
+            if self.log_format not in AccessLog.FORMATS:
+                print('Log format must be one of: {}'.format(', '.join(AccessLog.FORMATS)))
+                self.print_help_exit(exit_flag=True)
+            self.verbose = True
+
+        self.misses_only = False
+        if "--misses-only" in args:
+            self.misses_only = True
+            self.verbose = True
+
+        #Per-set and per-region counters are only kept if asked for, so plain runs don't pay for them
+        self.set_stats_prefix = None
+        if "--set-stats" in args:
+            self.set_stats_prefix = args[args.index("--set-stats")+1]
+
+        self.stats_format = 'csv'
+        if "--stats-format" in args:
+            self.stats_format = args[args.index("--stats-format")+1]
+            if self.stats_format not in ['csv', 'npy']:
+                print('Stats format must be csv or npy')
+                self.print_help_exit(exit_flag=True)
+
+        self.region_bits = 12
+        if "--region-bits" in args:
+            try:
+                self.region_bits = int(args[args.index("--region-bits")+1])
+            except ValueError:
+                print('Number of region bits must be an integer')
+                self.print_help_exit(exit_flag=True)
+
+        try:
+            self.window = None
+            if "--window" in args:
+                self.window = int(args[args.index("--window")+1])
+                assert self.window > 0, "Window size must be positive"
+
+            self.checkpoint_every = 1000000
+            if "--checkpoint-every" in args:
+                self.checkpoint_every = int(args[args.index("--checkpoint-every")+1])
+                assert self.checkpoint_every > 0, "Checkpoint interval must be positive"
+        except ValueError:
+            print('Window size and checkpoint interval must be integers')
+            self.print_help_exit(exit_flag=True)
+
+        self.window_csv = None
+        if "--window-csv" in args:
+            self.window_csv = args[args.index("--window-csv")+1]
+
+        #A resumed run keeps saving to the checkpoint it was resumed from, unless told otherwise
+        self.resume_path = None
+        if "--resume" in args:
+            self.resume_path = args[args.index("--resume")+1]
+
+        self.checkpoint_path = self.resume_path
+        if "--checkpoint" in args:
+            self.checkpoint_path = args[args.index("--checkpoint")+1]
+
+        if self.checkpoint_path is not None:
+            assert not self.verbose, "Verbose output can't be checkpointed, --checkpoint and --resume can't be used with -v"
+
+        try:
+            self.sample_sets = None
+            if "--sample-sets" in args:
+                self.sample_sets = float(args[args.index("--sample-sets")+1])
+
+            self.sample_time = None
+            if "--sample-time" in args:
+                self.sample_time = float(args[args.index("--sample-time")+1])
+        except ValueError:
+            print('Sampling rates must be numbers')
+            self.print_help_exit(exit_flag=True)
 
-        #Verify each flag is an int
         try:
-            self.set_bit_size = int(num_set_bits)
-            self.num_lines = int(num_lines)
-            self.offset_bit_size = int(num_block_bits)
+            self.sample_window = 10000
+            if "--sample-window" in args:
+                self.sample_window = int(args[args.index("--sample-window")+1])
+                assert self.sample_window > 0, "Sample window must be positive"
+
+            self.warmup = None
+            if "--warmup" in args:
+                self.warmup = int(args[args.index("--warmup")+1])
+                assert self.warmup >= 0, "Warmup can't be negative"
         except ValueError:
-            print('Number of set bits, lines, block offfset bits must be integers')
+            print('Sample window and warmup must be integers')
             self.print_help_exit(exit_flag=True)
 
+        #Phase timings, any of their options turn them on
+        self.profile = "--profile" in args
+        self.profile_format = 'table'
+        if "--profile-format" in args:
+            self.profile_format = args[args.index("--profile-format")+1]
+            if self.profile_format not in ['table', 'json']:
+                print('Profile format must be table or json')
+                self.print_help_exit(exit_flag=True)
+            self.profile = True
+
+        self.profile_every = 8
+        if "--profile-every" in args:
+            try:
+                self.profile_every = int(args[args.index("--profile-every")+1])
+            except ValueError:
+                print('Profile sampling interval must be an integer')
+                self.print_help_exit(exit_flag=True)
+            self.profile = True
+
+        self.cprofile_path = None
+        if "--cprofile" in args:
+            self.cprofile_path = args[args.index("--cprofile")+1]
+            self.profile = True
+
+        #Write policy and traffic, any of their options turn them on
+        self.writes = "--writes" in args
+        self.write_policy = 'back'
+        if "--write-policy" in args:
+            self.write_policy = args[args.index("--write-policy")+1].lower()
+            if self.write_policy not in WriteSimulator.WRITE_POLICIES:
+                print('Write policy must be one of: {}'.format(', '.join(WriteSimulator.WRITE_POLICIES)))
+                self.print_help_exit(exit_flag=True)
+            self.writes = True
+
+        self.write_allocate = "--no-write-allocate" not in args
+        if not self.write_allocate:
+            self.writes = True
+
+        try:
+            self.hit_time = 1
+            if "--hit-time" in args:
+                self.hit_time = float(args[args.index("--hit-time")+1])
+                self.writes = True
+
+            self.miss_penalty = 100
+            if "--miss-penalty" in args:
+                self.miss_penalty = float(args[args.index("--miss-penalty")+1])
+                self.writes = True
+        except ValueError:
+            print('Hit time and miss penalty must be numbers')
+            self.print_help_exit(exit_flag=True)
+
+        #Accesses are one block each and I records are dropped unless asked for, like csim-ref
+        self.split_blocks = "--split-blocks" in args
+        self.icache_config = None
+        if "--icache" in args:
+            try:
+                self.icache_config = self.parse_icache(args[args.index("--icache")+1])
+            except ValueError:
+                print('Number of set bits, lines, block offset bits of the instruction cache must be integers')
+                self.print_help_exit(exit_flag=True)
+
+        #Result store, listing or purging it only needs the store, plus the trace to purge the entries of
+        self.store_path = None
+        if "--store" in args:
+            self.store_path = args[args.index("--store")+1]
+
+        self.store_size = 64 << 20
+        if "--store-size" in args:
+            try:
+                self.store_size = int(args[args.index("--store-size")+1]) << 20
+            except ValueError:
+                print('Result store size must be an integer number of MiB')
+                self.print_help_exit(exit_flag=True)
+
+        self.store_command = None
+        if "--store-list" in args or "--store-purge" in args:
+            assert self.store_path is not None, "--store-list and --store-purge need the store given with --store"
+            self.store_command = 'list' if "--store-list" in args else 'purge'
+            self.trace_path = None
+            if "-t" in args:
+                self.check_trace_arg(args)
+            return
+
+        #Converting a trace only needs the trace and output paths, plus the block bits to compact at
+        self.convert_path = None
+        self.compact_offset_bits = None
+        if "--convert" in args:
+            self.convert_path = args[args.index("--convert")+1]
+            if "--compact" in args:
+                try:
+                    self.compact_offset_bits = int(args[args.index("--compact")+1])
+                except ValueError:
+                    print('Number of block bits to compact at must be an integer')
+                    self.print_help_exit(exit_flag=True)
+            self.check_trace_arg(args)
+            return
+
+        #Stack distance analysis covers every associativity at once, so -E isn't needed for it
+        self.stack_distance = "--stack-distance" in args
+        self.stack_csv_prefix = None
+        if "--stack-csv" in args:
+            self.stack_csv_prefix = args[args.index("--stack-csv")+1]
+
+        #Locality profiles only depend on the block size, so only -b is needed for them
+        self.locality = "--locality" in args
+        self.locality_csv_prefix = None
+        if "--locality-csv" in args:
+            self.locality_csv_prefix = args[args.index("--locality-csv")+1]
+
+        #A hierarchy gives the geometry of each level with --levels instead of -s/-E/-b
+        self.level_configs = None
+        if "--levels" in args:
+            try:
+                self.level_configs = self.parse_levels(args[args.index("--levels")+1])
+            except ValueError:
+                print('Number of set bits, lines, block offfset bits of each level must be integers')
+                self.print_help_exit(exit_flag=True)
+
+            self.inclusion = 'nine'
+            if "--inclusion" in args:
+                self.inclusion = args[args.index("--inclusion")+1].lower()
+                if self.inclusion not in CacheHierarchy.INCLUSION_POLICIES:
+                    print('Inclusion policy must be one of: {}'.format(', '.join(CacheHierarchy.INCLUSION_POLICIES)))
+                    self.print_help_exit(exit_flag=True)
+
+        #Need to have -s, -E, and -b flags, unless they were given per level with --levels
+        if self.level_configs is None:
+            assert "-s" in args or self.locality, self.print_help_exit(exit_flag=True)
+            assert "-E" in args or self.stack_distance or self.locality, self.print_help_exit(exit_flag=True)
+            assert "-b" in args, self.print_help_exit(exit_flag=True)
+
+            #Find the number of each flag
+            num_set_bits = args[args.index("-s")+1] if "-s" in args else "0"
+            num_lines = args[args.index("-E")+1] if "-E" in args else "1"
+            num_block_bits = args[args.index("-b")+1]
+
+            #Verify each flag is an int, or a list of ints to sweep
+            try:
+                self.set_bit_sizes = self.parse_int_list(num_set_bits)
+                self.num_lines_list = self.parse_int_list(num_lines)
+                self.offset_bit_sizes = self.parse_int_list(num_block_bits)
+            except ValueError:
+                print('Number of set bits, lines, block offfset bits must be integers or lists of integers')
+                self.print_help_exit(exit_flag=True)
+
+        #Replacement policy, FIFO by default
+        self.policy_names = ['fifo']
+        if "--policy" in args:
+            self.policy_names = args[args.index("--policy")+1].lower().split(',')
+            if any(policy_name not in POLICIES for policy_name in self.policy_names):
+                print('Replacement policy must be one of: {}'.format(', '.join(POLICIES)))
+                self.print_help_exit(exit_flag=True)
+
+        self.seed = None
+        if "--seed" in args:
+            try:
+                self.seed = int(args[args.index("--seed")+1])
+            except ValueError:
+                print('Seed must be an integer')
+                self.print_help_exit(exit_flag=True)
+
+        #Worker processes for sweeps, and for parsing text traces
+        self.jobs = 1
+        if "-j" in args:
+            try:
+                self.jobs = int(args[args.index("-j")+1])
+            except ValueError:
+                print('Number of jobs must be an integer')
+                self.print_help_exit(exit_flag=True)
+
+        #Worker processes for a single configuration, each simulating a range of sets
+        self.workers = 1
+        if "--workers" in args:
+            try:
+                self.workers = int(args[args.index("--workers")+1])
+            except ValueError:
+                print('Number of workers must be an integer')
+                self.print_help_exit(exit_flag=True)
+            assert self.workers > 0, "Number of workers must be positive"
+
+        #Address width is fixed up front so the trace only needs to be read once
+        self.max_addr_size = 64
+        if "-a" in args:
+            try:
+                self.max_addr_size = int(args[args.index("-a")+1])
+            except ValueError:
+                print('Number of address bits must be an integer')
+                self.print_help_exit(exit_flag=True)
+
+        self.check_trace_arg(args)
+
+
+
+    def check_trace_arg(self, args):
+        """Verifies the -t flag is present, and the arg after it is a valid file path or - for stdin
+
+        Args:
+            args (list): Command line arguments passed in
+
+        Returns:
+            None
+
+        """
 
-        #Read trace file
+        #Read trace file, --mesi can take one per core
         assert "-t" in args, self.print_help_exit(exit_flag=True)
         self.trace_path = args[args.index("-t")+1]
-        assert os.path.exists(self.trace_path), self.print_help_exit(exit_flag=True)
+        trace_paths = self.trace_path.split(',') if self.mesi else [self.trace_path]
+        for trace_path in trace_paths:
+            assert trace_path == '-' or os.path.exists(trace_path), self.print_help_exit(exit_flag=True)
 
 
 
@@ -264,15 +1124,83 @@ class CacheSim:
         """
 
         print("""
-Usage: ./cache.py [-hv] -s <s> -E <E> -b <b> -t <tracefile>
+Usage: ./cache.py [-hv] -s <s> -E <E> -b <b> [-a <a>] [--policy <policy>] [--seed <seed>] [-j <jobs>] [--workers <N>] -t <tracefile>
 or
-python3 cache.py [-hv] -s <s> -E <E> -b <b> -t <tracefile>
+python3 cache.py [-hv] -s <s> -E <E> -b <b> [-a <a>] [--policy <policy>] [--seed <seed>] [-j <jobs>] [--workers <N>] -t <tracefile>
+or, to list or purge the result store (only the entries of the trace if -t is given)
+python3 cache.py --store <dir> --store-list | --store-purge [-t <tracefile>]
+or, to convert a trace to the binary trace format
+python3 cache.py --convert <binaryfile> [--compact <b>] -t <tracefile>
+or, for LRU miss curves at every associativity and capacity
+python3 cache.py --stack-distance -s <s> -b <b> [--stack-csv <prefix>] -t <tracefile>
+or, for private per-core caches kept coherent with MESI, over a trace per core or one trace with a core column
+python3 cache.py --mesi -s <s> -E <E> -b <b> [--policy <policy>] -t <tracefile>,<tracefile>,... | --cores <N> -t <tracefile>
+or, for reuse distance and reuse time histograms and the working set per window of accesses
+python3 cache.py --locality -b <b> [--window <N>] [--locality-csv <prefix>] -t <tracefile>
+or, for a multi-level hierarchy
+python3 cache.py --levels <s:E:b[:policy],...> [--inclusion <inclusion>] -t <tracefile>
 -h: Optional help flag that prints usage info
 -v: Optional verbose flag that displays trace info
+--log <logfile>: Optional file to write verbose output to instead of stdout, turns on -v
+--log-format <format>: Optional verbose output format, one of text, csv, jsonl, bin (defaults to text), turns on -v
+--misses-only: Optional, verbose output only has records with a miss or eviction, turns on -v
+--set-stats <prefix>: Optional, writes per-set hits/misses/evictions and per-region misses to <prefix>_sets and <prefix>_regions files
+--stats-format <format>: Optional format of the --set-stats files, csv or npy (defaults to csv)
+--region-bits <n>: Optional, misses are counted per aligned 2^n byte address region (defaults to 12)
+--window <N>: Optional, writes the hits/misses/evictions and miss rate of every N accesses as a CSV time series
+--window-csv <csvfile>: Optional file to write the --window time series to instead of stdout
+--checkpoint <file>: Optional, snapshots the full cache state and trace position to this file every so many records
+--checkpoint-every <records>: Optional number of trace records between snapshots (defaults to 1000000)
+--resume <file>: Optional, resumes an interrupted run from a snapshot, and keeps snapshotting to it
+                 The rest of the command line must be the same as the interrupted run's
+--sample-sets <rate>: Optional, only simulates this fraction of the sets, picked with --seed, and prints estimates with 95% confidence intervals
+--sample-time <rate>: Optional, only simulates this fraction of the trace, as windows picked with --seed, and prints estimates with 95% confidence intervals
+--sample-window <records>: Optional number of records in each --sample-time window (defaults to 10000)
+--warmup <records>: Optional number of records simulated before each --sample-time window without being counted (defaults to the window)
 -s <s>: Number of set index bits (S = 2 s is the number of sets)
 -E <E>: Associativity (number of lines per set)
 -b <b>: Number of block bits (B = 2 b is the block size)
--t <tracefile>: Name of the valgrind trace to replay""")
+        -s, -E, -b and --policy also take lists like 1,2,4 or ranges like 0-4
+        Every combination is simulated in one pass over the trace, and a table of results is printed
+-a <a>: Optional number of address bits (defaults to 64)
+--policy <policy>: Optional replacement policy, one of lru, fifo, random, plru, lfu, opt (defaults to fifo)
+                   opt is Belady's offline optimal policy, it only works for plain runs and sweeps
+--seed <seed>: Optional seed for the random replacement policy
+-j <jobs>: Optional number of worker processes to spread a sweep over (defaults to 1)
+           Text trace files are also parsed in parallel chunks by this many processes
+--workers <N>: Optional number of worker processes to split a single configuration's sets over, giving the same results (defaults to 1)
+--profile: Optional, times reading, parsing, decoding, lookup and replacement of a single configuration over sampled batches of records,
+           and prints a table of wall and CPU seconds per phase and accesses per second
+--profile-format <format>: Optional --profile output format, table or json (defaults to table), turns on --profile
+--profile-every <batches>: Optional, one batch of 1024 records in this many is timed by --profile (defaults to 8), turns on --profile
+--cprofile <file>: Optional, also runs --profile under cProfile and dumps the stats to this file for pstats, turns on --profile
+--writes: Optional, simulates the write policy of a single configuration, printing dirty evictions, bytes to and from the next level and AMAT
+--write-policy <policy>: Optional write policy, back or through (defaults to back), turns on --writes
+--no-write-allocate: Optional, store misses write around the cache instead of filling the block, turns on --writes
+--hit-time <cycles>: Optional hit time for the --writes AMAT estimate (defaults to 1), turns on --writes
+--miss-penalty <cycles>: Optional miss penalty for the --writes AMAT estimate (defaults to 100), turns on --writes
+--split-blocks: Optional, splits an access whose bytes straddle a block boundary into one access per block it touches
+--icache <s:E:b[:policy]>: Optional instruction cache fed the I records in the same pass, its stats are printed after the data cache's
+--store <dir>: Optional result store, stored results are printed without simulating and new results are stored
+--store-size <MiB>: Optional size bound of the result store, least recently used entries are deleted past it (defaults to 64)
+--store-list: Lists the entries of the --store result store, least recently used first
+--store-purge: Deletes the entries of the --store result store, only the ones of the -t trace if it is given
+-t <tracefile>: Name of the valgrind trace to replay, - for stdin, .gz/.xz traces are decompressed on the fly
+               Binary traces made with --convert are detected and replayed through a memory map
+--convert <binaryfile>: Converts the trace to a binary trace, then exits
+--compact <b>: Optional when converting, folds runs of accesses to one 2^b byte block into repeat records
+               Compacted traces give exact results for any cache with block bits >= b
+--stack-distance: Computes per-set and global LRU stack distances in one pass, printing miss rates at every E and capacity
+--stack-csv <prefix>: Writes the stack distance histograms and miss curves to <prefix>_set.csv and <prefix>_global.csv
+--mesi: Simulates a private -s/-E/-b cache per core kept coherent with MESI, printing per-core and per-block coherence stats
+        -t takes a comma separated trace per core, interleaved one record at a time
+--cores <N>: Number of cores of a single --mesi trace, whose records have a core id as a third column, like S 7ff000398,8,1
+--locality: Profiles log2 histograms of reuse distance (distinct blocks between reuses) and reuse time (accesses between reuses),
+            and the working set (distinct blocks) of every --window accesses (defaults to 10000)
+--locality-csv <prefix>: Writes the --locality histograms and working sets to <prefix>_reuse_distance.csv, <prefix>_reuse_time.csv
+                         and <prefix>_working_set.csv
+--levels <s:E:b[:policy],...>: Simulates a hierarchy, level 1 first, where each level only sees the misses of the level above
+--inclusion <inclusion>: Optional hierarchy inclusion policy, one of nine, inclusive, exclusive (defaults to nine)""")
 
         if exit_flag:
             sys.exit()